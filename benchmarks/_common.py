@@ -0,0 +1,95 @@
+"""
+Shared utilities for the benchmarks.
+"""
+
+import contextlib
+import json
+import math
+import platform
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from alfred3.testutil import clear_db, get_exp_session
+
+import alfred3_interact
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / "tests" / "res" / "script-hello_world.py"
+SECRETS = ROOT / "tests" / "res" / "secrets-default.conf"
+
+#: Available storage backends. "mongomock" runs the mongo saving agent
+#: against an in-memory server that is shared by all sessions, "mongo"
+#: requires a running MongoDB server as configured in
+#: *tests/res/secrets-default.conf*.
+BACKENDS = ("local", "mongomock", "mongo")
+
+
+@contextlib.contextmanager
+def session_factory(backend: str):
+    """
+    Provides a function that creates experiment sessions for the given
+    backend. All sessions created within the context share their data,
+    which is discarded when the context ends.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from {BACKENDS}.")
+
+    secrets = None if backend == "local" else str(SECRETS)
+
+    if backend == "mongomock":
+        import mongomock
+
+        server = mongomock.patch(servers=(("localhost", 27017),), on_new="create")
+    else:
+        server = contextlib.nullcontext()
+
+    with tempfile.TemporaryDirectory() as tmp, server:
+        yield partial(
+            get_exp_session, Path(tmp), script_path=str(SCRIPT), secrets_path=secrets
+        )
+
+        if backend == "mongo":
+            clear_db(mock=False)
+
+
+def percentile(values: list, q: float) -> float:
+    """
+    Returns the *q*-quantile of *values* by the nearest-rank method.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    i = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+    return values[i]
+
+
+def summarize(values: list) -> dict:
+    """
+    Returns mean, p50, p95, p99 and maximum of *values*.
+    """
+    d = {}
+    d["mean"] = sum(values) / len(values) if values else None
+    d["p50"] = percentile(values, 0.5)
+    d["p95"] = percentile(values, 0.95)
+    d["p99"] = percentile(values, 0.99)
+    d["max"] = max(values) if values else None
+    return d
+
+
+def write_results(path, benchmark: str, params: dict, results: list):
+    """
+    Writes benchmark results to a JSON file, together with the versions
+    needed to compare results across releases.
+    """
+    data = {}
+    data["benchmark"] = benchmark
+    data["alfred3_interact_version"] = alfred3_interact.__version__
+    data["python_version"] = platform.python_version()
+    data["timestamp"] = time.time()
+    data["params"] = params
+    data["results"] = results
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
@@ -0,0 +1,218 @@
+"""
+Generator for historical matchmaking state.
+
+Long-running studies accumulate state: thousands of members in the
+matchmaker document, a group document (or file) per group, quota slots
+that are taken by old groups, and long chats. :func:`.seed_history`
+writes such state directly in its persisted form, which is much faster
+than producing it through actual matchmaking.
+"""
+
+import json
+import random
+import time
+from dataclasses import asdict
+
+from alfred3.data_manager import DataManager as dm
+
+from alfred3_interact import MatchMaker, SequentialSpec
+from alfred3_interact._util import saving_method
+from alfred3_interact.group import GroupData, GroupType
+from alfred3_interact.member import GroupMemberData
+
+#: Roles of the seeded spec
+ROLES = ("a", "b")
+
+#: Name of the seeded spec, matchmaker and chat
+NAME = "history"
+
+#: Length of the seeded history in seconds
+HISTORY = 30 * 24 * 60 * 60
+
+
+def _exp_data(exp, sid: str, start: float, finished: bool, aborted: bool) -> dict:
+    save = start + 600 if finished or aborted else time.time()
+    moves = [
+        {
+            "move_number": i + 1,
+            "page_name": f"page{i}",
+            "target_page": f"page{i + 1}",
+            "show_time": start + 60 * i,
+            "hide_time": start + 60 * (i + 1),
+        }
+        for i in range(3)
+    ]
+
+    d = {}
+    d["type"] = dm.EXP_DATA
+    d["exp_id"] = exp.exp_id
+    d["exp_version"] = exp.version
+    d["exp_session_id"] = sid
+    d["exp_start_time"] = start
+    d["exp_save_time"] = save
+    d["exp_finished"] = finished
+    d["exp_aborted"] = aborted
+    d["exp_condition"] = NAME
+    d["exp_move_history"] = moves
+    return d
+
+
+def _group_data(mm, members: list, timestamp: float) -> dict:
+    roles = {role: None for role in ROLES}
+    for role, sid in zip(ROLES, members):
+        roles[role] = sid
+
+    data = GroupData(
+        exp_id=mm.exp.exp_id,
+        exp_version=mm.exp_version,
+        matchmaker_id=mm.matchmaker_id,
+        roles=roles,
+        group_type=GroupType.SEQUENTIAL,
+        spec_name=NAME,
+        members=list(members),
+        timestamp=timestamp,
+    )
+    return asdict(data)
+
+
+def _chat_data(exp, sids: list, nmessages: int, rng: random.Random) -> dict:
+    start = time.time() - HISTORY
+    messages = []
+    for i in range(nmessages):
+        msg = {}
+        msg["sender_session_id"] = rng.choice(sids)
+        msg["timestamp"] = start + HISTORY * i / nmessages
+        msg["msg"] = exp.encrypt(f"Message {i}")
+        msg["nickname"] = f"Member {i % 10}"
+        msg["color"] = "#1f78b4"
+        messages.append(msg)
+
+    d = {}
+    d["exp_id"] = exp.exp_id
+    d["type"] = "chat_data"
+    d["chat_id"] = NAME
+    d["sessions"] = {sid: "registered" for sid in set(sids)}
+    d["messages"] = messages
+    d["change_counter"] = nmessages
+    return d
+
+
+def seed_history(
+    exp,
+    nmembers: int,
+    nwaiting: int = 50,
+    finished_share: float = 0.8,
+    nmessages: int = 0,
+    open_slots: int = 0,
+    seed: int = 0,
+) -> MatchMaker:
+    """
+    Seeds the state of a long-running study with a sequential spec
+    "history" and returns a matchmaker for it.
+
+    Matched members are grouped in order of registration. Each of them
+    has finished or aborted the experiment. One additional group has a
+    single finished member and thus takes members. The *nwaiting* most
+    recent members are active and unmatched.
+
+    Args:
+        exp: The experiment session. The seeded state is stored in the
+            session's saving backend.
+        nmembers (int): Number of seeded members, including the
+            waiting ones.
+        nwaiting (int): Number of active, unmatched members.
+        finished_share (float): Share of matched members who finished
+            the experiment. The others aborted.
+        nmessages (int): Number of messages in the chat "history". Chats
+            are only seeded in mongo experiments.
+        open_slots (int): Number of quota slots that are not taken by a
+            seeded group.
+        seed (int): Seed for the random number generator.
+
+    Returns:
+        MatchMaker: The matchmaker of the seeded spec.
+    """
+    rng = random.Random(seed)
+    now = time.time()
+    start = now - HISTORY
+    nmatched = max(nmembers - nwaiting - 1, 0)
+
+    sids = [f"{NAME}-{i:07d}" for i in range(nmembers)]
+    groups = [sids[i : i + len(ROLES)] for i in range(0, nmatched, len(ROLES))]
+    groups = [g for g in groups if len(g) == len(ROLES)]
+    matched = {sid for group in groups for sid in group}
+    if nmembers > nwaiting:
+        groups.append([sids[len(matched)]])
+        matched.add(sids[len(matched)])
+
+    spec = SequentialSpec(*ROLES, nslots=len(groups) + open_slots, name=NAME)
+    mm = MatchMaker(spec, exp=exp, name=NAME)
+
+    sessions = []
+    member_data = {}
+    group_data = []
+    for gi, group in enumerate(groups):
+        created = start + HISTORY * gi / max(len(groups), 1)
+        gdata = _group_data(mm, group, created)
+        group_data.append(gdata)
+
+        for role, sid in zip(ROLES, group):
+            finished = len(group) < len(ROLES) or rng.random() < finished_share
+            sessions.append(_exp_data(exp, sid, created, finished, not finished))
+
+            mdata = GroupMemberData(
+                exp_id=exp.exp_id,
+                session_id=sid,
+                group_id=gdata["group_id"],
+                role=role,
+                created=created,
+                ping=created,
+                match_time=created + 1,
+            )
+            member_data[sid] = asdict(mdata)
+
+    for sid in sids[len(matched) :]:
+        sessions.append(_exp_data(exp, sid, now - 60, False, False))
+        mdata = GroupMemberData(exp_id=exp.exp_id, session_id=sid, created=now - 60)
+        member_data[sid] = asdict(mdata)
+
+    with mm.io as data:
+        data.members.update(member_data)
+        mm.io.save(data)
+
+    if saving_method(exp) == "mongo":
+        _seed_mongo(exp, sessions, group_data)
+        if nmessages:
+            exp.db_misc.insert_one(_chat_data(exp, sids, nmessages, rng))
+    elif saving_method(exp) == "local":
+        _seed_local(exp, mm, sessions, group_data)
+
+    with spec.quota.io as data:
+        for slot, gdata in zip(data.slots, group_data):
+            slot["group_ids"] = [gdata["group_id"]]
+        spec.quota.io.save(data)
+
+    return mm
+
+
+def _seed_mongo(exp, sessions: list, group_data: list):
+    if sessions:
+        exp.db_main.insert_many(sessions)
+    if group_data:
+        exp.db_misc.insert_many(group_data)
+
+
+def _seed_local(exp, mm, sessions: list, group_data: list):
+    directory = exp.config.get("local_saving_agent", "path")
+    directory = exp.subpath(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    for session in sessions:
+        path = directory / f"{session['exp_session_id']}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(session, f)
+
+    for gdata in group_data:
+        path = mm.io.path.parent / f"group_{gdata['group_id']}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(gdata, f)
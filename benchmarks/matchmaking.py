@@ -0,0 +1,214 @@
+"""
+End-to-end matchmaking throughput benchmark.
+
+Simulates concurrent sessions, each of which polls a
+:class:`alfred3_interact.WaitingPage` until it is matched. The page's
+waiting function calls :meth:`.MatchMaker.match_to`,
+:meth:`.MatchMaker.match_random` or :meth:`.MatchMaker.match_chain`.
+Sessions sleep between two polls as suggested by the page's poll
+interval, scaled by *time-scale*.
+
+For every combination of spec type and matching method, the benchmark
+reports matches per second, poll latency, the rate of polls that met a
+busy matchmaker and database operations per match.
+
+Execute from the repository root::
+
+    $ python -m benchmarks.matchmaking --backend local --sessions 20
+
+"""
+
+import threading
+import time
+
+import click
+
+from alfred3_interact import (
+    IndividualSpec,
+    MatchMaker,
+    ParallelSpec,
+    SequentialSpec,
+    WaitingPage,
+)
+from alfred3_interact._util import MatchMakerBusy
+from alfred3_interact.testutil import count_queries
+
+from ._common import (
+    BACKENDS,
+    session_factory,
+    summarize,
+    write_results,
+)
+
+SPECS = {
+    "sequential": lambda name, n: SequentialSpec("a", "b", nslots=n, name=name),
+    "parallel": lambda name, n: ParallelSpec("a", "b", nslots=n, name=name),
+    "individual": lambda name, n: IndividualSpec(nslots=n, name=name),
+}
+
+METHODS = ("match_to", "match_random", "match_chain")
+
+#: Length of the time box of the first spec in match_chain, in seconds
+CHAIN_TIMEBOX = 1
+
+
+class BenchmarkPage(WaitingPage):
+    """
+    Waiting page that calls the matching function *match* and counts
+    polls that met a busy matchmaker.
+    """
+
+    def __init__(self, match, **kwargs):
+        super().__init__(**kwargs)
+        self.match = match
+        self.group = None
+        self.nbusy = 0
+
+    def wait_for(self):
+        try:
+            self.group = self.match()
+        except MatchMakerBusy:
+            self.nbusy += 1
+            raise
+        return self.group is not None
+
+
+def _matching_function(mm: MatchMaker, method: str):
+    if method == "match_to":
+        return lambda: mm.match_to("bench1")
+    elif method == "match_random":
+        return mm.match_random
+    elif method == "match_chain":
+        return lambda: mm.match_chain(bench1=CHAIN_TIMEBOX, bench2=None)
+
+
+def _poll(page: BenchmarkPage, latencies: list, time_scale: float, deadline: float):
+    while time.time() < deadline:
+        start = time.perf_counter()
+        done = page._wait_for()
+        latencies.append(time.perf_counter() - start)
+
+        if done:
+            return
+
+        time.sleep(page.poll_interval.current * time_scale)
+
+
+def run(
+    backend: str,
+    spec_type: str,
+    method: str,
+    nsessions: int,
+    time_scale: float,
+    timeout: float,
+) -> dict:
+    """
+    Runs a single benchmark scenario and returns its results.
+    """
+    with session_factory(backend) as new_session:
+        pages = []
+        for i in range(nsessions):
+            exp = new_session(sid=f"bench-{i}")
+            specs = [SPECS[spec_type](f"bench{j}", nsessions) for j in (1, 2)]
+            mm = MatchMaker(*specs, exp=exp)
+            page = BenchmarkPage(
+                match=_matching_function(mm, method),
+                wait_timeout=timeout,
+                name="bench_wait",
+            )
+            exp += page
+            pages.append(page)
+
+        latencies = []
+        deadline = time.time() + timeout
+        threads = [
+            threading.Thread(target=_poll, args=(page, latencies, time_scale, deadline))
+            for page in pages
+        ]
+
+        with count_queries() as ops:
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            duration = time.perf_counter() - start
+
+    matched = sum(page.group is not None for page in pages)
+    aborted = sum(page.exp.aborted for page in pages)
+    npolls = len(latencies)
+    nbusy = sum(page.nbusy for page in pages)
+
+    d = {}
+    d["backend"] = backend
+    d["spec"] = spec_type
+    d["method"] = method
+    d["sessions"] = nsessions
+    d["matched"] = matched
+    d["aborted"] = aborted
+    d["seconds"] = duration
+    d["matches_per_second"] = matched / duration if duration else None
+    d["polls"] = npolls
+    d["poll_latency"] = summarize(latencies)
+    d["busy_rate"] = nbusy / npolls if npolls else None
+    d["db_reads"] = ops.reads
+    d["db_writes"] = ops.writes
+    d["file_opens"] = ops.files
+    d["db_ops_per_match"] = ops.total / matched if matched else None
+    return d
+
+
+@click.command()
+@click.option("--backend", type=click.Choice(BACKENDS), default="local")
+@click.option("--sessions", default=20, help="Number of concurrent sessions")
+@click.option(
+    "--spec",
+    "specs",
+    type=click.Choice(list(SPECS)),
+    multiple=True,
+    help="Spec types to benchmark. Defaults to all.",
+)
+@click.option(
+    "--method",
+    "methods",
+    type=click.Choice(METHODS),
+    multiple=True,
+    help="Matching methods to benchmark. Defaults to all.",
+)
+@click.option(
+    "--time-scale",
+    default=0.1,
+    help="Factor for the sleep time in between two polls of a session.",
+)
+@click.option("--timeout", default=60, help="Maximum seconds per scenario")
+@click.option("--output", default="matchmaking.json", help="Path of the JSON results")
+def main(backend, sessions, specs, methods, time_scale, timeout, output):
+    """Benchmark matchmaking throughput."""
+    specs = specs or list(SPECS)
+    methods = methods or METHODS
+
+    results = []
+    for spec_type in specs:
+        for method in methods:
+            result = run(backend, spec_type, method, sessions, time_scale, timeout)
+            results.append(result)
+            click.echo(
+                f"{spec_type:<11} {method:<13} "
+                f"{result['matches_per_second'] or 0:8.2f} matches/s  "
+                f"p95 poll {result['poll_latency']['p95'] or 0:.4f}s  "
+                f"busy {result['busy_rate'] or 0:.1%}  "
+                f"db ops/match {result['db_ops_per_match'] or 0:.1f}"
+            )
+
+    params = {
+        "backend": backend,
+        "sessions": sessions,
+        "time_scale": time_scale,
+        "timeout": timeout,
+    }
+    write_results(output, "matchmaking", params, results)
+    click.echo(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
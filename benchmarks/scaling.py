@@ -0,0 +1,207 @@
+"""
+Data-volume scaling benchmark.
+
+Seeds historical state of increasing size with
+:func:`benchmarks.fixtures.seed_history` and measures operations whose
+cost depends on the amount of accumulated state:
+
+- :meth:`.GroupManager.next`
+- :attr:`.MetaQuota.full`
+- :meth:`.MemberManager.waiting`
+- :meth:`.ViewMembers.render_table_body`, for the first page of 25 rows
+- :meth:`.ChatManager.load_messages`, for a full reload (mongo only)
+
+For every operation, the benchmark reports the median duration and the
+number of database operations per size, and the growth exponent
+between two consecutive sizes (1 for linear, 2 for quadratic cost).
+If matplotlib is installed, it also plots duration against volume.
+
+Execute from the repository root::
+
+    $ python -m benchmarks.scaling --backend mongomock --sizes 1000 --sizes 10000
+
+"""
+
+import math
+import statistics
+import time
+
+import alfred3 as al
+import click
+
+from alfred3_interact import ViewMembers
+from alfred3_interact._util import saving_method
+from alfred3_interact.chat import ChatManager
+from alfred3_interact.group import GroupManager, GroupType
+from alfred3_interact.testutil import count_queries
+
+from ._common import BACKENDS, session_factory, write_results
+from .fixtures import NAME, seed_history
+
+
+def _operations(exp, mm) -> dict:
+    """
+    Returns the benchmarked operations as a dictionary of names to
+    functions without arguments.
+    """
+    page = al.Page(name="monitor")
+    exp += page
+    view = ViewMembers(match_maker=mm, name="view_mm", cache_timeout=0)
+    page += view
+
+    group_manager = GroupManager(mm, GroupType.SEQUENTIAL, NAME)
+
+    ops = {}
+    ops["GroupManager.next"] = lambda: group_manager.next(ongoing_sessions_ok=False)
+    ops["MetaQuota.full"] = lambda: mm.quota.full
+    ops["MemberManager.waiting"] = lambda: list(
+        mm.member_manager.waiting(mm.ping_timeout)
+    )
+    ops["ViewMembers.render_table_body"] = lambda: view.render_table_body(
+        draw=1, start=0, length=25
+    )
+
+    if saving_method(exp) == "mongo":
+        chat = ChatManager(exp, chat_id=NAME, encrypt=True)
+
+        def load_messages():
+            chat._local_change_counter = 0
+            chat._inactive_sids = []
+            chat.load_messages()
+
+        ops["ChatManager.load_messages"] = load_messages
+
+    return ops
+
+
+def _measure(func, repeat: int) -> dict:
+    durations = []
+    with count_queries() as ops:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+
+    d = {}
+    d["seconds"] = statistics.median(durations)
+    d["seconds_min"] = min(durations)
+    d["db_ops"] = ops.total / repeat
+    return d
+
+
+def _growth(results: list) -> None:
+    """
+    Adds the growth exponent relative to the previous size to every
+    result.
+    """
+    previous = {}
+    for result in results:
+        key = result["operation"]
+        prev = previous.get(key)
+        if prev and prev["seconds"] > 0 and result["seconds"] > 0:
+            ratio = math.log(result["seconds"] / prev["seconds"])
+            result["growth"] = ratio / math.log(result["members"] / prev["members"])
+        else:
+            result["growth"] = None
+        previous[key] = result
+
+
+def plot(results: list, path: str) -> bool:
+    """
+    Plots duration against volume on log-log axes. Returns *False*, if
+    matplotlib is not installed.
+    """
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+
+    fig, ax = plt.subplots()
+    for operation in dict.fromkeys(r["operation"] for r in results):
+        rows = [r for r in results if r["operation"] == operation]
+        ax.plot(
+            [r["members"] for r in rows],
+            [r["seconds"] for r in rows],
+            marker="o",
+            label=operation,
+        )
+
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Members")
+    ax.set_ylabel("Seconds (median)")
+    ax.legend(fontsize="small")
+    fig.savefig(path, bbox_inches="tight")
+    plt.close(fig)
+    return True
+
+
+def run(backend: str, nmembers: int, repeat: int, messages_per_member: float) -> list:
+    """
+    Seeds state with *nmembers* members and measures all operations.
+    """
+    with session_factory(backend) as new_session:
+        exp = new_session(sid="bench-observer")
+        nmessages = int(nmembers * messages_per_member)
+        mm = seed_history(exp, nmembers, nmessages=nmessages)
+
+        results = []
+        for name, func in _operations(exp, mm).items():
+            result = {"operation": name, "members": nmembers}
+            result.update(_measure(func, repeat))
+            results.append(result)
+
+    return results
+
+
+@click.command()
+@click.option("--backend", type=click.Choice(BACKENDS), default="mongomock")
+@click.option(
+    "--sizes",
+    multiple=True,
+    type=int,
+    help="Number of seeded members, repeatable. Defaults to 1000 and 10000.",
+)
+@click.option("--repeat", default=3, help="Repetitions per operation and size")
+@click.option(
+    "--messages-per-member",
+    default=0.1,
+    help="Number of chat messages per seeded member",
+)
+@click.option("--output", default="scaling.json", help="Path of the JSON results")
+@click.option("--plot", "plot_path", default=None, help="Path of the PNG plot")
+def main(backend, sizes, repeat, messages_per_member, output, plot_path):
+    """Benchmark the cost of operations against the volume of state."""
+    sizes = sorted(sizes or (1000, 10000))
+
+    results = []
+    for nmembers in sizes:
+        results += run(backend, nmembers, repeat, messages_per_member)
+
+    results.sort(key=lambda r: (r["operation"], r["members"]))
+    _growth(results)
+
+    for r in results:
+        growth = "-" if r["growth"] is None else f"{r['growth']:.2f}"
+        click.echo(
+            f"{r['operation']:<31} {r['members']:>7} members  "
+            f"{r['seconds']:9.4f}s  {r['db_ops']:7.1f} db ops  growth {growth}"
+        )
+
+    params = {"backend": backend, "repeat": repeat, "sizes": sizes}
+    params["messages_per_member"] = messages_per_member
+    write_results(output, "scaling", params, results)
+    click.echo(f"Results written to {output}")
+
+    if plot_path:
+        if plot(results, plot_path):
+            click.echo(f"Plot written to {plot_path}")
+        else:
+            click.echo("Install matplotlib to plot the results.")
+
+
+if __name__ == "__main__":
+    main()
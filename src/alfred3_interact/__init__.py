@@ -7,10 +7,12 @@ from .element import (
 )
 from .match import MatchMaker as MatchMaker
 from .page import (
+    DatabaseMonitoring as DatabaseMonitoring,
     MatchingPage as MatchingPage,
     MatchMakerActivation as MatchMakerActivation,
     MatchMakerMonitoring as MatchMakerMonitoring,
     MatchTestPage as MatchTestPage,
+    SyncPage as SyncPage,
     WaitingPage as WaitingPage,
 )
 from .spec import (
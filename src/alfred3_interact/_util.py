@@ -2,6 +2,20 @@
 Soome basic utilities.
 """
 
+import math
+from contextlib import contextmanager
+from copy import deepcopy
+from dataclasses import fields
+from pathlib import Path
+
+from flask import g, has_request_context
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 
 def saving_method(exp) -> str:
     if not exp.secrets.getboolean("mongo_saving_agent", "use"):
@@ -13,6 +27,50 @@ def saving_method(exp) -> str:
         return None
 
 
+def request_cache(name: str) -> dict:
+    """
+    Returns a dictionary that lives as long as the current web request.
+    Outside of a request, e.g. in tests or scripts, returns *None*.
+    """
+    if not has_request_context():
+        return None
+
+    caches = g.setdefault("alfred3_interact_cache", {})
+    return caches.setdefault(name, {})
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on the file *path* for the duration of the
+    block. The lock is shared by all threads and processes on the same
+    machine and is taken on a separate file ``<path>.lock``, so that
+    *path* itself can be replaced while the lock is held.
+
+    The lock is not reentrant. Do not acquire it again inside the
+    block.
+    """
+    path = Path(path)
+    lockpath = path.with_name(path.name + ".lock")
+    lockpath.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(lockpath, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
 class AlfredInteractError(Exception):
     pass
 
@@ -29,9 +87,203 @@ class BusyGroup(AlfredInteractError):
     pass
 
 
-class NoMatch(AlfredInteractError):
+class SharedDataConflict(AlfredInteractError):
+    """
+    Raised if shared group data was changed by another session while a
+    batch of changes was prepared.
+    """
+
     pass
 
 
+class NoMatch(AlfredInteractError):
+    """
+    Raised if a single matching effort was unsuccessful.
+
+    Args:
+        nwaiting (int): Number of sessions that were waiting to be
+            matched during the unsuccessful effort, if known. Used by
+            :class:`.WaitingPage` to detect a growing waiting pool.
+    """
+
+    def __init__(self, *args, nwaiting: int = None):
+        super().__init__(*args)
+        self.nwaiting = nwaiting
+
+
 class MatchMakerBusy(AlfredInteractError):
     pass
+
+
+class PollInterval:
+    """
+    Exponential backoff for client-side polling.
+
+    The interval starts at *base*. Every idle poll multiplies it with
+    *factor* until *cap* is reached, every poll that observed activity
+    resets it to *base*.
+
+    Args:
+        base (int, float): Interval in seconds after activity.
+        cap (int, float): Maximum interval in seconds. Defaults to *None*,
+            in which case the interval never grows beyond *base*.
+        factor (int, float): Growth factor per idle poll. Defaults to 2.
+    """
+
+    def __init__(self, base: float, cap: float = None, factor: float = 2):
+        self.base = base
+        self.cap = max(base, cap) if cap is not None else base
+        self.factor = factor
+        self._nidle = 0
+
+    @property
+    def current(self) -> float:
+        """
+        float: The interval in seconds until the next poll.
+        """
+        return min(self.cap, self.base * self.factor**self._nidle)
+
+    @property
+    def _max_nidle(self) -> int:
+        if self.base <= 0 or self.factor <= 1:
+            return 0
+        return math.ceil(math.log(self.cap / self.base, self.factor))
+
+    def activity(self) -> float:
+        """
+        Resets the interval to *base* and returns it.
+        """
+        self._nidle = 0
+        return self.current
+
+    def idle(self) -> float:
+        """
+        Grows the interval by *factor* (up to *cap*) and returns it.
+        """
+        self._nidle = min(self._nidle + 1, self._max_nidle)
+        return self.current
+
+
+class ChangeTracking:
+    """
+    Mixin for dataclasses that tracks changes against their persisted
+    state.
+
+    :meth:`.mark_clean` records a deep copy of the field values, so that
+    changes to nested values are detected, too. :meth:`.changes` compares
+    the current values against this snapshot and returns the changed
+    fields as a dictionary of paths to values, as used by a MongoDB
+    ``$set`` update. Changed keys of dictionary fields are returned as
+    dotted paths. If no snapshot was recorded, all fields count as
+    changed.
+    """
+
+    def mark_clean(self, *names: str):
+        """
+        Records the current values as persisted.
+
+        Args:
+            *names: Names of the fields to record. Defaults to all
+                fields.
+        """
+        snapshot = getattr(self, "_persisted", None)
+        if not names:
+            snapshot = {}
+            names = [f.name for f in fields(self)]
+        elif snapshot is None:
+            return
+
+        for name in names:
+            snapshot[name] = deepcopy(getattr(self, name))
+
+        self._persisted = snapshot
+
+    def revert(self):
+        """
+        Restores the values recorded by the last call of
+        :meth:`.mark_clean`, discarding all changes since.
+        """
+        for name, value in (getattr(self, "_persisted", None) or {}).items():
+            setattr(self, name, deepcopy(value))
+
+    def changes(self, exclude: tuple = ()) -> dict:
+        """
+        Returns the fields that changed since the last call of
+        :meth:`.mark_clean`.
+
+        Args:
+            exclude (tuple): Names of fields to ignore.
+
+        Returns:
+            dict: Paths of changed fields and their current values.
+        """
+        persisted = getattr(self, "_persisted", None) or {}
+        changed = {}
+
+        for f in fields(self):
+            if f.name in exclude:
+                continue
+
+            value = getattr(self, f.name)
+            if f.name not in persisted:
+                changed[f.name] = value
+                continue
+
+            old = persisted[f.name]
+            if isinstance(value, dict) and isinstance(old, dict):
+                # the key order of dictionaries is part of their state
+                if list(value)[: len(old)] == list(old):
+                    for key, item in value.items():
+                        if key not in old or old[key] != item:
+                            changed[f"{f.name}.{key}"] = item
+                    continue
+
+            elif value == old:
+                continue
+
+            changed[f.name] = value
+
+        return changed
+
+
+class IdentityMap:
+    """
+    Registry of the live :class:`.Group` and :class:`.GroupMember`
+    objects of a matchmaker in the current experiment session.
+
+    Groups are keyed by group id, members by session id. Managers return
+    the registered object instead of building a new one, so that all
+    parts of a session work with the same object. Members that are
+    registered are not queried again. Use ``refresh()`` on a group or
+    member to reload its data explicitly.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.members = {}
+
+    def add_group(self, group):
+        self.groups[group.data.group_id] = group
+
+    def add_member(self, member):
+        self.members[member.data.session_id] = member
+
+    def group(self, group_id: str):
+        """
+        Returns the registered group with id *group_id*, or *None*.
+        """
+        return self.groups.get(group_id)
+
+    def member(self, session_id: str):
+        """
+        Returns the registered member with session id *session_id*, or
+        *None*.
+        """
+        return self.members.get(session_id)
+
+    def clear(self):
+        """
+        Forgets all registered objects.
+        """
+        self.groups.clear()
+        self.members.clear()
@@ -7,6 +7,9 @@ import time
 import bleach
 from pymongo.collection import ReturnDocument
 
+from ._util import PollInterval
+from .instrument import db_main, db_misc
+
 
 class ChatManager:
     """
@@ -29,6 +32,12 @@ class ChatManager:
             output messages of aborted or expired sessions. Can be
             necessary in experiments with asynchronous interaction to
             prevent confusing chats. Defaults to True.
+        refresh_interval (int, float): Polling interval in seconds while
+            the chat is active. Defaults to 1.
+        max_refresh_interval (int, float): Maximum polling interval in
+            seconds. While no new messages arrive, the interval suggested
+            by :meth:`.poll_messages` doubles up to this value.
+            Defaults to 5.
 
     """
 
@@ -56,6 +65,8 @@ class ChatManager:
         colors: dict = None,
         encrypt: bool = True,
         ignore_aborted_sessions: bool = True,
+        refresh_interval: float = 1,
+        max_refresh_interval: float = 5,
     ):
         self.exp = exp
         room = "_room-" + room if room != "" else ""
@@ -80,6 +91,7 @@ class ChatManager:
         self.color = self._find_color()
 
         self._inactive_sids = []
+        self.poll_interval = PollInterval(refresh_interval, max_refresh_interval)
         self.exp.append_plugin_data_query(self._plugin_data_query)
 
     @property
@@ -114,7 +126,7 @@ class ChatManager:
 
     def _register_session(self) -> int:
         """Returns chat member number (a simple count)"""
-        doc = self.exp.db_misc.find_one_and_update(
+        doc = db_misc(self.exp).find_one_and_update(
             self._query,
             update=[{"$set": {"sessions": {self.exp.session_id: "registered"}}}],
             upsert=True,
@@ -141,11 +153,12 @@ class ChatManager:
         msg_data["nickname"] = self.nickname
         msg_data["color"] = self.color
 
-        self.exp.db_misc.find_one_and_update(
+        db_misc(self.exp).find_one_and_update(
             self._query,
             update={"$push": {"messages": msg_data}, "$inc": {"change_counter": 1}},
             upsert=True,
         )
+        self.poll_interval.activity()
 
     def load_messages(self) -> str:
         """
@@ -156,7 +169,7 @@ class ChatManager:
             have been found, "update" means that the internal message
             storage has been updated.
         """
-        data = self.exp.db_misc.find_one(
+        data = db_misc(self.exp).find_one(
             self._query, projection={"change_counter": True}
         )
 
@@ -164,7 +177,7 @@ class ChatManager:
             return "pass"
 
         self._local_change_counter = data["change_counter"]
-        chat_data = self.exp.db_misc.find_one(self._query)
+        chat_data = db_misc(self.exp).find_one(self._query)
 
         if self.encrypt:
             for msg in chat_data.get("messages", []):
@@ -176,6 +189,28 @@ class ChatManager:
 
         return "update"
 
+    def poll_messages(self) -> dict:
+        """
+        Loads new messages and returns them together with a hint for
+        the next poll.
+
+        Returns:
+            dict: A dictionary with the keys "messages", holding a tuple
+            of all new messages, and "next_poll_in", holding the number
+            of seconds that the client should wait before polling again.
+            The hint is short after activity in the chat and backs off
+            exponentially while the chat is idle.
+        """
+        if self.load_messages() == "update":
+            next_poll_in = self.poll_interval.activity()
+        else:
+            next_poll_in = self.poll_interval.idle()
+
+        d = {}
+        d["messages"] = self.get_new_messages()
+        d["next_poll_in"] = next_poll_in
+        return d
+
     def get_new_messages(self) -> tuple:
         """
         Returns:
@@ -231,7 +266,7 @@ class ChatManager:
 
         for sid in uncertain_sids:
             query = {"type": "exp_data", "exp_session_id": sid}
-            sdata = self.exp.db_main.find_one(
+            sdata = db_main(self.exp).find_one(
                 query,
                 projection={
                     "exp_aborted": True,
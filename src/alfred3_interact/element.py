@@ -2,16 +2,18 @@
 Specialized elements for interactive experiments.
 """
 
+import threading
 import time
 from typing import Union
 
 from alfred3 import icon
 from alfred3._helper import inherit_kwargs
-from alfred3.data_manager import DataManager as dm
 from alfred3.element.core import Element
+from alfred3.element.misc import RepeatedCallback
 from jinja2 import Environment, PackageLoader
 
 from .chat import ChatManager
+from .instrument import recorder
 
 jenv = Environment(loader=PackageLoader("alfred3_interact", "templates"))
 
@@ -86,8 +88,14 @@ class Chat(Element):
             height of the text input field. Defaults to True.
 
         refresh_interval (int, float): Time in seconds, determines how
-            often the chat elements looks for new messages. Defaults to
-            1.
+            often the chat elements looks for new messages while the
+            chat is active. Defaults to 1.
+
+        max_refresh_interval (int, float): Maximum time in seconds
+            between two looks for new messages. While no new messages
+            arrive, the interval doubles with every look until it reaches
+            this value. Set it to the value of *refresh_interval* to
+            poll at a fixed rate. Defaults to 5.
 
         {kwargs}
 
@@ -151,6 +159,7 @@ class Chat(Element):
         background_color: str = "WhiteSmoke",
         allow_resize: bool = True,
         refresh_interval: Union[int, float] = 1,
+        max_refresh_interval: Union[int, float] = 5,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -166,6 +175,7 @@ class Chat(Element):
         self.load_url = None
         self.get_new_url = None
         self.get_all_url = None
+        self.poll_url = None
 
         self.colors = colors
         self.color_target = color_target
@@ -179,6 +189,7 @@ class Chat(Element):
         self.allow_resize = allow_resize
 
         self._interval = refresh_interval
+        self._max_interval = max_refresh_interval
 
     @property
     def _js_data(self):
@@ -187,6 +198,7 @@ class Chat(Element):
         d["load_url"] = self.load_url
         d["get_new_url"] = self.get_new_url
         d["get_all_url"] = self.get_all_url
+        d["poll_url"] = self.poll_url
         d["interval"] = self._interval
         d["name"] = self.name
         d["own_nickname"] = self.chat_manager.nickname
@@ -198,13 +210,20 @@ class Chat(Element):
     def added_to_experiment(self, exp):
         super().added_to_experiment(exp)
         self.chat_manager = ChatManager(
-            self.exp, self.chat_id, self.nickname, self.room, self.colors
+            self.exp,
+            self.chat_id,
+            self.nickname,
+            self.room,
+            self.colors,
+            refresh_interval=self._interval,
+            max_refresh_interval=self._max_interval,
         )
 
         self.post_url = self.exp.ui.add_callable(self.chat_manager.post_message)
         self.load_url = self.exp.ui.add_callable(self.chat_manager.load_messages)
         self.get_new_url = self.exp.ui.add_callable(self.chat_manager.get_new_messages)
         self.get_all_url = self.exp.ui.add_callable(self.chat_manager.get_all_messages)
+        self.poll_url = self.exp.ui.add_callable(self.chat_manager.poll_messages)
 
         js = self.js_template.render(self._js_data)
         self.add_js(js)
@@ -226,37 +245,118 @@ class Chat(Element):
         return d
 
 
+class AdaptiveCallback(RepeatedCallback):
+    """
+    A repeated callback that lets the server decide when to call next.
+
+    The callable *func* must return a dictionary with the keys "done"
+    and "next_poll_in". As long as "done" is *False*, the client calls
+    *func* again after "next_poll_in" seconds. Once "done" is *True*,
+    *custom_js* is executed and polling stops.
+
+    Args:
+        func (callable): The callable to be called repeatedly.
+        interval (int, float): Seconds until the first call, and
+            fallback interval if a call fails.
+        custom_js (str): Javascript code to execute once *func*
+            signals that it is done.
+    """
+
+    def __init__(
+        self, func, interval: Union[int, float] = 2, custom_js: str = "", **kwargs
+    ):
+        super().__init__(
+            func=func,
+            interval=interval,
+            followup="custom",
+            custom_js=custom_js,
+            **kwargs,
+        )
+        # RepeatedCallback chooses its template in __init__. The template
+        # receives the same url, interval and custom_js when the parent
+        # renders it in prepare_web_widget.
+        self.js_template = jenv.get_template("js/adaptive_callback.js.j2")
+
+
 class ViewMembers(Element):
+    """
+    Displays a table of all members of a matchmaker.
+
+    The table uses DataTables' server-side processing: Each request
+    asks for one page of members, sorted and filtered as requested by
+    the table. Sorting, filtering and pagination are pushed down into
+    the member query (see :meth:`.MemberManager.monitoring_page`), so
+    that the cost of a refresh does not grow with the number of members.
+    Rendered pages are cached for *cache_timeout* seconds and shared
+    between all admin sessions in the same process.
+
+    Between full draws, the table polls for delta updates every
+    *refresh_interval* seconds (see :meth:`.render_table_changes`).
+    Every row carries a version, which is the time of its last change,
+    and only rows that changed since the previous poll are sent and
+    patched in place.
+
+    Args:
+        match_maker (MatchMaker): The matchmaker to monitor.
+        refresh_interval (int): Seconds between two automatic table
+            refreshes. Defaults to 10.
+        cache_timeout (int, float): Seconds for which a rendered table
+            snapshot is reused. Defaults to 5.
+    """
+
     element_template = jenv.get_template("html/ViewMembersElement.html.j2")
     view_js = jenv.get_template("js/view_members.js.j2")
 
-    def __init__(self, match_maker, refresh_interval: int = 10, **kwargs):
+    #: Cache of rendered table snapshots, shared between instances.
+    #: Maps a cache key to a tuple of (timestamp, snapshot).
+    _snapshots = {}
+    _snapshots_lock = threading.Lock()
+
+    def __init__(
+        self,
+        match_maker,
+        refresh_interval: int = 10,
+        cache_timeout: Union[int, float] = 5,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
         self.match_maker = match_maker
         self.render_url = None
+        self.changes_url = None
         self.refresh_interval = refresh_interval
+        self.cache_timeout = cache_timeout
+
+    #: Maps table columns to the fields of
+    #: :meth:`.MemberManager.monitoring_data` used for sorting. Start
+    #: day and time are sorted by the member's registration time, which
+    #: is available without joining experiment data.
+    columns = {
+        "Session": ["session_id"],
+        "Condition": ["exp_condition"],
+        "Last Page": ["last_move.target_page"],
+        "Start Day": ["created"],
+        "Start Time": ["created"],
+        "Last Move": ["last_move.hide_time"],
+        "Group": ["group_id"],
+        "Role": ["role"],
+        "Status": ["exp_finished", "exp_aborted"],
+        "Last ping": ["ping"],
+    }
+
+    #: Timestamps that mark changes to a member's row
+    _version_keys = ("created", "ping", "match_time", "exp_save_time")
 
     def added_to_experiment(self, exp):
         super().added_to_experiment(exp)
 
         self.render_url = self.exp.ui.add_callable(self.render_table_body)
-        cols = [
-            "Session",
-            "Condition",
-            "Last Page",
-            "Start Day",
-            "Start Time",
-            "Last Move",
-            "Group",
-            "Role",
-            "Status",
-            "Last ping",
-        ]
+        self.changes_url = self.exp.ui.add_callable(self.render_table_changes)
         js = self.view_js.render(
             name=self.name,
             render_url=self.render_url,
+            changes_url=self.changes_url,
             refresh_interval=self.refresh_interval,
-            cols=cols,
+            cols=list(self.columns),
         )
         self.add_js(js)
 
@@ -266,53 +366,260 @@ class ViewMembers(Element):
         d["members"] = self.match_maker.member_manager.members()
         return d
 
-    def _shorten_last_page(self, member) -> str:
-        last_page = member.info.last_page
+    @property
+    def _cache_key(self) -> tuple:
+        mm = self.match_maker
+        return (self.exp.exp_id, mm.exp_version, mm.matchmaker_id)
+
+    def _shorten_last_page(self, last_page: str) -> str:
         if len(last_page) < 20:
             return last_page
         else:
             return last_page[:17] + "..."
 
-    def render_table_body(self):
-        members = self.match_maker.member_manager.members()
-        tbody = []
-        for m in members:
-            if not m.status.matched:
-                last_ping = int(time.time() - m.data.ping)
-                last_ping = f"{last_ping}s ago"
-            else:
-                last_ping = "(already matched)"
-
-            d = {}
-            d["Session"] = m.data.session_id[-4:]
-            d["Condition"] = self._condition_of(m.data.session_id)
-            d["Last Page"] = self._shorten_last_page(m)
-            d["Start Day"] = m.info.start_day
-            d["Start Time"] = m.info.start_time
-            d["Last Move"] = m.info.last_move
-            d["Group"] = m.data.group_id[-4:] if m.data.group_id else "-"
-            d["Role"] = m.data.role
-            d["Status"] = m.status.print_status()
-            d["Last ping"] = last_ping
-            tbody.append(d)
-
-        return {"data": tbody}
-
-    def _condition_of(self, sid: str) -> str:
-        q = {}
-        q["exp_id"] = self.exp.exp_id
-        q["type"] = dm.EXP_DATA
-        q["exp_session_id"] = sid
-
-        pro = {"exp_condition": True}
-        try:
-            doc = self.exp.db_main.find_one(q, projection=pro)
-        except AttributeError:
-            for doc in self.exp.all_exp_data:
-                if doc["exp_session_id"]:
-                    break
-
-        return doc["exp_condition"]
+    def _format_time(self, timestamp: float, format: str = "%H:%M:%S") -> str:
+        if not timestamp:
+            return "None"
+        return time.strftime(format, time.localtime(timestamp))
+
+    def _version(self, data: dict, status: str) -> float:
+        """
+        Returns the time of the last change to a row. Besides the
+        member's and the session's timestamps, this includes the moment
+        of expiration for expired sessions.
+        """
+        times = [data.get(key) for key in self._version_keys]
+
+        if status == "expired":
+            start = data.get("exp_start_time") or data.get("exp_save_time")
+            timeout = data.get("exp_session_timeout", self.exp.session_timeout)
+            times.append(start + timeout)
+
+        return max(t for t in times if t is not None)
+
+    def _row(self, data: dict) -> dict:
+        # rendered client-side as "x seconds ago"
+        last_ping = data["ping"] if not data.get("group_id") else None
+
+        last_move = data.get("last_move")
+        if last_move:
+            last_page = last_move["target_page"]
+            last_move = self._format_time(last_move["hide_time"])
+        else:
+            last_page = "-landing page-"
+            last_move = None
+
+        start = data.get("exp_start_time")
+        status = self.match_maker.member_manager.session_status(data)
+
+        d = {}
+        d["DT_RowId"] = "member-" + data["session_id"]
+        d["version"] = self._version(data, status)
+        d["Session"] = data["session_id"][-4:]
+        d["Condition"] = data.get("exp_condition")
+        d["Last Page"] = self._shorten_last_page(last_page)
+        d["Start Day"] = self._format_time(start, "%Y-%m-%d")
+        d["Start Time"] = self._format_time(start)
+        d["Last Move"] = last_move
+        d["Group"] = data["group_id"][-4:] if data.get("group_id") else "-"
+        d["Role"] = data.get("role")
+        d["Status"] = status
+        d["Last ping"] = last_ping
+        return d
+
+    def _sort(self, kwargs: dict) -> list:
+        columns = list(self.columns)
+        sort = []
+        i = 0
+        while f"order[{i}][column]" in kwargs:
+            column = columns[int(kwargs[f"order[{i}][column]"])]
+            direction = -1 if kwargs.get(f"order[{i}][dir]") == "desc" else 1
+            sort += [(field, direction) for field in self.columns[column]]
+            i += 1
+        return sort
+
+    def _render_snapshot(self, skip, limit, sort, search) -> dict:
+        manager = self.match_maker.member_manager
+        page = manager.monitoring_page(skip, limit, sort, search)
+
+        d = {}
+        d["recordsTotal"] = page["total"]
+        d["recordsFiltered"] = page["filtered"]
+        d["data"] = [self._row(data) for data in page["data"]]
+        return d
+
+    def render_table_body(self, draw=0, start=0, length=-1, **kwargs) -> dict:
+        """
+        Ajax endpoint for DataTables' server-side processing.
+
+        Args:
+            draw: Request counter, echoed back to the table.
+            start: Index of the first member on the requested page.
+            length: Number of members on the requested page. -1 means
+                all members.
+            **kwargs: Further DataTables parameters. Ordering is read
+                from ``order[i][column]`` and ``order[i][dir]``, the
+                search value from ``search[value]``.
+        """
+        skip = int(start)
+        limit = None if int(length) < 0 else int(length)
+        sort = self._sort(kwargs)
+        search = kwargs.get("search[value]") or None
+
+        timestamp, snapshot = self._snapshot(skip, limit, sort, search)
+        return dict(snapshot, draw=int(draw), cursor=timestamp)
+
+    def render_table_changes(self, cursor=0, start=0, length=-1, **kwargs) -> dict:
+        """
+        Ajax endpoint for delta updates of the current table page.
+
+        Takes the same parameters as :meth:`.render_table_body` plus a
+        *cursor*, which is the value of "cursor" in the previous
+        response. Returns only the rows that changed since then.
+
+        Returns:
+            dict: A dictionary with the keys "cursor" (the new cursor),
+            "ids" (row ids of the whole page in order, so that the client
+            can detect added, removed or reordered rows) and "data"
+            (rows that changed since *cursor*).
+        """
+        skip = int(start)
+        limit = None if int(length) < 0 else int(length)
+        sort = self._sort(kwargs)
+        search = kwargs.get("search[value]") or None
+
+        timestamp, snapshot = self._snapshot(skip, limit, sort, search)
+        cursor = float(cursor)
+
+        d = {}
+        d["cursor"] = timestamp
+        d["ids"] = [row["DT_RowId"] for row in snapshot["data"]]
+        d["data"] = [row for row in snapshot["data"] if row["version"] > cursor]
+        return d
+
+    def _snapshot(self, skip, limit, sort, search) -> tuple:
+        """
+        Returns a tuple of (timestamp, snapshot) from the cache, rendering
+        a new snapshot if necessary. The timestamp is taken before
+        rendering, so that every later change has a newer version.
+        """
+        key = (self._cache_key, skip, limit, tuple(sort), search)
+
+        with self._snapshots_lock:
+            now = time.time()
+            cached = self._snapshots.get(key)
+            if cached and now - cached[0] < self.cache_timeout:
+                return cached
+
+            snapshot = self._render_snapshot(skip, limit, sort, search)
+            self._prune_snapshots(now)
+            self._snapshots[key] = (now, snapshot)
+
+        return now, snapshot
+
+    def _prune_snapshots(self, now: float):
+        expired = [
+            key
+            for key, (timestamp, _) in self._snapshots.items()
+            if now - timestamp >= self.cache_timeout
+        ]
+        for key in expired:
+            del self._snapshots[key]
+
+
+class ViewMetrics(Element):
+    """
+    Displays the metrics recorded by a matchmaker, see
+    :class:`.MatchMakerMetrics`. Times are given in seconds.
+
+    Args:
+        match_maker (MatchMaker): The matchmaker to monitor.
+    """
+
+    element_template = jenv.get_template("html/ViewMetricsElement.html.j2")
+
+    def __init__(self, match_maker, **kwargs):
+        super().__init__(**kwargs)
+        self.match_maker = match_maker
+
+    @staticmethod
+    def _format(value: float) -> str:
+        return "-" if value is None else f"{value:.3f}"
+
+    @property
+    def template_data(self):
+        d = super().template_data
+        metrics = self.match_maker.metrics.load()
+
+        histograms = []
+        for name, hist in sorted(metrics["histograms"].items()):
+            row = {}
+            row["name"] = name
+            row["count"] = hist.count
+            row["mean"] = self._format(hist.mean)
+            row["p50"] = self._format(hist.quantile(0.5))
+            row["p95"] = self._format(hist.quantile(0.95))
+            row["p99"] = self._format(hist.quantile(0.99))
+            histograms.append(row)
+
+        d["histograms"] = histograms
+        d["counters"] = sorted(metrics["counters"].items())
+        return d
+
+
+class ViewOperations(Element):
+    """
+    Displays the database and file operations recorded by
+    :data:`.instrument.recorder`, sorted by total latency.
+
+    On being added to the experiment, the element registers two
+    callables: :attr:`.prometheus_url` returns the recorded operations
+    as Prometheus exposition text, :attr:`.json_url` returns them as a
+    list of dictionaries (see :meth:`.OperationRecorder.dump`). Since
+    the element is meant for admin pages, the callables are only
+    available to admin sessions. Like all callables, both responses are
+    JSON-encoded, i.e. the exposition text is delivered as a JSON
+    string.
+
+    Args:
+        limit (int): Maximum number of displayed operations. Defaults
+            to 50.
+    """
+
+    element_template = jenv.get_template("html/ViewOperationsElement.html.j2")
+
+    def __init__(self, limit: int = 50, **kwargs):
+        super().__init__(**kwargs)
+        self.limit = limit
+        self.prometheus_url = None
+        self.json_url = None
+
+    def added_to_experiment(self, exp):
+        super().added_to_experiment(exp)
+        self.prometheus_url = self.exp.ui.add_callable(recorder.prometheus)
+        self.json_url = self.exp.ui.add_callable(recorder.dump)
+
+    @staticmethod
+    def _format(value: float) -> str:
+        return "-" if value is None else f"{value * 1000:.1f}"
+
+    @property
+    def template_data(self):
+        d = super().template_data
+        rows = []
+        for op in recorder.dump()[: self.limit]:
+            row = dict(op)
+            for key in ("seconds_total", "seconds_mean", "seconds_p95"):
+                row[key] = self._format(op[key])
+            rows.append(row)
+
+        d["operations"] = rows
+        d["enabled"] = recorder.enabled or self.exp.config.getboolean(
+            "interact", "instrument", fallback=False
+        )
+        d["prometheus_url"] = self.prometheus_url
+        d["json_url"] = self.json_url
+        return d
 
 
 class ToggleMatchMakerActivation(Element):
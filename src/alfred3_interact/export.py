@@ -0,0 +1,745 @@
+"""
+Streaming export of group data.
+
+The exporter joins groups, roles, members and the members' flattened
+experiment values and writes one row per group member to a JSON Lines
+or CSV file. Groups are processed in chunks: for each chunk, member data
+and experiment data are loaded with one query each. Rows are streamed
+to the output file, so memory use does not grow with the size of the
+study. Chunks can be processed in parallel.
+
+Usage as a function in an experiment session::
+
+    from alfred3_interact.export import export_groups
+
+    export_groups(exp, "groups.csv")
+
+Usage from the command line, with the experiment's secrets.conf::
+
+    $ python -m alfred3_interact.export --secrets secrets.conf \\
+        --exp-id my_experiment groups.jsonl
+
+or for a local experiment::
+
+    $ python -m alfred3_interact.export --data-dir save/exp \\
+        --interact-dir save/interact --exp-id my_experiment groups.csv
+
+Chat transcripts are exported with :func:`.export_chats`, or with the
+option ``--chats`` on the command line. Chats are only saved in MongoDB.
+Encrypted messages are decrypted in batches, optionally in a pool of
+worker processes::
+
+    $ python -m alfred3_interact.export --secrets secrets.conf \\
+        --exp-id my_experiment --chats --workers 4 chats.jsonl
+
+"""
+
+import configparser
+import csv
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List
+
+import click
+from alfred3.data_manager import DataManager as dm
+from cryptography.fernet import Fernet, InvalidToken
+
+from ._util import saving_method
+from .index import directory_index
+from .instrument import db_main, db_misc
+
+#: Data type of group documents
+GROUP_TYPE = "match_group"
+
+#: Data type of matchmaker documents
+MATCHMAKER_TYPE = "match_maker_data"
+
+#: Data type of chat documents
+CHAT_TYPE = "chat_data"
+
+#: Leading columns of every exported row
+COLUMNS = (
+    "exp_id",
+    "exp_version",
+    "group_id",
+    "spec_name",
+    "group_type",
+    "group_active",
+    "group_timestamp",
+    "role",
+    "session_id",
+    "matchmaker_id",
+    "member_created",
+    "member_match_time",
+    "exp_condition",
+    "exp_start_time",
+    "exp_save_time",
+    "exp_finished",
+    "exp_aborted",
+    "export_error",
+)
+
+#: Columns of exported chat messages in CSV format
+CHAT_COLUMNS = (
+    "exp_id",
+    "chat_id",
+    "room",
+    "chat_group_id",
+    "group_id",
+    "role",
+    "sender_session_id",
+    "nickname",
+    "timestamp",
+    "msg",
+)
+
+#: Marker that alfred3-interact appends to a chat id for individual rooms
+_ROOM = "_room-"
+
+#: Top-level fields that are not exported as values
+_EXCLUDED = set(dm._client_data_keys) | set(dm._metadata_keys)
+
+log = logging.getLogger(__name__)
+
+
+class MongoSource:
+    """
+    Reads group, member and experiment data from MongoDB.
+
+    Args:
+        main: Main collection, containing experiment data.
+        misc: Miscellaneous collection, containing group and matchmaker
+            data.
+        exp_id (str): Experiment id.
+        exp_version (str): Experiment version. Defaults to *None*, in
+            which case groups of all versions are exported.
+    """
+
+    def __init__(self, main, misc, exp_id: str, exp_version: str = None):
+        self.main = main
+        self.misc = misc
+        self.exp_id = exp_id
+        self.exp_version = exp_version
+
+    @classmethod
+    def from_secrets(cls, path, exp_id: str, exp_version: str = None):
+        """
+        Connects to the database configured in the section
+        ``[mongo_saving_agent]`` of an experiment's *secrets.conf*.
+        """
+        from pymongo import MongoClient
+
+        config = configparser.ConfigParser(inline_comment_prefixes=("#",))
+        config.read(path, encoding="utf-8")
+        section = config["mongo_saving_agent"]
+
+        kwargs = {}
+        kwargs["host"] = section.get("host", "localhost")
+        kwargs["port"] = section.getint("port", 27017)
+        if section.get("user"):
+            kwargs["username"] = section.get("user")
+            kwargs["password"] = section.get("password")
+            kwargs["authSource"] = section.get("auth_source", "admin")
+        if section.getboolean("use_ssl", fallback=False):
+            kwargs["tls"] = True
+            kwargs["tlsCAFile"] = section.get("ca_file_path") or None
+
+        db = MongoClient(**kwargs)[section.get("database")]
+        main = db[section.get("collection")]
+        misc = db[section.get("misc_collection") or section.get("collection")]
+        return cls(main, misc, exp_id, exp_version)
+
+    def groups(self) -> Iterator[dict]:
+        q = {"type": GROUP_TYPE, "exp_id": self.exp_id}
+        if self.exp_version is not None:
+            q["exp_version"] = self.exp_version
+        p = {"_id": False, "shared_data": False}
+        return self.misc.find(q, projection=p, batch_size=1000)
+
+    def members(self, sessions: List[str]) -> dict:
+        q = {"type": MATCHMAKER_TYPE, "exp_id": self.exp_id}
+        p = {f"members.{sid}": True for sid in sessions}
+        p.update({"_id": False, "matchmaker_id": True})
+
+        members = {}
+        for data in self.misc.find(q, projection=p):
+            for sid, mdata in data.get("members", {}).items():
+                members[(data["matchmaker_id"], sid)] = mdata
+        return members
+
+    def expdata(self, sessions: List[str]) -> Iterator[dict]:
+        q = {"type": dm.EXP_DATA, "exp_id": self.exp_id}
+        q["exp_session_id"] = {"$in": list(sessions)}
+        p = {"_id": False}
+        p.update({key: False for key in dm._client_data_keys})
+        return self.main.find(q, projection=p)
+
+    def chats(self) -> Iterator[dict]:
+        q = {"type": CHAT_TYPE, "exp_id": self.exp_id}
+        p = {"_id": False}
+        return self.misc.find(q, projection=p, sort=[("chat_id", 1)], batch_size=100)
+
+    def memberships(self, sessions: List[str]) -> dict:
+        """
+        Returns a dictionary of session ids and lists of (group id, role)
+        tuples for all groups that the sessions are members of.
+        """
+        q = {"type": GROUP_TYPE, "exp_id": self.exp_id}
+        q["members"] = {"$in": list(sessions)}
+        if self.exp_version is not None:
+            q["exp_version"] = self.exp_version
+        p = {"_id": False, "group_id": True, "roles": True}
+
+        memberships = {}
+        for data in self.misc.find(q, projection=p):
+            for role, sid in data["roles"].items():
+                if sid is not None:
+                    memberships.setdefault(sid, []).append((data["group_id"], role))
+        return memberships
+
+    @staticmethod
+    def key_from_secrets(path) -> str:
+        """
+        Returns the encryption key from the section ``[encryption]`` of
+        an experiment's *secrets.conf*, falling back to the environment
+        variable *ALFRED_ENCRYPTION_KEY* like alfred3 does.
+        """
+        config = configparser.ConfigParser(inline_comment_prefixes=("#",))
+        config.read(path, encoding="utf-8")
+        key = config.get("encryption", "key", fallback=None)
+        return _clean_key(key or os.environ.get("ALFRED_ENCRYPTION_KEY"))
+
+
+class LocalSource:
+    """
+    Reads group, member and experiment data from the files of a local
+    experiment.
+
+    Args:
+        data_dir: Directory of the local saving agent, containing
+            experiment data.
+        interact_dir: Directory containing group and matchmaker data
+            (``[interact] path`` in config.conf).
+        exp_id (str): Experiment id.
+        exp_version (str): Experiment version. Defaults to *None*, in
+            which case groups of all versions are exported.
+    """
+
+    def __init__(self, data_dir, interact_dir, exp_id: str, exp_version: str = None):
+        self.data_dir = Path(data_dir)
+        self.interact_dir = Path(interact_dir)
+        self.exp_id = exp_id
+        self.exp_version = exp_version
+
+    def _documents(self, data_type: str) -> Iterator[dict]:
+        for path in sorted(self.interact_dir.glob("*.json")):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("type") == data_type and data.get("exp_id") == self.exp_id:
+                yield data
+
+    def groups(self) -> Iterator[dict]:
+        for data in self._documents(GROUP_TYPE):
+            if self.exp_version is None or data["exp_version"] == self.exp_version:
+                yield data
+
+    def members(self, sessions: List[str]) -> dict:
+        sessions = set(sessions)
+        members = {}
+        for data in self._documents(MATCHMAKER_TYPE):
+            for sid, mdata in data["members"].items():
+                if sid in sessions:
+                    members[(data["matchmaker_id"], sid)] = mdata
+        return members
+
+    def expdata(self, sessions: List[str]) -> Iterator[dict]:
+        for data in directory_index(self.data_dir).load_many(sessions):
+            if data.get("exp_id") == self.exp_id:
+                yield data
+
+
+def source_from_exp(exp):
+    """
+    Returns the source of group data for an experiment session.
+    """
+    if saving_method(exp) == "mongo":
+        return MongoSource(db_main(exp), db_misc(exp), exp.exp_id)
+
+    elif saving_method(exp) == "local":
+        data_dir = exp.subpath(exp.config.get("local_saving_agent", "path"))
+        interact = exp.config.get("interact", "path", fallback="save/interact")
+        return LocalSource(data_dir, exp.subpath(interact), exp.exp_id)
+
+
+def _clean_key(key: str) -> str:
+    return key.strip().strip("\"'") if key else None
+
+
+def encryption_key(exp) -> str:
+    """
+    Returns the key that an experiment session uses to encrypt data, or
+    *None*.
+    """
+    key = exp.secrets.get("encryption", "key", fallback=None)
+    return _clean_key(key or os.environ.get("ALFRED_ENCRYPTION_KEY"))
+
+
+def _flat_values(data: dict) -> dict:
+    data = {k: v for k, v in data.items() if k not in _EXCLUDED}
+    data.setdefault("exp_data", {})
+    return dm.flatten(data)
+
+
+def _raw_values(data: dict) -> dict:
+    """
+    Fallback for experiment data that cannot be flattened. Exports the
+    top-level fields as they are, with nested values serialized as JSON.
+    """
+    values = {}
+    for key, value in data.items():
+        if key in _EXCLUDED or key == "_id":
+            continue
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, default=str)
+        values[key] = value
+    return values
+
+
+def _join(source, groups: List[dict]) -> List[dict]:
+    """
+    Joins a chunk of groups with member and experiment data. Returns one
+    row per filled role.
+    """
+    sessions = [sid for g in groups for sid in g["roles"].values() if sid]
+    members = source.members(sessions)
+    expdata = {d["exp_session_id"]: d for d in source.expdata(sessions)}
+
+    rows = []
+    for group in groups:
+        for role, sid in group["roles"].items():
+            if sid is None:
+                continue
+
+            member = members.get((group["matchmaker_id"], sid), {})
+            data = expdata.get(sid, {})
+
+            row = {}
+            row["exp_id"] = group["exp_id"]
+            row["exp_version"] = group["exp_version"]
+            row["group_id"] = group["group_id"]
+            row["spec_name"] = group["spec_name"]
+            row["group_type"] = group["group_type"]
+            row["group_active"] = group["active"]
+            row["group_timestamp"] = group["timestamp"]
+            row["role"] = role
+            row["session_id"] = sid
+            row["matchmaker_id"] = group["matchmaker_id"]
+            row["member_created"] = member.get("created")
+            row["member_match_time"] = member.get("match_time")
+            row["exp_condition"] = data.get("exp_condition")
+            row["exp_start_time"] = data.get("exp_start_time")
+            row["exp_save_time"] = data.get("exp_save_time")
+            row["exp_finished"] = data.get("exp_finished")
+            row["exp_aborted"] = data.get("exp_aborted")
+            row["export_error"] = None
+
+            try:
+                values = _flat_values(data) if data else {}
+            except (AttributeError, KeyError, TypeError) as e:
+                log.warning(
+                    f"Experiment data of session {sid} could not be flattened"
+                    f" and is exported unflattened: {e!r}"
+                )
+                row["export_error"] = f"{type(e).__name__}: {e}"
+                values = _raw_values(data)
+
+            row.update({k: v for k, v in values.items() if k not in row})
+            rows.append(row)
+
+    return rows
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def rows(source, chunk_size: int = 500, workers: int = 1) -> Iterator[dict]:
+    """
+    Yields one row per group member.
+
+    Args:
+        source: :class:`.MongoSource` or :class:`.LocalSource`.
+        chunk_size (int): Number of groups that are joined at once.
+        workers (int): Number of chunks that are joined in parallel.
+            Rows are yielded in the order of the groups in any case. At
+            most ``2 * workers`` chunks are held in memory.
+    """
+    chunks = _chunks(source.groups(), chunk_size)
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _join(source, chunk)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for chunk in chunks:
+            pending.append(executor.submit(_join, source, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.pop(0).result()
+
+        for future in pending:
+            yield from future.result()
+
+
+def _split_chat_id(chat_id: str) -> tuple:
+    base, sep, room = chat_id.partition(_ROOM)
+    return base, room if sep else None
+
+
+def _decrypt_batch(key: str, messages: List[str]) -> List[str]:
+    """
+    Decrypts a batch of messages. Messages that are not encrypted with
+    *key* are returned unchanged, because chats can be unencrypted. Runs
+    in a worker process, so it receives the key instead of a Fernet
+    instance.
+    """
+    if key is None:
+        return messages
+
+    fernet = Fernet(key.encode())
+    decrypted = []
+    for msg in messages:
+        try:
+            decrypted.append(fernet.decrypt(msg.encode()).decode())
+        except (InvalidToken, AttributeError, TypeError):
+            decrypted.append(msg)
+    return decrypted
+
+
+def _chat_messages(chats: List[dict]) -> List[str]:
+    return [msg.get("msg") for chat in chats for msg in chat.get("messages", [])]
+
+
+def _transcripts(source, chats: List[dict], decrypted: List[str]) -> List[dict]:
+    """
+    Attaches the decrypted messages of a chunk of chats and the senders'
+    groups and roles. Returns one transcript per chat.
+    """
+    sessions = {
+        msg["sender_session_id"] for chat in chats for msg in chat.get("messages", [])
+    }
+    memberships = source.memberships(sessions)
+    decrypted = iter(decrypted)
+
+    transcripts = []
+    for chat in chats:
+        chat_id, room = _split_chat_id(chat["chat_id"])
+        messages = chat.get("messages", [])
+        senders = {msg["sender_session_id"] for msg in messages}
+
+        # By default, a group chat uses the group id as chat id
+        groups = {g for sid in senders for g, _ in memberships.get(sid, [])}
+        chat_group_id = chat_id if chat_id in groups else None
+
+        transcript = {}
+        transcript["exp_id"] = chat["exp_id"]
+        transcript["chat_id"] = chat_id
+        transcript["room"] = room
+        transcript["chat_group_id"] = chat_group_id
+        transcript["messages"] = []
+
+        for msg in messages:
+            sid = msg["sender_session_id"]
+            entries = memberships.get(sid, [])
+            matching = [e for e in entries if e[0] == chat_group_id] or entries
+            group_id, role = matching[0] if len(matching) == 1 else (None, None)
+
+            m = {}
+            m["timestamp"] = msg.get("timestamp")
+            m["sender_session_id"] = sid
+            m["group_id"] = group_id
+            m["role"] = role
+            m["nickname"] = msg.get("nickname")
+            m["msg"] = next(decrypted)
+            transcript["messages"].append(m)
+
+        transcripts.append(transcript)
+
+    return transcripts
+
+
+def transcripts(
+    source, key: str = None, chunk_size: int = 100, workers: int = 1
+) -> Iterator[dict]:
+    """
+    Yields one transcript per chat, in the order of the chat ids. Rooms
+    of a chat are separate transcripts.
+
+    Args:
+        source: :class:`.MongoSource`.
+        key (str): Encryption key of the experiment. Defaults to *None*,
+            in which case messages are not decrypted.
+        chunk_size (int): Number of chats whose messages are decrypted
+            as one batch.
+        workers (int): Number of worker processes for decryption.
+            Transcripts are yielded in order in any case. At most
+            ``2 * workers`` chunks are held in memory.
+    """
+    chunks = _chunks(source.chats(), chunk_size)
+
+    if workers <= 1:
+        for chunk in chunks:
+            decrypted = _decrypt_batch(key, _chat_messages(chunk))
+            yield from _transcripts(source, chunk, decrypted)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for chunk in chunks:
+            future = executor.submit(_decrypt_batch, key, _chat_messages(chunk))
+            pending.append((chunk, future))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.pop(0)
+                yield from _transcripts(source, chunk, future.result())
+
+        for chunk, future in pending:
+            yield from _transcripts(source, chunk, future.result())
+
+
+def _write_jsonl(rows: Iterable[dict], path, progress: Callable) -> int:
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + "\n")
+            n += 1
+            if progress and n % 1000 == 0:
+                progress(n)
+    return n
+
+
+def _write_csv(rows: Iterable[dict], path, progress: Callable) -> int:
+    # The columns are only known after all rows are seen. Rows are
+    # spooled to a temporary JSON Lines file first, so that only the
+    # column names are held in memory.
+    path = Path(path)
+    columns = dict.fromkeys(COLUMNS)
+
+    def collect():
+        for row in rows:
+            columns.update(dict.fromkeys(row))
+            yield row
+
+    fd, tmp = tempfile.mkstemp(suffix=".jsonl", dir=path.parent)
+    os.close(fd)
+    try:
+        n = _write_jsonl(collect(), tmp, progress)
+
+        with (
+            open(tmp, encoding="utf-8") as src,
+            open(path, "w", encoding="utf-8", newline="") as f,
+        ):
+            writer = csv.DictWriter(f, fieldnames=list(columns))
+            writer.writeheader()
+            for line in src:
+                writer.writerow(json.loads(line))
+    finally:
+        os.remove(tmp)
+
+    return n
+
+
+def export_groups(
+    source,
+    path,
+    format: str = None,
+    chunk_size: int = 500,
+    workers: int = 1,
+    progress: Callable = None,
+) -> int:
+    """
+    Exports one row per group member to a JSON Lines or CSV file.
+
+    Each row contains the columns in :data:`.COLUMNS`, followed by the
+    member's flattened input values and additional data. If a member's
+    experiment data cannot be flattened, a warning is logged, the column
+    "export_error" describes the error and the data is exported with
+    nested values as JSON strings.
+
+    Args:
+        source: An experiment session, :class:`.MongoSource` or
+            :class:`.LocalSource`.
+        path: Path of the output file.
+        format (str): "jsonl" or "csv". Defaults to *None*, in which
+            case the format is derived from the file suffix.
+        chunk_size (int): Number of groups that are joined at once.
+        workers (int): Number of chunks that are joined in parallel.
+        progress (callable): Function that is called with the number of
+            exported rows every 1000 rows.
+
+    Returns:
+        int: Number of exported rows.
+    """
+    if not hasattr(source, "groups"):
+        source = source_from_exp(source)
+
+    format = format or Path(path).suffix.lstrip(".").lower()
+    data = rows(source, chunk_size=chunk_size, workers=workers)
+
+    if format in ("jsonl", "json"):
+        return _write_jsonl(data, path, progress)
+    elif format == "csv":
+        return _write_csv(data, path, progress)
+    else:
+        raise ValueError(f"Unknown export format '{format}'. Use 'jsonl' or 'csv'.")
+
+
+def _write_chats_csv(transcripts: Iterable[dict], path, progress: Callable) -> int:
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(CHAT_COLUMNS))
+        writer.writeheader()
+        for transcript in transcripts:
+            chat = {k: v for k, v in transcript.items() if k != "messages"}
+            for msg in transcript["messages"]:
+                writer.writerow({**chat, **msg})
+            n += 1
+            if progress and n % 100 == 0:
+                progress(n)
+    return n
+
+
+def export_chats(
+    source,
+    path,
+    key: str = None,
+    format: str = None,
+    chunk_size: int = 100,
+    workers: int = 1,
+    progress: Callable = None,
+) -> int:
+    """
+    Exports chat transcripts to a JSON Lines or CSV file.
+
+    In JSON Lines format, each line holds one transcript with the keys
+    "exp_id", "chat_id", "room", "chat_group_id" and "messages". In CSV
+    format, each row holds one message with the columns in
+    :data:`.CHAT_COLUMNS`. Every message carries the sender's group id
+    and role, if the sender is a member of a group.
+
+    Args:
+        source: An experiment session or :class:`.MongoSource`.
+        path: Path of the output file.
+        key (str): Encryption key. Defaults to *None*, in which case the
+            key of the experiment session is used, if *source* is a
+            session. Otherwise, messages are not decrypted.
+        format (str): "jsonl" or "csv". Defaults to *None*, in which
+            case the format is derived from the file suffix.
+        chunk_size (int): Number of chats whose messages are decrypted
+            as one batch.
+        workers (int): Number of worker processes for decryption.
+        progress (callable): Function that is called with the number of
+            exported chats every 100 chats.
+
+    Returns:
+        int: Number of exported chats.
+    """
+    if not hasattr(source, "groups"):
+        key = key or encryption_key(source)
+        source = source_from_exp(source)
+
+    if not hasattr(source, "chats"):
+        raise ValueError("Chats are only saved in MongoDB. Use a MongoSource.")
+
+    format = format or Path(path).suffix.lstrip(".").lower()
+    data = transcripts(source, key=key, chunk_size=chunk_size, workers=workers)
+
+    if format in ("jsonl", "json"):
+        return _write_jsonl(data, path, progress)
+    elif format == "csv":
+        return _write_chats_csv(data, path, progress)
+    else:
+        raise ValueError(f"Unknown export format '{format}'. Use 'jsonl' or 'csv'.")
+
+
+@click.command()
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--exp-id", required=True, help="Experiment id")
+@click.option("--exp-version", default=None, help="Export only this version")
+@click.option("--secrets", type=click.Path(exists=True), help="Path to secrets.conf")
+@click.option("--data-dir", type=click.Path(exists=True), help="Local data directory")
+@click.option("--interact-dir", type=click.Path(exists=True), help="Local group data")
+@click.option("--format", "format_", type=click.Choice(["jsonl", "csv"]))
+@click.option("--chunk-size", type=int, help="Groups (500) or chats (100) at once")
+@click.option("--workers", default=1, help="Chunks processed in parallel")
+@click.option("--chats", is_flag=True, help="Export chat transcripts")
+@click.option("--key", default=None, help="Encryption key for chat messages")
+def main(
+    output,
+    exp_id,
+    exp_version,
+    secrets,
+    data_dir,
+    interact_dir,
+    format_,
+    chunk_size,
+    workers,
+    chats,
+    key,
+):
+    """Export group data or chats of an alfred3-interact experiment."""
+    if chats:
+        if not secrets:
+            raise click.UsageError("Chats are only saved in MongoDB. Use --secrets.")
+
+        source = MongoSource.from_secrets(secrets, exp_id, exp_version)
+        key = key or MongoSource.key_from_secrets(secrets)
+
+        def progress(n):
+            click.echo(f"{n} chats exported", err=True)
+
+        n = export_chats(
+            source,
+            output,
+            key=key,
+            format=format_,
+            chunk_size=chunk_size or 100,
+            workers=workers,
+            progress=progress,
+        )
+        click.echo(f"Exported {n} chats to {output}", err=True)
+        return
+
+    if secrets:
+        source = MongoSource.from_secrets(secrets, exp_id, exp_version)
+    elif data_dir and interact_dir:
+        source = LocalSource(data_dir, interact_dir, exp_id, exp_version)
+    else:
+        raise click.UsageError("Use --secrets or --data-dir and --interact-dir.")
+
+    def progress(n):
+        click.echo(f"{n} rows exported", err=True)
+
+    n = export_groups(
+        source,
+        output,
+        format=format_,
+        chunk_size=chunk_size or 500,
+        workers=workers,
+        progress=progress,
+    )
+    click.echo(f"Exported {n} rows to {output}", err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,8 @@ import json
 import random
 import time
 from collections import UserDict
+from contextlib import nullcontext
 from dataclasses import asdict, dataclass, field
-from itertools import chain
 from pathlib import Path
 from traceback import format_exception
 from typing import Iterator, List
@@ -15,8 +15,16 @@ from uuid import uuid4
 
 from pymongo.collection import ReturnDocument
 
-from ._util import BusyGroup, MatchingError, saving_method
+from ._util import (
+    BusyGroup,
+    ChangeTracking,
+    MatchingError,
+    SharedDataConflict,
+    request_cache,
+    saving_method,
+)
 from .element import Chat
+from .instrument import db_misc, open_file
 from .member import GroupMember, MemberManager
 
 
@@ -26,7 +34,7 @@ class GroupType:
 
 
 @dataclass
-class GroupData:
+class GroupData(ChangeTracking):
     exp_id: str
     exp_version: str
     matchmaker_id: str
@@ -39,9 +47,54 @@ class GroupData:
     active: bool = True
     busy: str = "false"
     shared_data: dict = field(default_factory=dict)
+    barriers: dict = field(default_factory=dict)
     type: str = "match_group"
 
 
+@dataclass
+class GroupStatus:
+    """
+    Snapshot of the status of a group's members. Created by
+    :meth:`.GroupMemberManager.snapshot`.
+    """
+
+    #: Roles and session ids
+    roles: dict
+    #: Session ids of all members
+    members: list
+    #: Session ids and status data, see :meth:`.MemberManager.load_statuses`
+    sessions: dict
+
+    def status_of(self, session_id: str) -> str:
+        return self.sessions.get(session_id, {}).get("status")
+
+    def by_role(self) -> dict:
+        return {
+            role: self.status_of(sid) if sid is not None else None
+            for role, sid in self.roles.items()
+        }
+
+    def sessions_with(self, status: str) -> List[str]:
+        return [sid for sid in self.members if self.status_of(sid) == status]
+
+    def roles_with(self, *statuses: str) -> List[str]:
+        return [
+            role
+            for role, sid in self.roles.items()
+            if sid in self.members and self.status_of(sid) in statuses
+        ]
+
+    def save_time(self, session_id: str) -> float:
+        return self.sessions.get(session_id, {}).get("exp_save_time")
+
+    def matches(self, data: GroupData) -> bool:
+        """
+        Indicates whether the snapshot was taken of the current roles
+        and members of *data*.
+        """
+        return self.roles == data.roles and self.members == list(data.members)
+
+
 class SharedGroupData(UserDict):
     """
     Shared group data dictionary.
@@ -50,60 +103,380 @@ class SharedGroupData(UserDict):
     Its benefit is that it synchronises data to a database.
     This way, the data is always automatically shared between all group
     members.
+
+    Getting an item reads only this item from the database. Setting or
+    deleting an item writes only this item, so that concurrent changes
+    of other items by other members are preserved. Every write
+    increments a version counter, which allows for a cheap check
+    whether anything changed (see :meth:`.changed`).
+
+    Several changes can be written as one atomic update with
+    :meth:`.batch` or :meth:`.transaction`. Counters, lists and turn
+    variables can be changed without conflicts through the atomic
+    operations :meth:`.increment`, :meth:`.append` and
+    :meth:`.compare_and_set`.
     """
 
     _ACCEPTED = (int, float, str, tuple, bool)
 
-    def __init__(self, *args, group, **kwargs):
-        super().__init__(*args, **kwargs)
+    #: Key of the version counter
+    VERSION = "__version"
+
+    def __init__(self, group):
         self.group = group
-        self._db = self.group.exp.db_misc
+        self.saving_method = saving_method(self.group.exp)
+        self._last_access = None
+        self._batch = None
+        self.data["__group_id"] = self.group.data.group_id
 
-        if self.group.data.shared_data:
-            self.data = self.group.data.shared_data
+    @property
+    def data(self) -> dict:
+        # The dictionary is shared with the group data, so that it
+        # stays up to date when the group data is reloaded.
+        return self.group.data.shared_data
 
-        self.data["__group_id"] = self.group.data.group_id
+    @data.setter
+    def data(self, value: dict):
+        self.group.data.shared_data = value
 
-    def _push_remote(self):
-        doc = self._db.find_one_and_update(
-            filter={"group_id": self.group.data.group_id},
-            update={"$set": {"shared_data": self.data}},
-            projection={"shared_data": True, "_id": False},
-            return_document=ReturnDocument.AFTER,
-        )
-        if doc is not None:
-            self.data = doc["shared_data"]
+    @property
+    def _db(self):
+        return db_misc(self.group.exp)
+
+    @property
+    def _query(self) -> dict:
+        return {"group_id": self.group.data.group_id}
+
+    @property
+    def version(self) -> int:
+        """
+        int: Version of the shared data, as of the last read or write
+        of this session.
+        """
+        return self.data.get(self.VERSION, 0)
+
+    def changed(self) -> bool:
+        """
+        Indicates whether the shared data changed since the last read or
+        write of this session. Reads only the version counter.
+        """
+        if self.saving_method == "mongo":
+            p = {"_id": False, f"shared_data.{self.VERSION}": True}
+            doc = self._db.find_one(self._query, projection=p)
+            shared = doc.get("shared_data", {}) if doc else {}
+        elif self.saving_method == "local":
+            shared = self._load_local()
+
+        return shared.get(self.VERSION, 0) != self.version
+
+    def batch(self, on_conflict: str = "merge") -> "SharedDataBatch":
+        """
+        Returns a context manager that buffers sets and deletes and
+        writes them as one atomic update when the block is left without
+        an exception.
+
+        A batch that is started inside another batch of the same shared
+        data joins the outer batch, so that its changes are written when
+        the outer batch is left. The conflict check of the outer batch
+        covers the changes of the inner one.
+
+        Args:
+            on_conflict (str): What to do, if another session changed
+                the shared data since this session last read or wrote
+                it. "merge" writes the buffered items anyway, i.e. the
+                last write wins for every buffered item; items that were
+                not changed in the block are preserved. "raise" discards
+                the changes and raises :class:`.SharedDataConflict`.
+                Defaults to "merge".
 
-    def _fetch_remote(self):
-        doc = self._db.find_one(
-            filter={"group_id": self.group.data.group_id},
-            projection={"shared_data": True, "_id": False},
+        Raises:
+            ValueError: If *on_conflict* is "raise" inside a batch with
+                *on_conflict* "merge", because the outer batch would
+                write the changes without checking for conflicts. This
+                includes calls of :meth:`.transaction`.
+
+        Examples:
+
+            ::
+
+                with group.shared_data.batch():
+                    group.shared_data["a"] = 1
+                    group.shared_data["b"] = 2
+
+        """
+        if self._batch is None:
+            return SharedDataBatch(self, on_conflict=on_conflict)
+
+        if on_conflict not in SharedDataBatch.POLICIES:
+            raise ValueError("Parameter 'on_conflict' must be 'merge' or 'raise'.")
+
+        if on_conflict == "raise" and self._batch.on_conflict == "merge":
+            raise ValueError(
+                "Cannot start a batch with on_conflict='raise' inside a batch with"
+                " on_conflict='merge', which would not detect conflicts."
+            )
+
+        return nullcontext(self)
+
+    def transaction(self, func, attempts: int = 5):
+        """
+        Calls ``func(shared_data)`` in a batch and commits its changes
+        only if no other session changed the shared data in the
+        meantime. On a conflict, the shared data is read again and
+        *func* is retried.
+
+        Inside a :meth:`.batch` with *on_conflict* "raise", *func* is
+        called once and the changes are committed and checked with the
+        outer batch. Inside a batch with *on_conflict* "merge", a
+        transaction raises :class:`ValueError`.
+
+        Args:
+            func (callable): Function that reads and changes the shared
+                data. It may be called several times.
+            attempts (int): Maximum number of calls of *func*.
+
+        Returns:
+            The return value of the successful call of *func*.
+
+        Raises:
+            SharedDataConflict: If all attempts conflicted.
+
+        Examples:
+
+            ::
+
+                def move(data):
+                    data["stack"] = data["stack"] + (data["turn"],)
+                    data["turn"] += 1
+
+                group.shared_data.transaction(move)
+
+        """
+        for _ in range(attempts):
+            self._fetch()
+            try:
+                with self.batch(on_conflict="raise"):
+                    result = func(self)
+            except SharedDataConflict:
+                continue
+            return result
+
+        raise SharedDataConflict(
+            f"Shared data of group {self.group.data.group_id} was changed by another"
+            f" session in all of {attempts} attempts."
         )
-        if doc is not None:
-            self.data = doc["shared_data"]
 
-    def _push_local(self):
-        self.group.data.shared_data = self.data
-        self.group.io.save()
+    def increment(self, key: str, n: float = 1) -> float:
+        """
+        Atomically adds *n* to the item *key* and returns the new value.
+        A missing item counts as 0.
+
+        Atomic operations are written immediately, also inside a
+        :meth:`.batch`.
+
+        Examples:
+
+            ::
 
-    def _fetch(self):
-        if saving_method(self.group.exp) == "mongo":
-            self._fetch_remote()
+                total = group.shared_data.increment("contributions", 5)
 
-        self.data["__last_access"] = time.time()
-        self._push()
+        """
+        self._check_key(key)
+        self._write({"$inc": {key: n}}, keys=(key,))
+        return self.data.get(key)
+
+    def append(self, key: str, value) -> tuple:
+        """
+        Atomically appends *value* to the list *key* and returns the
+        items of the list. A missing item counts as an empty list.
+
+        Atomic operations are written immediately, also inside a
+        :meth:`.batch`.
+
+        Examples:
 
-    def _push(self):
-        if saving_method(self.group.exp) == "mongo":
-            self._push_remote()
-        elif saving_method(self.group.exp) == "local":
-            self._push_local()
+            ::
+
+                bids = group.shared_data.append("bids", (self.exp.session_id, 10))
+
+        """
+        self._check_key(key)
+        self._write({"$push": {key: value}}, keys=(key,))
+        return tuple(self.data.get(key, ()))
+
+    def compare_and_set(self, key: str, old, new) -> bool:
+        """
+        Atomically sets the item *key* to *new*, if its current value is
+        *old*. An *old* value of *None* matches a missing item.
+
+        Atomic operations are written immediately, also inside a
+        :meth:`.batch`.
+
+        Returns:
+            bool: *True*, if the item was set.
+
+        Examples:
+
+            ::
+
+                if group.shared_data.compare_and_set("turn", "a", "b"):
+                    # it was a's turn, now it is b's turn
+                    ...
+
+        """
+        self._check_key(key)
+        shared = self._write({"$set": {key: new}}, condition={key: old})
+        if shared is None:
+            return False
+
+        self.data[key] = new
+        return True
+
+    def _version_condition(self, version: int) -> dict:
+        # The counter is created by the first write
+        if version:
+            return {self.VERSION: version}
+        return {self.VERSION: {"$exists": False}}
+
+    def _check_key(self, key):
+        if not isinstance(key, str) or "." in key or key.startswith("$"):
+            raise KeyError(
+                f"Invalid key {key!r}. Keys of shared group data must be strings"
+                " without dots that do not start with '$'."
+            )
+
+    def _fetch(self, key: str = None):
+        """
+        Reads the shared data from the database without writing. If
+        *key* is given, only this item and the version are read.
+        """
+        self._last_access = time.time()
+
+        if self.saving_method == "mongo":
+            self._fetch_mongo(key)
+        elif self.saving_method == "local":
+            shared = self._load_local()
+            if shared:
+                self.data = shared
+
+        if self._batch is not None:
+            self._batch.apply(self.data)
+
+    def _fetch_mongo(self, key: str = None):
+        if key is None:
+            p = {"_id": False, "shared_data": True}
+        else:
+            p = {"_id": False, f"shared_data.{key}": True}
+            p[f"shared_data.{self.VERSION}"] = True
+
+        doc = self._db.find_one(self._query, projection=p)
+        if doc is None:
+            return
+
+        shared = doc.get("shared_data", {})
+        if key is None:
+            self.data = shared
+            return
+
+        self._merge(shared, (key,))
+
+    def _merge(self, shared: dict, keys: tuple):
+        """
+        Merges the items *keys* and the version from a partial read of
+        the shared data into the local data.
+        """
+        for key in keys:
+            if key in shared:
+                self.data[key] = shared[key]
+            else:
+                self.data.pop(key, None)
+
+        if self.VERSION in shared:
+            self.data[self.VERSION] = shared[self.VERSION]
+
+    def _load_local(self) -> dict:
+        if not self.group.io.path.is_file():
+            return {}
+        return self.group.io._load_local().get("shared_data", {})
+
+    def _write(self, update: dict, keys: tuple = (), condition: dict = None) -> dict:
+        """
+        Applies *update* to the shared data in the database and
+        increments the version.
+
+        Args:
+            update (dict): MongoDB update document with paths relative
+                to the shared data. Supported operators are ``$set``,
+                ``$unset``, ``$inc`` and ``$push``.
+            keys (tuple): Items that are read back after the update and
+                merged into the local data.
+            condition (dict): Filter with paths relative to the shared
+                data. The update is only applied, if the shared data
+                matches the filter. Supported are equality and
+                ``$exists``.
+
+        Returns:
+            dict: The items *keys* and the version after the update, or
+            *None*, if the condition was not met.
+        """
+        update = {op: dict(fields) for op, fields in update.items()}
+        update.setdefault("$set", {})["__last_change"] = time.time()
+        update.setdefault("$inc", {})[self.VERSION] = 1
+
+        if self.saving_method == "mongo":
+            shared = self._write_mongo(update, keys, condition or {})
+        elif self.saving_method == "local":
+            shared = self._write_local(update, keys, condition or {})
+
+        if shared is not None:
+            self._merge(shared, keys)
+            self.data["__last_change"] = update["$set"]["__last_change"]
+
+        return shared
+
+    def _write_mongo(self, update: dict, keys: tuple, condition: dict) -> dict:
+        q = self._query
+        q.update({f"shared_data.{k}": v for k, v in condition.items()})
+        update = {
+            op: {f"shared_data.{k}": v for k, v in fields.items()}
+            for op, fields in update.items()
+        }
+        p = {f"shared_data.{key}": True for key in keys}
+        p.update({"_id": False, f"shared_data.{self.VERSION}": True})
+
+        doc = self._db.find_one_and_update(
+            filter=q,
+            update=update,
+            projection=p,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc.get("shared_data", {}) if doc is not None else None
+
+    def _write_local(self, update: dict, keys: tuple, condition: dict) -> dict:
+        io = self.group.io
+        if not io.path.is_file():
+            return None
+
+        data = io._load_local()
+        shared = data.setdefault("shared_data", {})
+        if not _matches(shared, condition):
+            return None
+
+        _apply(shared, update)
+        io._save_local(data)
+        # return the items as they are read back from the file
+        shared = json.loads(json.dumps(shared))
+        return {k: shared[k] for k in (*keys, self.VERSION) if k in shared}
 
     def last_change(self, format: str = "%Y-%m-%d, %X") -> str:
         return time.strftime(format, time.localtime(self.data["__last_change"]))
 
     def last_access(self, format: str = "%Y-%m-%d, %X") -> str:
-        return time.strftime(format, time.localtime(self.data["__last_access"]))
+        """
+        Returns the time at which this session last read the shared
+        data.
+        """
+        return time.strftime(format, time.localtime(self._last_access))
 
     def _validate(self, key, value):
         if isinstance(value, self._ACCEPTED):
@@ -121,23 +494,299 @@ class SharedGroupData(UserDict):
             self.group.exp.log.warning(msg)
 
     def __getitem__(self, key):
-        self._fetch()
+        self._check_key(key)
+        self._fetch(key)
         item = super().__getitem__(key)
-        self._validate(key, item)
+        # Tuples and appended items are read back as lists
+        if not isinstance(item, list):
+            self._validate(key, item)
         return item
 
     def __setitem__(self, key, item):
-        self._fetch()
-        super().__setitem__(key, item)
-        self.data["__last_change"] = time.time()
-        self._push()
+        self._check_key(key)
+        if self._batch is not None:
+            self._batch.set(key, item)
+        else:
+            self._write({"$set": {key: item}})
+        self.data[key] = item
         self._validate(key, item)
 
     def __delitem__(self, key):
+        self._check_key(key)
+        if self._batch is not None:
+            if key not in self.data:
+                self._fetch(key)
+            super().__delitem__(key)
+            self._batch.unset(key)
+            return
+
+        condition = {key: {"$exists": True}}
+        if self._write({"$unset": {key: ""}}, keys=(key,), condition=condition) is None:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        self._fetch()
+        return super().__contains__(key)
+
+    def __iter__(self):
         self._fetch()
-        super().__delitem__(key)
-        self.data["__last_change"] = time.time()
-        self._push()
+        return super().__iter__()
+
+    def __len__(self):
+        self._fetch()
+        return super().__len__()
+
+
+class SharedDataBatch:
+    """
+    Buffers changes of :class:`.SharedGroupData` and writes them as one
+    atomic update. Use :meth:`.SharedGroupData.batch` to create a batch.
+
+    Args:
+        shared_data (SharedGroupData): The shared data.
+        on_conflict (str): "merge" (last write wins) or "raise".
+    """
+
+    #: Supported values of *on_conflict*
+    POLICIES = ("merge", "raise")
+
+    def __init__(self, shared_data: SharedGroupData, on_conflict: str = "merge"):
+        if on_conflict not in self.POLICIES:
+            raise ValueError("Parameter 'on_conflict' must be 'merge' or 'raise'.")
+
+        self.shared_data = shared_data
+        self.on_conflict = on_conflict
+
+        #: Version of the shared data that the changes are based on
+        self.version = shared_data.version
+        self._set = {}
+        self._unset = set()
+
+    def __enter__(self) -> SharedGroupData:
+        self.shared_data._batch = self
+        return self.shared_data
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shared_data._batch = None
+        if exc_type is None:
+            self.commit()
+        else:
+            self.shared_data._fetch()
+
+    def set(self, key: str, item):
+        self._unset.discard(key)
+        self._set[key] = item
+
+    def unset(self, key: str):
+        self._set.pop(key, None)
+        self._unset.add(key)
+
+    def apply(self, data: dict):
+        """
+        Applies the buffered changes to *data*.
+        """
+        data.update(self._set)
+        for key in self._unset:
+            data.pop(key, None)
+
+    def commit(self):
+        """
+        Writes the buffered changes as one update.
+
+        Raises:
+            SharedDataConflict: If *on_conflict* is "raise" and another
+                session changed the shared data since the batch was
+                started.
+        """
+        if not self._set and not self._unset:
+            return
+
+        update = {}
+        if self._set:
+            update["$set"] = dict(self._set)
+        if self._unset:
+            update["$unset"] = dict.fromkeys(self._unset, "")
+
+        condition = None
+        if self.on_conflict == "raise":
+            condition = self.shared_data._version_condition(self.version)
+
+        shared = self.shared_data._write(update, condition=condition)
+        if shared is None and condition is not None:
+            self.shared_data._fetch()
+            raise SharedDataConflict(
+                f"Shared data of group {self.shared_data.group.data.group_id} was"
+                f" changed by another session since version {self.version}."
+            )
+
+        self.apply(self.shared_data.data)
+        self._set.clear()
+        self._unset.clear()
+
+
+def _matches(data: dict, condition: dict) -> bool:
+    """
+    Local equivalent of a MongoDB filter on a dictionary. Supports
+    equality and ``$exists``.
+    """
+    for key, value in condition.items():
+        if isinstance(value, dict) and "$exists" in value:
+            if (key in data) != bool(value["$exists"]):
+                return False
+        elif json.loads(json.dumps(value)) != data.get(key):
+            # tuples are saved as lists
+            return False
+    return True
+
+
+def _apply(data: dict, update: dict):
+    """
+    Local equivalent of a MongoDB update on a dictionary. Supports
+    ``$set``, ``$unset``, ``$inc`` and ``$push``.
+    """
+    for key, value in update.get("$set", {}).items():
+        data[key] = value
+    for key in update.get("$unset", {}):
+        data.pop(key, None)
+    for key, value in update.get("$inc", {}).items():
+        data[key] = data.get(key, 0) + value
+    for key, value in update.get("$push", {}).items():
+        data[key] = list(data.get(key, [])) + [value]
+
+
+class GroupBarrier:
+    """
+    Synchronization point for the members of a group.
+
+    Members call :meth:`.arrive` when they reach the barrier and then
+    poll :meth:`.passed` until all other members have arrived, too.
+    Arrivals are stored as a set of session ids in the group document
+    and added atomically, so that arriving twice counts once.
+
+    Members who finished, aborted or expired without arriving are not
+    waited for. Their status is checked with a single query at most
+    every *status_interval* seconds. Sessions that dropped out are
+    remembered, so a poll usually costs one projected read of the group.
+
+    Use :meth:`.Group.barrier` to get a barrier.
+
+    Args:
+        group (Group): The group.
+        name (str): Name of the barrier. Must be unique within the group.
+        status_interval (float): Minimum time in seconds between two
+            checks of the status of members who have not arrived.
+            Defaults to 10.
+    """
+
+    #: Status of sessions that will not arrive anymore
+    DROPPED = ("finished", "aborted", "expired")
+
+    def __init__(self, group, name: str, status_interval: float = 10):
+        if not name or "." in name or name.startswith("$"):
+            raise ValueError(
+                f"Invalid barrier name {name!r}. Names must not be empty, must not"
+                " contain dots and must not start with '$'."
+            )
+
+        self.group = group
+        self.exp = group.exp
+        self.name = name
+        self.status_interval = status_interval
+        self._dropped = set()
+        self._checked = None
+
+    @property
+    def _path(self) -> str:
+        return f"barriers.{self.name}"
+
+    @property
+    def _db(self):
+        return db_misc(self.exp)
+
+    def arrive(self) -> int:
+        """
+        Marks the own session as arrived.
+
+        Returns:
+            int: Number of sessions that have arrived.
+        """
+        if self.group.io.saving_method == "mongo":
+            arrived = self._arrive_mongo()
+        elif self.group.io.saving_method == "local":
+            arrived = self._arrive_local()
+
+        self._mirror(arrived)
+        return len(arrived)
+
+    def _arrive_mongo(self) -> list:
+        sid = self.exp.session_id
+        doc = self._db.find_one_and_update(
+            filter=self.group.io.query,
+            update={"$addToSet": {self._path: sid}},
+            projection={"_id": False, self._path: True},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            return [sid]
+        return doc["barriers"][self.name]
+
+    def _arrive_local(self) -> list:
+        data = self.group.io._load_local()
+        arrived = data.setdefault("barriers", {}).setdefault(self.name, [])
+        if self.exp.session_id not in arrived:
+            arrived.append(self.exp.session_id)
+            self.group.io._save_local(data)
+        return arrived
+
+    def _load(self) -> dict:
+        if self.group.io.saving_method == "mongo":
+            p = {"_id": False, "members": True, self._path: True}
+            return self._db.find_one(self.group.io.query, projection=p) or {}
+        elif self.group.io.saving_method == "local":
+            return self.group.io._load_local()
+
+    def _mirror(self, arrived: list):
+        self.group.data.barriers[self.name] = list(arrived)
+        self.group.data.mark_clean("barriers")
+
+    def waiting(self) -> List[str]:
+        """
+        Returns the session ids of members who have neither arrived nor
+        dropped out.
+        """
+        data = self._load()
+        arrived = data.get("barriers", {}).get(self.name, [])
+        members = data.get("members", self.group.data.members)
+        self._mirror(arrived)
+
+        waiting = [
+            sid for sid in members if sid not in arrived and sid not in self._dropped
+        ]
+
+        now = time.time()
+        due = self._checked is None or now - self._checked >= self.status_interval
+        if waiting and due:
+            self._checked = now
+            statuses = self.group.manager.session_statuses(waiting)
+            dropped = {sid for sid, s in statuses.items() if s in self.DROPPED}
+            self._dropped.update(dropped)
+            waiting = [sid for sid in waiting if sid not in dropped]
+
+        return waiting
+
+    def passed(self) -> bool:
+        """
+        bool: *True*, if all members have either arrived or dropped out.
+        """
+        return not self.waiting()
+
+    @property
+    def narrived(self) -> int:
+        """
+        int: Number of sessions that have arrived, as of the last call
+        of :meth:`.arrive` or :meth:`.waiting`.
+        """
+        return len(self.group.data.barriers.get(self.name, []))
 
 
 class GroupHelper:
@@ -152,9 +801,17 @@ class GroupIO(GroupHelper):
         super().__init__(group)
         self.saving_method = saving_method(self.exp)
 
+        #: Indicates whether the group is locked by this session. While
+        #: locked, saves are deferred until :meth:`.release`.
+        self.locked = False
+
+        #: :class:`.UnitOfWork` that inserts the group. Until the unit
+        #: is committed, saves are skipped.
+        self.unit = None
+
     @property
     def db(self):
-        return self.exp.db_misc
+        return db_misc(self.exp)
 
     @property
     def data(self):
@@ -181,6 +838,8 @@ class GroupIO(GroupHelper):
         elif self.saving_method == "local":
             self._insert_local(asdict(self.data))
 
+        self.data.mark_clean()
+
     def _insert_mongo(self, insert: dict):
         self.db.find_one_and_update(self.query, {"$setOnInsert": insert}, upsert=True)
 
@@ -189,16 +848,42 @@ class GroupIO(GroupHelper):
             self._save_local(insert)
 
     def save(self):
+        """
+        Saves the fields that changed since the group data was last
+        loaded or saved.
+
+        Inside a ``with group:`` block, saves are deferred. All changes
+        are written at once, when the group is released. Groups that are
+        part of a :class:`.UnitOfWork` are written on commit.
+        """
+        if self.locked or self.unit is not None:
+            return
+
         if self.saving_method == "mongo":
-            self._save_mongo(asdict(self.data))
+            self._save_mongo(self.changes())
         elif self.saving_method == "local":
-            self._save_local(asdict(self.data))
+            if self.changes():
+                self._save_local(asdict(self.data))
+
+        self.data.mark_clean()
+
+    def changes(self) -> dict:
+        """
+        dict: Changed fields of the group data. Shared data and barriers
+        are excluded in mongo experiments, because
+        :class:`.SharedGroupData` and :class:`.GroupBarrier` write them
+        by themselves.
+        """
+        if self.saving_method == "mongo":
+            return self.data.changes(exclude=("shared_data", "barriers"))
+        return self.data.changes()
 
     def _save_mongo(self, data: dict):
-        self.db.find_one_and_update(self.query, {"$set": data}, upsert=True)
+        if data:
+            self.db.update_one(self.query, {"$set": data})
 
     def _save_local(self, data: dict):
-        with open(self.path, "w", encoding="utf-8") as f:
+        with open_file(self.exp, self.path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4)
 
     def load(self) -> GroupData:
@@ -208,15 +893,38 @@ class GroupIO(GroupHelper):
             data = self._load_local()
 
         if data:
-            return GroupData(**data)
+            data = GroupData(**data)
+            data.mark_clean()
+            return data
 
     def _load_mongo(self) -> dict:
         return self.db.find_one(self.query, {"_id": False})
 
     def _load_local(self) -> dict:
-        with open(self.path, encoding="utf-8") as fp:
+        with open_file(self.exp, self.path, encoding="utf-8") as fp:
             return json.load(fp)
 
+    def has_member(self, role: str, session_id: str) -> bool:
+        """
+        Returns *True*, if the session *session_id* holds the role
+        *role* in the persisted group data. Costs a single projected
+        query.
+        """
+        if self.saving_method == "mongo":
+            return self._has_member_mongo(role, session_id)
+        elif self.saving_method == "local":
+            return self._has_member_local(role, session_id)
+
+    def _has_member_mongo(self, role: str, session_id: str) -> bool:
+        q = self.query
+        q[f"roles.{role}"] = session_id
+        return self.db.find_one(q, projection={"_id": True}) is not None
+
+    def _has_member_local(self, role: str, session_id: str) -> bool:
+        if not self.path.is_file():
+            return False
+        return self._load_local()["roles"].get(role) == session_id
+
     def load_markbusy(self) -> GroupData:
         if self.saving_method == "mongo":
             data = self._load_markbusy_mongo()
@@ -224,7 +932,10 @@ class GroupIO(GroupHelper):
             data = self._load_markbusy_local()
 
         if data:
-            return GroupData(**data)
+            self.locked = True
+            data = GroupData(**data)
+            data.mark_clean()
+            return data
 
     def _load_markbusy_mongo(self) -> dict:
         q = self.query
@@ -253,19 +964,27 @@ class GroupIO(GroupHelper):
         elif self.saving_method == "local":
             data = self._release_local()
 
-        self.group.data.busy = False
+        self.locked = False
+        self.data.busy = "false"
+        self.data.mark_clean()
         return data
 
     def _release_mongo(self):
+        update = self.changes()
+        update["busy"] = "false"
         data = self.db.find_one_and_update(
             filter=self.query,
-            update={"$set": {"busy": "false"}},
+            update={"$set": update},
+            projection={"_id": False, "busy": True},
             return_document=ReturnDocument.AFTER,
         )
         return data
 
     def _release_local(self):
-        data = self._load_local()
+        if self.changes():
+            data = asdict(self.data)
+        else:
+            data = self._load_local()
         data["busy"] = "false"
         self._save_local(data)
         return data
@@ -289,23 +1008,25 @@ class GroupRoles(GroupHelper):
         return roles
 
     def finished(self) -> Iterator[str]:
-        sessions = self.manager.find_finished_sessions(self.data.members)
-        return self.roles_of(sessions)
+        snapshot = self.group.groupmember_manager.snapshot()
+        return iter(snapshot.roles_with("finished"))
 
     def pending(self) -> Iterator[str]:
-        sessions = self.manager.find_active_sessions(self.data.members)
-        return self.roles_of(sessions)
+        snapshot = self.group.groupmember_manager.snapshot()
+        return iter(snapshot.roles_with("active"))
 
     def open(self) -> Iterator[str]:
-        finished = self.manager.find_finished_sessions(self.data.members)
-        pending = self.manager.find_active_sessions(self.data.members)
-        sessions = list(chain(finished, pending))
-        roles = (role for role, sid in self.roles.items() if sid not in sessions)
-        return roles
+        snapshot = self.group.groupmember_manager.snapshot()
+        taken = snapshot.roles_with("finished", "active")
+        return (role for role in self.roles if role not in taken)
 
     def assign(self, role: str, member: GroupMember):
         self.group.data.roles[role] = member.data.session_id
         member.data.role = role
+        member.data.match_time = time.time()
+
+        waited = member.data.match_time - member.data.created
+        self.mm.metrics.observe("time_to_match", waited, label=self.data.spec_name)
         self.group.io.save()
 
     def next(self) -> str:
@@ -320,6 +1041,19 @@ class GroupRoles(GroupHelper):
 
 
 class GroupMemberManager(GroupHelper):
+    """
+    Gives access to the members of a group.
+
+    The accessors return the member objects that are registered in the
+    matchmaker's :class:`.IdentityMap`, if there are any. The data of a
+    member that was loaded earlier in the same experiment session is not
+    reloaded. It may be stale, e.g. if the other member's session saved
+    changes in the meantime. Call :meth:`.GroupMember.refresh` to reload
+    it. The members' experiment status, as used by :meth:`.snapshot`,
+    :meth:`.active_members` and the like, is loaded at least once per
+    web request.
+    """
+
     def __init__(self, group):
         super().__init__(group)
         self._me = None
@@ -340,11 +1074,48 @@ class GroupMemberManager(GroupHelper):
 
         return self._me
 
+    def snapshot(self) -> GroupStatus:
+        """
+        Returns the status of the group's members.
+
+        Costs one read of the group document and one query of the
+        members' experiment data. The group document is not read while
+        the group is locked by this session or has unsaved changes,
+        because the data in memory is current then. During a web
+        request, the snapshot is reused as long as the roles and members
+        of the group do not change.
+        """
+        cache = request_cache("group_status")
+        key = self.group.group_id
+        snapshot = cache.get(key) if cache is not None else None
+
+        if snapshot is None or not snapshot.matches(self.data):
+            snapshot = self._load_snapshot()
+            if cache is not None:
+                cache[key] = snapshot
+
+        return snapshot
+
+    def _load_snapshot(self) -> GroupStatus:
+        io = self.group.io
+        if not (io.locked or io.unit is not None or io.changes()):
+            data = io.load()
+            if data:
+                self.group._update(asdict(data))
+
+        members = list(self.data.members)
+        statuses = self.manager.load_statuses(members)
+        sessions = {d["exp_session_id"]: d for d in statuses}
+        return GroupStatus(dict(self.data.roles), members, sessions)
+
     @property
     def you(self) -> GroupMember:
         """
         GroupMember: :class:`.GroupMember`  object for
         the *other* participant in a dyad (i.e. a two-member-group).
+
+        If the member was loaded before in this session, its data is not
+        reloaded. Use :meth:`.GroupMember.refresh` for current data.
         """
         if len(self.data.roles) > 2:
             raise MatchingError(
@@ -353,36 +1124,31 @@ class GroupMemberManager(GroupHelper):
                 " members based on their roles."
             )
 
-        you = next(self.finished_other_members(), None)
-        if you:
-            return you
+        snapshot = self.snapshot()
+        others = [sid for sid in snapshot.members if sid != self.exp.session_id]
 
-        you = next(self.active_other_members(), None)
-        if you:
-            return you
+        finished = [sid for sid in others if snapshot.status_of(sid) == "finished"]
+        active = [sid for sid in others if snapshot.status_of(sid) == "active"]
 
-        you = next(self.other_members(), None)
-        if you:
-            return you
+        for sessions in (finished, active, others):
+            if sessions:
+                return next(self.manager.find(sessions[:1]), None)
 
     @property
     def nactive(self) -> int:
-        self.group.data = self.group.io.load()
-        members = self.group.data.members
-        active = list(self.manager.find_active_sessions(members))
-        return len(active)
+        return len(self.snapshot().sessions_with("active"))
 
     @property
     def nfinished(self) -> int:
-        self.group.data = self.group.io.load()
-        members = self.group.data.members
-        finished = list(self.manager.find_finished_sessions(members))
-        return len(finished)
+        return len(self.snapshot().sessions_with("finished"))
 
     def get_member_by_role(self, role: str) -> GroupMember:
         """
         GroupMember: Returns the :class:`.GroupMember` that inhabits the
         given role.
+
+        If the member was loaded before in this session, its data is not
+        reloaded. Use :meth:`.GroupMember.refresh` for current data.
         """
         if role not in self.data.roles:
             raise AttributeError(f"Role '{role}' not found in {self}.")
@@ -393,7 +1159,7 @@ class GroupMemberManager(GroupHelper):
         return self.manager.find(self.data.members)
 
     def active_members(self) -> Iterator[GroupMember]:
-        sessions = list(self.manager.find_active_sessions(self.data.members))
+        sessions = self.snapshot().sessions_with("active")
         return self.manager.find(sessions)
 
     def other_members(self) -> Iterator[GroupMember]:
@@ -402,7 +1168,7 @@ class GroupMemberManager(GroupHelper):
                 yield member
 
     def active_other_members(self) -> Iterator[GroupMember]:
-        sessions = list(self.manager.find_active_sessions(self.data.members))
+        sessions = self.snapshot().sessions_with("active")
         if not sessions:
             return
         for member in self.manager.find(sessions):
@@ -410,7 +1176,7 @@ class GroupMemberManager(GroupHelper):
                 yield member
 
     def finished_other_members(self) -> Iterator[GroupMember]:
-        sessions = list(self.manager.find_finished_sessions(self.data.members))
+        sessions = self.snapshot().sessions_with("finished")
         if not sessions:
             return
         for member in self.manager.find(sessions):
@@ -419,7 +1185,8 @@ class GroupMemberManager(GroupHelper):
 
     @property
     def oldest_save(self) -> float:
-        save_times = [m.info.last_save for m in self.active_members()]
+        snapshot = self.snapshot()
+        save_times = [snapshot.save_time(s) for s in snapshot.sessions_with("active")]
         return min(save_times)
 
 
@@ -486,20 +1253,26 @@ class Group:
 
     """
 
-    def __init__(self, matchmaker, **data):
+    def __init__(self, matchmaker, unit=None, **data):
         self.mm = matchmaker
         self.exp = self.mm.exp
 
         self.data = GroupData(**self._prepare_data(data))
         self.io = GroupIO(self)
+        self.io.unit = unit
         self.manager = MemberManager(self.mm)
         self.roles = GroupRoles(self)
         self.groupmember_manager = GroupMemberManager(self)
 
         self._shared_data = SharedGroupData(group=self)
-        self.data.shared_data = self.shared_data.data
-        self.io.insert()
+        self._barriers = {}
+
+        if unit is None:
+            self.io.insert()
+        else:
+            unit.add_group(self)
 
+        self.mm.identity_map.add_group(self)
         self.exp.append_plugin_data_query(self._plugin_data_query)
 
     def _prepare_data(self, data: dict) -> dict:
@@ -522,6 +1295,32 @@ class Group:
 
         return data
 
+    def refresh(self):
+        """
+        Reloads the group data from the database.
+
+        Group objects are shared within an experiment session (see
+        :class:`.IdentityMap`) and are not reloaded automatically.
+
+        Returns:
+            Group: The group itself.
+        """
+        data = self.io.load()
+        if data:
+            self.data = data
+        return self
+
+    def _update(self, data: dict):
+        """
+        Replaces the group data with freshly loaded *data*, unless the
+        group is locked or has unsaved changes.
+        """
+        if self.io.locked or self.io.unit is not None or self.io.changes():
+            return
+
+        self.data = GroupData(**self._prepare_data(data))
+        self.data.mark_clean()
+
     @property
     def _plugin_data_query(self):
         f = {"exp_id": self.exp.exp_id, "type": self.data.type}
@@ -547,8 +1346,9 @@ class Group:
         bool: Indicates whether all roles in the group are filled. Counts only
         active and finished members.
         """
-        nactive = self.groupmember_manager.nactive
-        nfinished = self.groupmember_manager.nfinished
+        snapshot = self.groupmember_manager.snapshot()
+        nactive = len(snapshot.sessions_with("active"))
+        nfinished = len(snapshot.sessions_with("finished"))
         return nactive + nfinished == len(self.data.roles)
 
     def takes_members(self, ongoing_sessions_ok: bool = False):
@@ -558,8 +1358,10 @@ class Group:
         Returns:
             bool
         """
-        open_roles = len(list(self.roles.open()))
-        pending_roles = len(list(self.roles.pending()))
+        snapshot = self.groupmember_manager.snapshot()
+        pending_roles = len(snapshot.roles_with("active"))
+        taken_roles = len(snapshot.roles_with("active", "finished"))
+        open_roles = len(self.data.roles) - taken_roles
 
         pending_ok = pending_roles == 0 if not ongoing_sessions_ok else True
 
@@ -589,14 +1391,73 @@ class Group:
         """
         return self.groupmember_manager.nactive
 
+    def status(self) -> dict:
+        """
+        Returns the status of the group's members by role.
+
+        Costs one read of the group and one query of the members'
+        experiment data. During a web request, the result is reused by
+        :attr:`.full`, :attr:`.finished`, :attr:`.nactive`,
+        :attr:`.nfinished`, :attr:`.you` and by the queries of open,
+        pending and finished roles, as long as the group's roles and
+        members do not change.
+
+        Returns:
+            dict: Roles and the status of their sessions: "active",
+            "finished", "aborted" or "expired". Open roles and sessions
+            without experiment data have the status *None*.
+
+        Examples:
+
+            ::
+
+                status = group.status()
+                if status["a"] == "aborted":
+                    ...
+
+        """
+        return self.groupmember_manager.snapshot().by_role()
+
     @property
     def shared_data(self):
         """
         DEPRECATED shared group data dictionary.
         """
-        self._shared_data._fetch()
         return self._shared_data
 
+    def barrier(self, name: str, status_interval: float = 10) -> GroupBarrier:
+        """
+        Returns the barrier *name* of this group.
+
+        Barriers synchronize the members of a group, e.g. between two
+        pages. For most cases, the :class:`.SyncPage` is the most
+        convenient way to use a barrier.
+
+        Args:
+            name (str): Name of the barrier.
+            status_interval (float): Minimum time in seconds between two
+                checks of the status of members who have not arrived.
+                Only used when the barrier is first requested.
+
+        Returns:
+            GroupBarrier: The barrier. Repeated calls with the same name
+            return the same object.
+
+        Examples:
+
+            ::
+
+                barrier = group.barrier("decision")
+                barrier.arrive()
+
+                if barrier.passed():
+                    ...
+
+        """
+        if name not in self._barriers:
+            self._barriers[name] = GroupBarrier(self, name, status_interval)
+        return self._barriers[name]
+
     @property
     def me(self) -> GroupMember:
         """
@@ -610,6 +1471,9 @@ class Group:
         """
         GroupMember: :class:`.GroupMember`  object for
         the *other* participant in a dyad (i.e. a two-member-group).
+
+        If the member was loaded before in this session, its data is not
+        reloaded. Use :meth:`.GroupMember.refresh` for current data.
         """
         return self.groupmember_manager.you
 
@@ -693,6 +1557,63 @@ class Group:
         """
         return self.groupmember_manager.active_other_members()
 
+    def prefetch(self, fields: List[str] = None):
+        """
+        Loads the experiment data of all group members at once and
+        attaches it to the member objects.
+
+        In mongo experiments, this is a single query. In local
+        experiments, it is a single pass over the session files.
+        Afterwards, accessors like :attr:`.GroupMember.values` use the
+        prefetched data without querying the database, as long as it
+        contains the fields they need. During a web request, prefetched
+        data is used until the end of the request. Use
+        :meth:`.GroupMember.refresh` to discard a member's prefetched
+        data earlier.
+
+        Args:
+            fields (list): Top-level fields of the experiment data to
+                load. Defaults to *None*, in which case the full data is
+                loaded. :attr:`.GroupMember.values` needs the field
+                "exp_data".
+
+        Returns:
+            Group: The group itself.
+
+        Examples:
+            ::
+
+                group.prefetch(fields=["exp_data"])
+                for member in group.members():
+                    print(member.values)
+
+        """
+        members = {m.data.session_id: m for m in self.members()}
+        data = self.manager.load_expdata(list(members), fields)
+        for doc in data:
+            members[doc["exp_session_id"]].expdata.attach(doc, fields)
+        return self
+
+    def values_by_role(self) -> dict:
+        """
+        Returns the flat input values of all group members by role.
+
+        The members' experiment data is prefetched with
+        :meth:`.prefetch` on every call, so that the values are current.
+        Roles that are not filled map to *None*.
+
+        Returns:
+            dict: Dictionary of roles and :attr:`.GroupMember.values`.
+        """
+        self.prefetch()
+        members = {m.data.session_id: m for m in self.members()}
+
+        values = {}
+        for role, sid in self.data.roles.items():
+            member = members.get(sid)
+            values[role] = member.values if member is not None else None
+        return values
+
     def __repr__(self):
         roles = str(list(self.data.roles.keys()))
         nmembers = self.groupmember_manager.nactive if self.data.members else 0
@@ -742,6 +1663,7 @@ class Group:
             data = self.io.load_markbusy()
 
         if not data:
+            self.mm.metrics.count("busy_group")
             raise BusyGroup
 
         self.data = data
@@ -769,12 +1691,15 @@ class GroupManager:
     def __init__(self, matchmaker, group_type: str = None, spec_name: str = None):
         self.mm = matchmaker
         self.exp = self.mm.exp
-        self.db = self.exp.db_misc
         self.saving_method = saving_method(self.exp)
         self.group_type = group_type
         self.spec_name = spec_name
         self.query = self._init_query()
 
+    @property
+    def db(self):
+        return db_misc(self.exp)
+
     def _init_query(self):
         q = {
             "matchmaker_id": self.mm.name,
@@ -801,7 +1726,19 @@ class GroupManager:
             data = self._mongo_groups()
 
         for gdata in data:
-            return Group(self.mm, **gdata)
+            return self._group(gdata)
+
+    def _group(self, data: dict) -> Group:
+        """
+        Returns the registered group for the loaded group *data* with
+        updated data, or a new group.
+        """
+        group = self.mm.identity_map.group(data["group_id"])
+        if group is None:
+            return Group(self.mm, **data)
+
+        group._update(data)
+        return group
 
     def _local_groups(self) -> Iterator[dict]:
         for fpath in self.path.iterdir():
@@ -812,7 +1749,7 @@ class GroupManager:
                 continue
 
             else:
-                with open(fpath, encoding="utf-8") as f:
+                with open_file(self.exp, fpath, encoding="utf-8") as f:
                     d = json.load(f)
                     version_matches = d["exp_version"] == self.mm.exp_version
                     spec_matches = d["spec_name"] == self.spec_name
@@ -842,7 +1779,7 @@ class GroupManager:
             data = self._active_mongo()
 
         for gdata in data:
-            yield Group(self.mm, **gdata)
+            yield self._group(gdata)
 
     def _active_local(self):
         for data in self._local_groups():
@@ -862,7 +1799,7 @@ class GroupManager:
             data = self._find_local(groups)
 
         for gdata in data:
-            return Group(self.mm, **gdata)
+            return self._group(gdata)
 
     def _find_mongo(self, groups: List[str]) -> Iterator[dict]:
         q = self.query
@@ -883,7 +1820,7 @@ class GroupManager:
         if not data:
             return
 
-        return Group(self.mm, **data)
+        return self._group(data)
 
     def _find_one_mongo(self, group_id: str) -> dict:
         q = self.query
@@ -0,0 +1,316 @@
+"""
+Index of local session data files.
+
+In local experiments, alfred3 saves each session's experiment data in a
+separate .json file. Finding a session's file or checking the status of
+a set of sessions would require parsing every file in the data
+directory. The :class:`.SessionIndex` maps session ids to their files
+and keeps their status (finished, aborted, start time and save time).
+
+The index is shared by all sessions of a process and is persisted in the
+data directory as *.interact_session_index*. An entry is valid as long
+as the modification time and size of its file are unchanged. When the
+index is refreshed, only new or changed files are parsed.
+"""
+
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from alfred3.data_manager import DataManager as dm
+
+from .instrument import open_file
+
+#: Name of the persisted index file. It has no .json suffix, so that
+#: alfred3 does not mistake it for session data.
+INDEX_FILENAME = ".interact_session_index"
+
+#: Version of the persisted index format
+INDEX_VERSION = 2
+
+
+@dataclass
+class SessionEntry:
+    """
+    Index entry for a single .json file in the data directory. Files
+    that do not contain experiment data have the session id *None*.
+    """
+
+    filename: str
+    mtime_ns: int
+    size: int
+    session_id: str = None
+    finished: bool = False
+    aborted: bool = False
+    start_time: float = None
+    save_time: float = None
+    session_timeout: float = None
+
+    def status(self) -> dict:
+        """
+        Returns the entry's status with the keys of the experiment data.
+        """
+        d = {}
+        d["exp_session_id"] = self.session_id
+        d["exp_finished"] = self.finished
+        d["exp_aborted"] = self.aborted
+        d["exp_start_time"] = self.start_time
+        d["exp_save_time"] = self.save_time
+        d["exp_session_timeout"] = self.session_timeout
+        return d
+
+
+class _IndexData:
+    """
+    Shared state of the index of a single directory.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.files: Dict[str, SessionEntry] = {}
+        self.sessions: Dict[str, str] = {}
+        self.lock = threading.RLock()
+        self.loaded = False
+
+    def set(self, entry: SessionEntry):
+        old = self.files.get(entry.filename)
+        if old is not None and old.session_id is not None:
+            self.sessions.pop(old.session_id, None)
+
+        self.files[entry.filename] = entry
+        if entry.session_id is not None:
+            self.sessions[entry.session_id] = entry.filename
+
+    def remove(self, filename: str):
+        entry = self.files.pop(filename, None)
+        if entry is not None and entry.session_id is not None:
+            self.sessions.pop(entry.session_id, None)
+
+
+_indexes: Dict[Path, _IndexData] = {}
+_indexes_lock = threading.Lock()
+
+
+def session_index(exp) -> "SessionIndex":
+    """
+    Returns the index of the local session data of *exp*.
+    """
+    directory = exp.config.get("local_saving_agent", "path")
+    return directory_index(exp.subpath(directory), exp=exp)
+
+
+def directory_index(directory, exp=None) -> "SessionIndex":
+    """
+    Returns the index of the session data files in *directory*. Use
+    this function to access local session data outside of an
+    experiment session, e.g. for exports.
+    """
+    directory = Path(directory).resolve()
+
+    with _indexes_lock:
+        data = _indexes.get(directory)
+        if data is None:
+            data = _IndexData(directory)
+            _indexes[directory] = data
+
+    return SessionIndex(exp, data)
+
+
+class SessionIndex:
+    """
+    Index of the local session data files of an experiment.
+
+    Use :func:`.session_index` to get the index for an experiment
+    session, or :func:`.directory_index` to get the index of a
+    directory.
+
+    Args:
+        exp (alfred3.ExperimentSession): Experiment session. File access
+            is recorded for this session (see :mod:`.instrument`). May
+            be *None*.
+        data: Shared index state.
+    """
+
+    def __init__(self, exp, data: _IndexData):
+        self.exp = exp
+        self._data = data
+
+    @property
+    def directory(self) -> Path:
+        return self._data.directory
+
+    @property
+    def path(self) -> Path:
+        """
+        Path: Path of the persisted index.
+        """
+        return self.directory / INDEX_FILENAME
+
+    def path_of(self, session_id: str) -> Path:
+        """
+        Returns the path of the file of session *session_id*, or *None*.
+        """
+        entry = self.entry(session_id)
+        return self.directory / entry.filename if entry else None
+
+    def entry(self, session_id: str) -> SessionEntry:
+        """
+        Returns the up-to-date entry of session *session_id*, or *None*.
+        Only the session's own file is checked for changes, unless the
+        session is not indexed yet.
+        """
+        with self._data.lock:
+            self._load_persisted()
+            filename = self._data.sessions.get(session_id)
+
+            if filename is not None and self._update(filename):
+                self._persist()
+                filename = self._data.sessions.get(session_id)
+
+            if filename is None:
+                self.refresh()
+                filename = self._data.sessions.get(session_id)
+
+            return self._data.files.get(filename) if filename else None
+
+    def load(self, session_id: str) -> dict:
+        """
+        Returns the experiment data of session *session_id*, or *None*.
+        """
+        path = self.path_of(session_id)
+        if path is None:
+            return None
+
+        try:
+            with open_file(self.exp, path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load_many(self, session_ids: List[str]) -> Iterator[dict]:
+        """
+        Yields the experiment data of the given sessions. Sessions
+        without data are skipped.
+        """
+        self.refresh()
+        for sid in session_ids:
+            data = self.load(sid)
+            if data is not None:
+                yield data
+
+    def statuses(self, session_ids: List[str] = None) -> Iterator[dict]:
+        """
+        Yields the status of all indexed sessions, or of the given
+        sessions, without parsing unchanged files.
+
+        The status dictionaries contain the keys "exp_session_id",
+        "exp_finished", "exp_aborted", "exp_start_time", "exp_save_time"
+        and "exp_session_timeout".
+        """
+        self.refresh()
+        with self._data.lock:
+            if session_ids is None:
+                entries = [e for e in self._data.files.values() if e.session_id]
+            else:
+                filenames = (self._data.sessions.get(sid) for sid in session_ids)
+                entries = [self._data.files[f] for f in filenames if f]
+
+        for entry in entries:
+            yield entry.status()
+
+    def refresh(self):
+        """
+        Brings the index up to date. Parses only files that are new or
+        have changed since they were indexed.
+        """
+        with self._data.lock:
+            self._load_persisted()
+
+            try:
+                names = {
+                    e.name: e
+                    for e in os.scandir(self.directory)
+                    if e.name.endswith(".json") and e.is_file()
+                }
+            except FileNotFoundError:
+                names = {}
+
+            changed = False
+            for filename in list(self._data.files):
+                if filename not in names:
+                    self._data.remove(filename)
+                    changed = True
+
+            for filename, direntry in names.items():
+                changed = self._update(filename, direntry.stat()) or changed
+
+            if changed:
+                self._persist()
+
+    def _update(self, filename: str, stat: os.stat_result = None) -> bool:
+        """
+        Re-indexes *filename*, if it changed. Returns *True*, if the
+        index changed.
+        """
+        if stat is None:
+            try:
+                stat = os.stat(self.directory / filename)
+            except FileNotFoundError:
+                self._data.remove(filename)
+                return True
+
+        entry = self._data.files.get(filename)
+        if entry and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        entry = SessionEntry(filename, stat.st_mtime_ns, stat.st_size)
+
+        try:
+            with open_file(self.exp, self.directory / filename, encoding="utf-8") as f:
+                doc = json.load(f)
+        except (json.decoder.JSONDecodeError, FileNotFoundError, IsADirectoryError):
+            doc = {}
+
+        if isinstance(doc, dict) and doc.get("type") == dm.EXP_DATA:
+            entry.session_id = doc.get("exp_session_id")
+            entry.finished = doc.get("exp_finished", False)
+            entry.aborted = doc.get("exp_aborted", False)
+            entry.start_time = doc.get("exp_start_time")
+            entry.save_time = doc.get("exp_save_time")
+            entry.session_timeout = doc.get("exp_session_timeout")
+
+        self._data.set(entry)
+        return True
+
+    def _load_persisted(self):
+        if self._data.loaded:
+            return
+
+        self._data.loaded = True
+        try:
+            with open_file(self.exp, self.path, encoding="utf-8") as f:
+                persisted = json.load(f)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return
+
+        if persisted.get("version") != INDEX_VERSION:
+            return
+
+        for entry in persisted.get("files", []):
+            self._data.set(SessionEntry(**entry))
+
+    def _persist(self):
+        if not self.directory.is_dir():
+            return
+
+        data = {}
+        data["version"] = INDEX_VERSION
+        data["files"] = [asdict(e) for e in self._data.files.values()]
+
+        tmp = self.path.with_name(f"{INDEX_FILENAME}.{os.getpid()}.tmp")
+        with open_file(self.exp, tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
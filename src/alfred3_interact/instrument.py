@@ -0,0 +1,467 @@
+"""
+Opt-in timing instrumentation of database and file operations.
+
+Instrumentation is disabled by default. It can be enabled for all
+experiments of a process by calling :meth:`.OperationRecorder.enable` on
+:data:`.recorder`, or per experiment in *config.conf*::
+
+    # config.conf
+    [interact]
+    instrument = true
+
+While enabled, the collections returned by :func:`.db_main` and
+:func:`.db_misc`, the files opened by :func:`.open_file` and the data
+iterated by :func:`.iterate_local_data` record every operation in the
+process-wide :data:`.recorder`. The recorded operations can be exported
+as Prometheus exposition text (:meth:`.OperationRecorder.prometheus`) or
+as a JSON-serializable dictionary (:meth:`.OperationRecorder.dump`), for
+instance through the admin page :class:`.DatabaseMonitoring`.
+"""
+
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+from alfred3.data_manager import DataManager as dm
+
+from .metrics import BUCKETS, Histogram
+
+#: Collection methods that only read data
+READ_METHODS = frozenset(
+    {
+        "aggregate",
+        "count_documents",
+        "distinct",
+        "estimated_document_count",
+        "find",
+        "find_one",
+    }
+)
+
+#: Collection methods that write data
+WRITE_METHODS = frozenset(
+    {
+        "bulk_write",
+        "delete_many",
+        "delete_one",
+        "find_one_and_delete",
+        "find_one_and_replace",
+        "find_one_and_update",
+        "insert_many",
+        "insert_one",
+        "replace_one",
+        "update_many",
+        "update_one",
+    }
+)
+
+
+@dataclass
+class Operation:
+    """
+    A single recorded database or file operation.
+    """
+
+    #: Qualified name of the function that issued the operation,
+    #: e.g. "GroupIO._load_mongo"
+    name: str
+
+    #: Collection method ("find_one", "update_one", ...) or file access
+    #: ("read", "write", "iterate")
+    method: str
+
+    #: Name of the collection, or "file:<directory>" for local files
+    collection: str
+
+    #: "read" or "write"
+    kind: str
+
+    #: Duration in seconds
+    seconds: float
+
+    #: Number of documents returned or affected
+    ndocs: int
+
+
+@dataclass
+class OperationStats:
+    """
+    Aggregated statistics of all operations with the same name, method
+    and collection.
+    """
+
+    kind: str
+    latency: Histogram = field(default_factory=Histogram)
+    documents: int = 0
+
+
+class OperationRecorder:
+    """
+    Process-wide store of recorded operations.
+
+    Listeners added via :meth:`.subscribe` are called with every recorded
+    :class:`.Operation`. Instrumentation is active while the recorder is
+    enabled or has at least one listener.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, OperationStats] = {}
+        self._listeners: List[Callable] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled or bool(self._listeners)
+
+    def enable(self):
+        """
+        Enables instrumentation for all experiments of this process.
+        """
+        self._enabled = True
+
+    def disable(self):
+        """
+        Disables process-wide instrumentation. Experiments that enable
+        instrumentation in their config stay instrumented.
+        """
+        self._enabled = False
+
+    def reset(self):
+        """
+        Discards all recorded statistics.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def subscribe(self, listener: Callable):
+        """
+        Calls *listener* with every recorded :class:`.Operation` until
+        :meth:`.unsubscribe` is called.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def record(self, op: Operation):
+        key = (op.name, op.method, op.collection)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OperationStats(kind=op.kind)
+            stats.latency.observe(op.seconds)
+            stats.documents += op.ndocs
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener(op)
+
+    def stats(self) -> Dict[tuple, OperationStats]:
+        """
+        Returns:
+            dict: A copy of the recorded statistics, keyed by
+            (name, method, collection) tuples.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def dump(self) -> List[dict]:
+        """
+        Returns:
+            list: One dictionary per (name, method, collection) with
+            count, total and mean latency, quantiles and documents,
+            sorted by total latency in descending order.
+        """
+        out = []
+        for (name, method, collection), stats in self.stats().items():
+            hist = stats.latency
+            d = {}
+            d["name"] = name
+            d["method"] = method
+            d["collection"] = collection
+            d["kind"] = stats.kind
+            d["count"] = hist.count
+            d["seconds_total"] = hist.sum
+            d["seconds_mean"] = hist.mean
+            d["seconds_p50"] = hist.quantile(0.5)
+            d["seconds_p95"] = hist.quantile(0.95)
+            d["seconds_p99"] = hist.quantile(0.99)
+            d["documents"] = stats.documents
+            out.append(d)
+
+        return sorted(out, key=lambda d: d["seconds_total"], reverse=True)
+
+    def prometheus(self) -> str:
+        """
+        Returns:
+            str: The recorded statistics in the Prometheus text exposition
+            format, as a latency histogram and a documents counter.
+        """
+        hist_name = "alfred3_interact_db_operation_seconds"
+        docs_name = "alfred3_interact_db_documents_total"
+
+        hist_lines = [
+            f"# HELP {hist_name} Latency of database and file operations.",
+            f"# TYPE {hist_name} histogram",
+        ]
+        docs_lines = [
+            f"# HELP {docs_name} Documents returned or affected by operations.",
+            f"# TYPE {docs_name} counter",
+        ]
+
+        for (name, method, collection), stats in sorted(self.stats().items()):
+            labels = (
+                f'name="{_escape(name)}",method="{method}",'
+                f'collection="{_escape(collection)}",kind="{stats.kind}"'
+            )
+
+            cumulative = 0
+            for bound, n in zip(BUCKETS, stats.latency.buckets):
+                cumulative += n
+                le = "+Inf" if bound == BUCKETS[-1] else repr(float(bound))
+                hist_lines.append(
+                    f'{hist_name}_bucket{{{labels},le="{le}"}} {cumulative}'
+                )
+
+            hist_lines.append(f"{hist_name}_sum{{{labels}}} {stats.latency.sum!r}")
+            hist_lines.append(f"{hist_name}_count{{{labels}}} {stats.latency.count}")
+            docs_lines.append(f"{docs_name}{{{labels}}} {stats.documents}")
+
+        return "\n".join(hist_lines + docs_lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+#: The process-wide recorder
+recorder = OperationRecorder()
+
+
+def _caller(depth: int = 2) -> str:
+    return sys._getframe(depth).f_code.co_qualname
+
+
+def _ndocs(result) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, int):
+        return 1
+
+    n = 0
+    for attr in (
+        "matched_count",
+        "inserted_count",
+        "upserted_count",
+        "deleted_count",
+    ):
+        n += getattr(result, attr, 0) or 0
+
+    if hasattr(result, "inserted_ids"):
+        n += len(result.inserted_ids)
+    elif hasattr(result, "inserted_id"):
+        n += 1
+    elif getattr(result, "upserted_id", None) is not None:
+        n += 1
+
+    return n
+
+
+class _RecordingCursor:
+    """
+    Wraps a cursor and records the operation once the cursor is
+    exhausted or garbage collected. The recorded latency includes the
+    time spent fetching all batches.
+    """
+
+    def __init__(self, cursor, op: Operation, start: float):
+        self._cursor = cursor
+        self._op = op
+        self._start = start
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            doc = next(self._cursor)
+        except StopIteration:
+            self._finish()
+            raise
+        self._op.ndocs += 1
+        return doc
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _finish(self):
+        if not self._done:
+            self._done = True
+            self._op.seconds = time.perf_counter() - self._start
+            recorder.record(self._op)
+
+    def __del__(self):
+        self._finish()
+
+
+class InstrumentedCollection:
+    """
+    Proxy for a :class:`pymongo.collection.Collection` that records all
+    read and write operations.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in READ_METHODS:
+            kind = "read"
+        elif name in WRITE_METHODS:
+            kind = "write"
+        else:
+            return attr
+
+        def method(*args, **kwargs):
+            op = Operation(
+                name=_caller(),
+                method=name,
+                collection=self._collection.name,
+                kind=kind,
+                seconds=0.0,
+                ndocs=0,
+            )
+            start = time.perf_counter()
+            result = attr(*args, **kwargs)
+
+            if name in ("find", "aggregate"):
+                return _RecordingCursor(result, op, start)
+
+            op.seconds = time.perf_counter() - start
+            op.ndocs = _ndocs(result)
+            recorder.record(op)
+            return result
+
+        return method
+
+
+class _RecordingFile:
+    """
+    Wraps a file object and records the operation when it is closed.
+    """
+
+    def __init__(self, f, op: Operation, start: float):
+        self._file = f
+        self._op = op
+        self._start = start
+
+    def __enter__(self):
+        self._file.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return self._file.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self._finish()
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def close(self):
+        self._file.close()
+        self._finish()
+
+    def _finish(self):
+        if self._op is not None:
+            self._op.seconds = time.perf_counter() - self._start
+            recorder.record(self._op)
+            self._op = None
+
+
+def instrumented(exp) -> bool:
+    """
+    Returns *True*, if operations of the given experiment session should
+    be recorded. *exp* may be *None* for operations outside of an
+    experiment session, which are only recorded if the recorder is
+    enabled.
+    """
+    if recorder.enabled:
+        return True
+    if exp is None:
+        return False
+    return exp.config.getboolean("interact", "instrument", fallback=False)
+
+
+def db_main(exp):
+    """
+    Returns the experiment's main collection, instrumented if
+    instrumentation is enabled.
+    """
+    if instrumented(exp):
+        return InstrumentedCollection(exp.db_main)
+    return exp.db_main
+
+
+def db_misc(exp):
+    """
+    Returns the experiment's misc collection, instrumented if
+    instrumentation is enabled.
+    """
+    if instrumented(exp):
+        return InstrumentedCollection(exp.db_misc)
+    return exp.db_misc
+
+
+def open_file(exp, path, mode: str = "r", **kwargs):
+    """
+    Opens a file like :func:`open`. If instrumentation is enabled, the
+    time from opening to closing the file is recorded.
+    """
+    if not instrumented(exp):
+        return open(path, mode, **kwargs)
+
+    kind = "read" if mode.startswith("r") and "+" not in mode else "write"
+    op = Operation(
+        name=_caller(),
+        method=kind,
+        collection=f"file:{Path(path).parent.name}",
+        kind=kind,
+        seconds=0.0,
+        ndocs=1,
+    )
+    start = time.perf_counter()
+    return _RecordingFile(open(path, mode, **kwargs), op, start)
+
+
+def iterate_local_data(exp, data_type: str, directory) -> Iterator[dict]:
+    """
+    Iterates over local session data like
+    :meth:`alfred3.data_manager.DataManager.iterate_local_data`. If instrumentation
+    is enabled, the full iteration is recorded as one operation.
+    """
+    cursor = dm.iterate_local_data(data_type, directory)
+    if not instrumented(exp):
+        return cursor
+
+    op = Operation(
+        name=_caller(),
+        method="iterate",
+        collection=f"file:{Path(directory).name}",
+        kind="read",
+        seconds=0.0,
+        ndocs=0,
+    )
+    return _RecordingCursor(iter(cursor), op, time.perf_counter())
@@ -14,9 +14,18 @@ from pymongo.collection import ReturnDocument
 
 from alfred3_interact.group import GroupManager
 
-from ._util import MatchingError, MatchMakerBusy, NoMatch, saving_method
+from ._util import (
+    IdentityMap,
+    MatchingError,
+    MatchMakerBusy,
+    NoMatch,
+    file_lock,
+    saving_method,
+)
 from .group import Group
+from .instrument import db_misc, open_file
 from .member import GroupMember, MemberManager
+from .metrics import MatchMakerMetrics
 from .quota import MetaQuota
 
 ALFRED_VERSION = version.parse(alfred_version)
@@ -34,14 +43,27 @@ class MatchMakerData:
     ping_timeout: int = None
 
 
+@dataclass
+class MatchCache:
+    """
+    Session-local record of a successful match.
+    """
+
+    group_id: str
+    spec_name: str
+    role: str
+
+
 class MatchMakerIO:
     def __init__(self, matchmaker):
         self.mm = matchmaker
         self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._wait_start = None
+        self._acquired = None
 
     @property
     def db(self):
-        return self.mm.exp.db_misc
+        return db_misc(self.mm.exp)
 
     @property
     def path(self):
@@ -76,6 +98,46 @@ class MatchMakerIO:
         elif saving_method(self.mm.exp) == "local":
             return self._load_local()
 
+    def load_active(self) -> bool:
+        """
+        Loads only the matchmaker's active flag. If there is no
+        MatchMakerData document yet, creates it.
+        """
+        if saving_method(self.mm.exp) == "mongo":
+            data = self._load_fields_mongo("active")
+            if data is None:
+                return self._load_mongo().active
+            return data["active"]
+        elif saving_method(self.mm.exp) == "local":
+            return self._load_local().active
+
+    def load_busy(self) -> str:
+        """
+        Loads only the matchmaker's busy state, i.e. the session id of
+        the session that holds the lock, or "false".
+        """
+        if saving_method(self.mm.exp) == "mongo":
+            data = self._load_fields_mongo("busy")
+            return data["busy"] if data is not None else "false"
+        elif saving_method(self.mm.exp) == "local":
+            return self._load_local().busy
+
+    def load_member(self, session_id: str) -> dict:
+        """
+        Loads the data of a single member. Returns *None*, if the
+        session is not registered.
+        """
+        if saving_method(self.mm.exp) == "mongo":
+            data = self._load_fields_mongo(f"members.{session_id}") or {}
+            return data.get("members", {}).get(session_id)
+        elif saving_method(self.mm.exp) == "local":
+            return self._load_local().members.get(session_id)
+
+    def _load_fields_mongo(self, *fields) -> dict:
+        projection = {name: True for name in fields}
+        projection["_id"] = False
+        return self.db.find_one(self.query, projection=projection)
+
     def load_markbusy(self) -> MatchMakerData:
         """
         Loads MatchMakerData and marks it as busy, if it is not busy
@@ -87,9 +149,14 @@ class MatchMakerIO:
         elif saving_method(self.mm.exp) == "local":
             return self._load_markbusy_local()
 
-    def release(self) -> MatchMakerData:
+    def release(self):
         """
         Releases MatchMakerData from a 'busy' state.
+
+        Returns:
+            In mongo experiments, a dictionary holding only the busy
+            state, in local experiments the full MatchMakerData. *None*,
+            if the lock was not held by this session.
         """
         self.mm.busy = False
         if saving_method(self.mm.exp) == "mongo":
@@ -103,20 +170,27 @@ class MatchMakerIO:
         return self.db.find_one_and_update(
             filter=q,
             update={"$set": {"busy": "false"}},
+            projection={"_id": False, "busy": True},
             return_document=ReturnDocument.AFTER,
         )
 
     def _release_local(self):
-        data = self._load_local()
-        data.busy = "false"
-        self._save_local(data)
+        with file_lock(self.path):
+            data = self._load_local()
+            data.busy = "false"
+            self._save_local(data)
         return data
 
     def _save_mongo(self, data: MatchMakerData):
-        self.db.find_one_and_replace(self.query, asdict(data))
+        # members are set individually, so that members registered
+        # concurrently (see GroupMemberIO.register) are not overwritten
+        update = asdict(data)
+        members = update.pop("members")
+        update.update({f"members.{sid}": m for sid, m in members.items()})
+        self.db.update_one(self.query, {"$set": update})
 
     def _save_local(self, data: MatchMakerData):
-        with open(self.path, "w", encoding="utf-8") as f:
+        with open_file(self.mm.exp, self.path, "w", encoding="utf-8") as f:
             json.dump(asdict(data), f, sort_keys=True, indent=4)
 
     def _load_mongo(self):
@@ -145,7 +219,7 @@ class MatchMakerIO:
         returns the corresponding data.
         """
         if self.path.exists() and self.path.is_file():
-            with open(self.path, encoding="utf-8") as f:
+            with open_file(self.mm.exp, self.path, encoding="utf-8") as f:
                 return MatchMakerData(**json.load(f))
         else:
             data = MatchMakerData(
@@ -156,18 +230,19 @@ class MatchMakerIO:
                 type=self.mm._DATA_TYPE,
             )
 
-            with open(self.path, "w", encoding="utf-8") as f:
+            with open_file(self.mm.exp, self.path, "w", encoding="utf-8") as f:
                 json.dump(asdict(data), f, sort_keys=True, indent=4)
             return data
 
     def _load_markbusy_local(self):
-        data = self._load_local()
-        if data.busy == "false":
-            data.busy = self.mm.exp.session_id
-            self._save_local(data)
-            return data
-        else:
-            return None
+        with file_lock(self.path):
+            data = self._load_local()
+            if data.busy == "false":
+                data.busy = self.mm.exp.session_id
+                self._save_local(data)
+                return data
+            else:
+                return None
 
     def _load_markbusy_mongo(self):
         q = self.query
@@ -186,7 +261,19 @@ class MatchMakerIO:
             return None
 
     def __enter__(self):
-        return self.load_markbusy()
+        now = time.time()
+        data = self.load_markbusy()
+
+        if data is None:
+            if self._wait_start is None:
+                self._wait_start = now
+        else:
+            waited = now - self._wait_start if self._wait_start else 0.0
+            self.mm.metrics.observe("lock_wait", waited)
+            self._wait_start = None
+            self._acquired = time.time()
+
+        return data
 
     def __exit__(self, exc_type, exc_value, traceback):
         if exc_type:
@@ -206,8 +293,13 @@ class MatchMakerIO:
             self.mm.exp.log.debug(
                 f"MatchMaker seems to be busy. MatchMakerIO.release() returned {data}"
             )
+            self.mm.metrics.count("matchmaker_busy")
             raise MatchMakerBusy
 
+        if self._acquired is not None:
+            self.mm.metrics.observe("lock_hold", time.time() - self._acquired)
+            self._acquired = None
+
         self.mm.exp.log.debug(f"MatchMakerData lock released. Timestamp: {time.time()}")
         self.mm._data = self.load()
 
@@ -330,9 +422,14 @@ class MatchMaker:
         self.log.add_queue_logger(self, __name__)
         self._active = True
         self.io = MatchMakerIO(self)
+        self.metrics = MatchMakerMetrics(self)
+
+        #: :class:`.IdentityMap` of the groups and members of this session
+        self.identity_map = IdentityMap()
         self.member_manager = MemberManager(self)
         self.group = None
         self.member = None
+        self._match_cache = None
         self._match_start_save = None
         self.ping_timeout = ping_timeout
         self._data = self.io.load()
@@ -359,8 +456,7 @@ class MatchMaker:
         """
         Returns *True* if the MatchMaker is active.
         """
-        d = self.io.load()
-        self._active = d.active
+        self._active = self.io.load_active()
         return self._active
 
     @property
@@ -550,6 +646,10 @@ class MatchMaker:
                         self += al.Text(f"Successfully matched to role '{role}' in condition '{cond}'")
 
         """
+        group = self._cached_group()
+        if group is not None:
+            return group
+
         self.member = self._init_member()
 
         if self.member.matched:
@@ -566,16 +666,19 @@ class MatchMaker:
             waited_enough = time.time() - start >= wait
 
         if nmin is None:
+            nwaiting = None
             enough_members = False
         else:
-            enough_members = len(self.waiting_members) >= nmin
+            nwaiting = len(self.waiting_members)
+            enough_members = nwaiting >= nmin
 
         if enough_members or waited_enough:
             random.shuffle(self.groupspecs)
             group = self._match_quota(self.groupspecs)
             return group
 
-        raise NoMatch
+        self.metrics.count("no_match", label="-")
+        raise NoMatch(nwaiting=nwaiting)
 
     def match_chain(self, include_previous: bool = True, **spectimes) -> Group:
         """
@@ -653,6 +756,10 @@ class MatchMaker:
 
 
         """
+        group = self._cached_group()
+        if group is not None:
+            return group
+
         # member setip
         self.member = self._init_member()
         if self.member.matched:
@@ -694,6 +801,7 @@ class MatchMaker:
             previous_delay = delay
 
         if not specs:
+            self.metrics.count("no_match", label="-")
             raise NoMatch
 
         random.shuffle(specs)
@@ -716,10 +824,15 @@ class MatchMaker:
         Returns:
             Group: If matching was successful.
         """
-        self.member = self._init_member()
+        group = self._cached_group()
 
-        if self.member.matched:
-            group = self._get_group(self.member)
+        if group is None:
+            self.member = self._init_member()
+
+            if self.member.matched:
+                group = self._get_group(self.member)
+
+        if group is not None:
             if group.data.spec_name != name:
                 msg = (
                     "Member was already matched to a group of spec"
@@ -733,10 +846,49 @@ class MatchMaker:
         return self._match_to(name=name)
 
     def _get_group(self, member):
+        """
+        Loads the group of an already matched member without another
+        matching round.
+        """
         manager = GroupManager(self)
-        group = manager.find_one(member.group_id)
-        spec = group.data.spec_name
-        return self._match_to(spec)
+        self.group = manager.find_one(member.group_id)
+        self._remember_match()
+        return self.group
+
+    def _remember_match(self):
+        sid = self.exp.session_id
+        roles = self.group.data.roles
+        role = next((role for role, member in roles.items() if member == sid), None)
+
+        if role is None:
+            return
+
+        self._match_cache = MatchCache(
+            group_id=self.group.data.group_id,
+            spec_name=self.group.data.spec_name,
+            role=role,
+        )
+
+    def _cached_group(self) -> Group:
+        """
+        Returns the group of this session, if the session was matched
+        through this matchmaker before. The cached match is validated
+        with a single projected query. Returns *None*, if there is no
+        cached match or the cached match is no longer valid.
+        """
+        cache = self._match_cache
+        if cache is None or self.group is None:
+            return None
+
+        if self.group.data.group_id != cache.group_id:
+            self._match_cache = None
+            return None
+
+        if not self.group.io.has_member(cache.role, self.exp.session_id):
+            self._match_cache = None
+            return None
+
+        return self.group
 
     def _match_to(self, name: str):
         spec = self.spec_dict[name]
@@ -744,7 +896,11 @@ class MatchMaker:
         if not self.check_activation() or self.exp.admin_mode:
             return
 
-        self.group = spec._match(self)
+        try:
+            self.group = spec._match(self)
+        except NoMatch:
+            self.metrics.count("no_match", label=name)
+            raise
 
         if spec.count:
             try:
@@ -757,6 +913,7 @@ class MatchMaker:
             return
 
         self._update_additional_data()
+        self._remember_match()
         return self.group
 
     def toggle_activation(self) -> str:
@@ -828,17 +985,17 @@ class MatchMaker:
         return False
 
     def _match_quota(self, specs):
-        no_match = False
+        no_match = None
 
         for spec in specs:
             if not spec.full(self):
                 try:
                     return self._match_to(spec.name)
-                except NoMatch:
-                    no_match = True
+                except NoMatch as e:
+                    no_match = e
 
         if no_match:  # only reached if *no* spec leads to successful match
-            raise NoMatch
+            raise no_match
 
         self._full()
 
@@ -875,14 +1032,9 @@ class MatchMaker:
 
             return self.member
 
-        with self.io as data:
-            if data is not None:
-                member = GroupMember(self)
-                member.io.save()
-
-                return member
-
-        raise MatchMakerBusy
+        member = self.identity_map.member(self.exp.session_id) or GroupMember(self)
+        member.io.register()
+        return member
 
     def _update_additional_data(self):
         prefix = "interact"
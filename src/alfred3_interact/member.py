@@ -2,9 +2,13 @@
 Functionality related to group members.
 """
 
+import copy
 import datetime
 import json
+import re
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import asdict, dataclass, field
 from typing import Iterator, List
 
@@ -12,17 +16,20 @@ from alfred3.data_manager import DataManager as dm
 from alfred3.quota import SessionGroup
 from pymongo.collection import ReturnDocument
 
-from ._util import saving_method
+from ._util import ChangeTracking, MatchMakerBusy, request_cache, saving_method
+from .index import session_index
+from .instrument import db_main, db_misc, open_file
 
 
 @dataclass
-class GroupMemberData:
+class GroupMemberData(ChangeTracking):
     exp_id: str
     session_id: str
     group_id: str = None
     role: str = None
     created: float = field(default_factory=time.time)
     ping: float = field(default_factory=time.time)
+    match_time: float = None
     type: str = "match_member"
 
 
@@ -40,7 +47,10 @@ class GroupMemberIO(MemberHelper):
         super().__init__(member)
 
         self.path = self.mm.io.path
-        self.db = self.member.exp.db_misc
+
+    @property
+    def db(self):
+        return db_misc(self.exp)
 
     @property
     def query(self) -> dict:
@@ -57,14 +67,12 @@ class GroupMemberIO(MemberHelper):
         current = start
         while current <= end:
             try:
-                if self.saving_method == "mongo":
-                    data = self._load_mongo()
-                elif self.saving_method == "local":
-                    data = self._load_local()
-
-                data = data["members"][self.sid]
+                data = self.mm.io.load_member(self.sid)
+                if data is None:
+                    raise KeyError(self.sid)
 
                 self.member.data = GroupMemberData(**data)
+                self.member.data.mark_clean()
                 return
 
             except KeyError:
@@ -78,41 +86,90 @@ class GroupMemberIO(MemberHelper):
 
                 self.exp.log.exception(msg)
 
-    def _load_local(self) -> dict:
-        with open(self.path, encoding="utf-8") as f:
-            return json.load(f)
+    def register(self):
+        """
+        Adds the member to the matchmaker data, unless it is already
+        registered. In the latter case, loads the registered data.
+
+        In mongo experiments, registration does not require the
+        matchmaker lock. It is a single atomic update of
+        ``members.<session_id>`` that only takes effect if the field
+        does not exist yet. Local experiments register while holding the
+        matchmaker lock, because the matchmaker file can only be updated
+        as a whole.
+
+        Raises:
+            MatchMakerBusy: If the matchmaker lock of a local experiment
+                is held by another session.
+        """
+        if self.saving_method == "mongo":
+            data = self._register_mongo()
+        elif self.saving_method == "local":
+            data = self._register_local()
+
+        self.member.data = GroupMemberData(**data)
+        self.member.data.mark_clean()
+
+    def _register_mongo(self) -> dict:
+        path = f"members.{self.sid}"
+        insert = {"$literal": asdict(self.member.data)}
+        data = self.db.find_one_and_update(
+            self.query,
+            [{"$set": {path: {"$ifNull": [f"${path}", insert]}}}],
+            projection={"_id": False, path: True},
+            return_document=ReturnDocument.AFTER,
+        )
+        return data["members"][self.sid]
 
-    def _load_mongo(self) -> dict:
-        data = self.db.find_one(self.query, projection={f"members.{self.sid}"})
-        return data
+    def _register_local(self) -> dict:
+        with self.mm.io as data:
+            if data is not None:
+                return self._add_local()
+
+        self.mm.metrics.count("matchmaker_busy")
+        raise MatchMakerBusy
+
+    def _add_local(self) -> dict:
+        with open_file(self.exp, self.path, encoding="utf-8") as f:
+            mm = json.load(f)
+
+        if self.sid not in mm["members"]:
+            mm["members"][self.sid] = asdict(self.member.data)
+            with open_file(self.exp, self.path, "w", encoding="utf-8") as f:
+                json.dump(mm, f, sort_keys=True, indent=4)
+
+        return mm["members"][self.sid]
 
     def save(self):
+        """
+        Saves the fields that changed since the member data was last
+        loaded or saved.
+        """
+        changes = self.member.data.changes()
+        if not changes:
+            return
+
         if self.saving_method == "mongo":
-            self._save_mongo()
+            self._save_mongo(changes)
         elif self.saving_method == "local":
             self._save_local()
 
+        self.member.data.mark_clean()
+
     def _save_local(self):
-        with open(self.path, encoding="utf-8") as f:
+        with open_file(self.exp, self.path, encoding="utf-8") as f:
             mm = json.load(f)
 
         sid = self.member.data.session_id
         mm["members"][sid] = asdict(self.member.data)
 
-        with open(self.path, "w", encoding="utf-8") as f:
+        with open_file(self.exp, self.path, "w", encoding="utf-8") as f:
             json.dump(mm, f, sort_keys=True, indent=4)
 
-    def _save_mongo(self):
-        data = {"members": {self.sid: asdict(self.member.data)}}
-
-        from pprint import pprint
-
-        data_before = self.db.find_one(self.query)
-        self.exp.log.debug(f"MEBER DATA BEFORE: {pprint(data_before)}")
-        data_after = self.db.find_one_and_update(
-            self.query, [{"$set": data}], return_document=ReturnDocument.AFTER
-        )
-        self.exp.log.debug(f"MEBER DATA AFTER: {pprint(data_after)}")
+    def _save_mongo(self, changes: dict):
+        prefix = f"members.{self.sid}"
+        update = {f"{prefix}.{path}": value for path, value in changes.items()}
+        self.db.update_one(self.query, {"$set": update})
 
     def ping(self):
         if saving_method(self.exp) == "local":
@@ -121,6 +178,7 @@ class GroupMemberIO(MemberHelper):
         data = {"members": {self.sid: {"ping": now}}}
         self.db.find_one_and_update(self.query, [{"$set": data}])
         self.member.data.ping = now
+        self.member.data.mark_clean("ping")
 
 
 # TODO Manuell deaktivieren für MatchMaker-Chaining
@@ -129,23 +187,34 @@ class GroupMemberStatus:
     def __init__(self, member):
         self.member = member
         self.exp = member.exp
-        self.status = SessionGroup(sessions=[member.data.session_id])
+
+    def _load(self) -> dict:
+        manager = self.member.mm.member_manager
+        data = manager.load_statuses([self.member.data.session_id])
+        return data[0] if data else {}
+
+    def _flags(self) -> dict:
+        data = self._load()
+        if not data:
+            return {"finished": False, "aborted": False, "expired": False}
+        return self.member.mm.member_manager.session_flags(data)
 
     @property
     def finished(self) -> bool:
-        return self.status.finished(self.exp)
+        return self._flags()["finished"]
 
     @property
     def aborted(self) -> bool:
-        return self.status.aborted(self.exp)
+        return self._flags()["aborted"]
 
     @property
     def expired(self) -> bool:
-        return self.status.expired(self.exp)
+        return self._flags()["expired"]
 
     @property
     def active(self) -> bool:
-        return self.status.pending(self.exp)
+        flags = self._flags()
+        return not any(flags.values())
 
     @property
     def matched(self) -> bool:
@@ -157,20 +226,162 @@ class GroupMemberStatus:
         return expired
 
     def print_status(self) -> str:
-        if self.active:
-            return "active"
-        elif self.finished:
-            return "finished"
-        elif self.aborted:
-            return "aborted"
-        elif self.expired:
-            return "expired"
+        return self._load().get("status") or "active"
+
+
+@dataclass
+class ExpDataEntry:
+    data: dict
+    flat: dict = None
+
+    @property
+    def save_time(self) -> float:
+        return self.data.get("exp_save_time")
+
+    @property
+    def final(self) -> bool:
+        """
+        bool: *True*, if the session is over and its data will not change
+        anymore.
+        """
+        return bool(self.data.get("exp_finished") or self.data.get("exp_aborted"))
+
+
+class ExpDataCache:
+    """
+    Process-wide least-recently-used cache of members' experiment data.
+
+    Entries are keyed by experiment id and session id. An entry is valid
+    as long as the session's ``exp_save_time`` in the database matches
+    the cached one. Entries of finished or aborted sessions are used
+    without validation.
+
+    Args:
+        maxsize (int): Maximum number of cached sessions.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> ExpDataEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, data: dict) -> ExpDataEntry:
+        entry = ExpDataEntry(data)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, key: tuple):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+#: Cache of members' experiment data, shared by all sessions of the process
+expdata_cache = ExpDataCache()
+
+
+def _project(data: dict, projection) -> dict:
+    """
+    Applies a MongoDB-style *projection* (list of included keys or
+    dictionary of included or excluded keys) to the top level of *data*.
+    """
+    if not projection:
+        return dict(data)
+
+    if isinstance(projection, dict):
+        included = [k for k, v in projection.items() if v and k != "_id"]
+        if not included:
+            return {k: v for k, v in data.items() if projection.get(k, True)}
+        projection = included
+
+    return {k: data[k] for k in projection if k in data}
 
 
 class GroupMemberExpData(MemberHelper):
+    """
+    Read access to a member's experiment data.
+
+    In mongo experiments, the data is cached in :data:`.expdata_cache`.
+    A cached document is validated with a query for its
+    ``exp_save_time`` and is only fetched again, if the session has been
+    saved in the meantime.
+
+    Prefetched data (see :meth:`.Group.prefetch`) is used without
+    validation, but only during the web request in which it was
+    prefetched. Outside of web requests, e.g. in scripts, it is used
+    until :meth:`.GroupMember.refresh` is called.
+    """
+
+    def __init__(self, member):
+        super().__init__(member)
+
+        #: Prefetched :class:`.ExpDataEntry`, see :meth:`.Group.prefetch`
+        self.prefetched = None
+
+        #: Fields of the prefetched data. *None* stands for all fields.
+        self.prefetched_fields = None
+
+        #: Request cache of the request in which the data was prefetched
+        self._prefetch_request = None
+
     @property
     def db(self):
-        return self.exp.db_main
+        return db_main(self.exp)
+
+    @property
+    def key(self) -> tuple:
+        return (self.exp.exp_id, self.sid)
+
+    def attach(self, data: dict, fields: List[str] = None):
+        """
+        Attaches prefetched experiment data, which is used without
+        validation until the end of the current web request, or until
+        it is discarded by :meth:`.GroupMember.refresh`.
+
+        Args:
+            data (dict): The prefetched data.
+            fields (list): Fields contained in *data*. *None* stands for
+                the full data.
+        """
+        data.pop("_id", None)
+        if fields is None and self.saving_method == "mongo":
+            self.prefetched = expdata_cache.put(self.key, data)
+        else:
+            self.prefetched = ExpDataEntry(data)
+        self.prefetched_fields = fields
+        self._prefetch_request = request_cache("expdata_prefetch")
+
+    def covers(self, projection) -> bool:
+        """
+        Returns *True*, if prefetched data of the current web request
+        contains all fields of *projection*.
+        """
+        if self.prefetched is None:
+            return False
+        elif self._prefetch_request is not request_cache("expdata_prefetch"):
+            return False
+        elif self.prefetched_fields is None:
+            return True
+        elif isinstance(projection, list):
+            return set(projection) <= set(self.prefetched_fields)
+        return False
 
     @property
     def query(self) -> dict:
@@ -182,27 +393,67 @@ class GroupMemberExpData(MemberHelper):
         return d
 
     def _load_local(self) -> dict:
-        dt = dm.EXP_DATA
-        directory = self.exp.config.get("local_saving_agent", "path")
-        directory = self.exp.subpath(directory)
-        cursor = dm.iterate_local_data(dt, directory)
-        session = (data for data in cursor if data["exp_session_id"] == self.sid)
-        return next(session, None)
+        return session_index(self.exp).load(self.sid)
 
-    def load(self, projection=None) -> dict:
+    def _entry(self) -> ExpDataEntry:
         if self.saving_method == "mongo":
-            data = self.db.find_one(self.query, projection=projection)
-            data.pop("_id")
-
+            return self._entry_mongo()
         elif self.saving_method == "local":
-            data = self._load_local()
+            return ExpDataEntry(self._load_local())
 
-            if isinstance(projection, list):
-                data = {k: v for k, v in data.items() if k in projection}
-            elif isinstance(projection, dict):
-                data = {k: v for k, v in data.items() if projection.get(k, True)}
+    def _entry_mongo(self) -> ExpDataEntry:
+        entry = expdata_cache.get(self.key)
 
-        return data
+        if entry is not None and not entry.final:
+            if self.save_time() != entry.save_time:
+                entry = None
+
+        if entry is None:
+            data = self.db.find_one(self.query, projection={"_id": False})
+            if data is None:
+                return ExpDataEntry({})
+            entry = expdata_cache.put(self.key, data)
+
+        return entry
+
+    def save_time(self) -> float:
+        """
+        Returns the session's current ``exp_save_time``. Costs a single
+        projected query in mongo experiments.
+        """
+        if self.saving_method == "local":
+            entry = session_index(self.exp).entry(self.sid)
+            return entry.save_time if entry else None
+
+        p = {"_id": False, "exp_save_time": True}
+        data = self.db.find_one(self.query, projection=p)
+        return data.get("exp_save_time") if data else None
+
+    def load(self, projection=None) -> dict:
+        """
+        Returns a copy of the member's experiment data.
+
+        Args:
+            projection: List of included keys or dictionary of included
+                or excluded keys, as in MongoDB projections.
+        """
+        entry = self.prefetched if self.covers(projection) else self._entry()
+        data = _project(entry.data, projection)
+        return copy.deepcopy(data)
+
+    def values(self) -> dict:
+        """
+        Returns the flat dictionary of the member's input values. The
+        flattened dictionary is cached together with the data.
+        """
+        entry = self.prefetched if self.covers(["exp_data"]) else self._entry()
+        if entry.flat is None:
+            projection = {}
+            projection.update({key: False for key in dm._client_data_keys})
+            projection.update({key: False for key in dm._metadata_keys})
+            entry.flat = dm.flatten(_project(entry.data, projection))
+
+        return dict(entry.flat)
 
     @property
     def start_time_unix(self) -> float:
@@ -214,7 +465,7 @@ class GroupMemberInfo(MemberHelper):
     def __init__(self, member):
         super().__init__(member)
         self.expdata = self.member.expdata
-        self._start_time_unix = self.expdata.start_time_unix
+        self._start_time_unix = None
 
     @property
     def start_time_unix(self) -> float:
@@ -256,9 +507,7 @@ class GroupMemberInfo(MemberHelper):
 
     @property
     def last_save(self) -> float:
-        projection = {"exp_save_time": True, "_id": False}
-        data = self.member.expdata.load(projection)
-        return data["exp_save_time"]
+        return self.member.expdata.save_time()
 
     @property
     def last_page(self) -> str:
@@ -295,6 +544,8 @@ class GroupMember:
         self.expdata = GroupMemberExpData(self)
         self.info = GroupMemberInfo(self)
 
+        self.mm.identity_map.add_member(self)
+
     def _prepare_data(self, data: dict) -> dict:
         exp_id = data.get("exp_id", None)
         sid = data.get("session_id", None)
@@ -305,6 +556,32 @@ class GroupMember:
         data.pop("_id", None)
         return data
 
+    def refresh(self):
+        """
+        Reloads the member's data from the database.
+
+        Member objects are shared within an experiment session (see
+        :class:`.IdentityMap`) and are not reloaded automatically.
+
+        Returns:
+            GroupMember: The member itself.
+        """
+        self.io.load()
+        self.expdata.prefetched = None
+        self.expdata.prefetched_fields = None
+        return self
+
+    def _update(self, data: dict):
+        """
+        Replaces the member's data with freshly loaded *data*, unless the
+        member has unsaved changes.
+        """
+        if self.data.changes():
+            return
+
+        self.data = GroupMemberData(**self._prepare_data(data))
+        self.data.mark_clean()
+
     @property
     def role(self) -> str:
         """
@@ -340,12 +617,7 @@ class GroupMember:
             the names of input elements in the member's experiment session.
             The values are the user inputs.
         """
-        projection = {}
-        projection.update({key: False for key in dm._client_data_keys})
-        projection.update({key: False for key in dm._metadata_keys})
-
-        data = self.expdata.load(projection)
-        return dm.flatten(data)
+        return self.expdata.values()
 
     @property
     def session_data(self) -> dict:
@@ -431,14 +703,43 @@ class GroupMember:
 
 
 class MemberManager:
+    #: Fields that are searched by :meth:`.monitoring_page`
+    MONITORING_SEARCH_FIELDS = ("session_id", "group_id", "role", "exp_condition")
+
+    #: Fields of :meth:`.monitoring_data` that are available without
+    #: joining experiment data
+    _MONITORING_MEMBER_FIELDS = (
+        "session_id",
+        "group_id",
+        "role",
+        "ping",
+        "created",
+        "match_time",
+    )
+
+    #: Fields of experiment data loaded by :meth:`.load_statuses`
+    _STATUS_FIELDS = (
+        "exp_finished",
+        "exp_aborted",
+        "exp_start_time",
+        "exp_save_time",
+        "exp_session_timeout",
+    )
+
+    #: Fields of experiment data joined by :meth:`.monitoring_pipeline`
+    _MONITORING_EXP_FIELDS = ("exp_condition",) + _STATUS_FIELDS
+
     def __init__(self, matchmaker):
         self.mm = matchmaker
         self.exp = self.mm.exp
-        self.db = self.exp.db_misc
         self._active_sessions_projection = None
         self._last_update = None
         self.method = saving_method(self.exp)
 
+    @property
+    def db(self):
+        return db_misc(self.exp)
+
     @property
     def query_mm(self) -> dict:
         q = {}
@@ -489,32 +790,31 @@ class MemberManager:
             return self._find_active_sessions_mongo(sessions)
 
     def _find_active_sessions_local(self, sessions: List[str] = None) -> Iterator[str]:
-        for member in self.members():
-            if member.status.active:
-                yield member.data.session_id
+        for member in self._active_local():
+            yield member.data.session_id
 
     def _find_finished_sessions_mongo(
         self, sessions: List[str] = None
     ) -> Iterator[str]:
         q = self.query_finished_sessions(sessions)
-        cursor = self.exp.db_main.find(q, projection=["exp_session_id"])
-        for sessiondata in cursor:
-            status = SessionGroup([sessiondata["exp_session_id"]])
-            if status.finished(self.exp):
+        p = ["exp_session_id", *self._STATUS_FIELDS]
+        for sessiondata in db_main(self.exp).find(q, projection=p):
+            if self.session_flags(sessiondata)["finished"]:
                 yield sessiondata["exp_session_id"]
 
     def _find_active_sessions_mongo(self, sessions: List[str] = None) -> Iterator[str]:
         q = self.query_active_sessions(sessions)
-        cursor = self.exp.db_main.find(q, projection=["exp_session_id"])
-        for sessiondata in cursor:
-            status = SessionGroup([sessiondata["exp_session_id"]])
-            if status.pending(self.exp):
+        p = ["exp_session_id", *self._STATUS_FIELDS]
+        for sessiondata in db_main(self.exp).find(q, projection=p):
+            if not any(self.session_flags(sessiondata).values()):
                 yield sessiondata["exp_session_id"]
 
     def _find_finished_sessions_local(self, sessions: List[str]) -> Iterator[str]:
-        for m in self.members():
-            if m.status.finished and m.data.session_id in sessions:
-                yield m.data.session_id
+        members = [m.data.session_id for m in self.members()]
+        statuses = self.session_statuses(members)
+        for sid in members:
+            if statuses.get(sid) == "finished" and sid in sessions:
+                yield sid
 
     def active_sessions_projection(self, cache_length: int = 1) -> dict:
         now = time.time()
@@ -535,8 +835,11 @@ class MemberManager:
             return self._active_mongo()
 
     def _active_local(self) -> Iterator[GroupMember]:
-        for m in self.members():
-            if m.status.active:
+        members = list(self.members())
+        statuses = self.session_statuses([m.data.session_id for m in members])
+        for m in members:
+            # sessions without experiment data count as active
+            if statuses.get(m.data.session_id, "active") == "active":
                 yield m
 
     def _active_mongo(self) -> Iterator[GroupMember]:
@@ -547,7 +850,7 @@ class MemberManager:
         data = data["members"].values()
 
         for mdata in data:
-            yield GroupMember(matchmaker=self.mm, **mdata)
+            yield self._member(mdata)
 
     def waiting(self, ping_timeout: int) -> Iterator[GroupMember]:
         for m in self.unmatched():
@@ -557,7 +860,20 @@ class MemberManager:
     def members(self) -> Iterator[GroupMember]:
         data = self.mm.io.load().members.values()
         for mdata in data:
-            yield GroupMember(matchmaker=self.mm, **mdata)
+            yield self._member(mdata)
+
+    def _member(self, data: dict) -> GroupMember:
+        """
+        Returns the registered member for the loaded member *data* with
+        updated data, or a new member.
+        """
+        member = self.mm.identity_map.member(data["session_id"])
+        if member is None:
+            member = GroupMember(matchmaker=self.mm, **data)
+            member.data.mark_clean()
+        else:
+            member._update(data)
+        return member
 
     def unmatched(self) -> Iterator[GroupMember]:
         for m in self.active():
@@ -569,18 +885,393 @@ class MemberManager:
             if m.status.matched:
                 yield m
 
+    def monitoring_data(self) -> Iterator[dict]:
+        """
+        Yields one flat dictionary per member of the matchmaker, joined
+        with the member's experiment data that is needed for monitoring.
+
+        In mongo experiments, this is a single aggregation. The joined
+        experiment data is projected to the fields used in monitoring,
+        the move history is reduced to its last entry.
+        In local experiments, this is a single pass over the local
+        experiment data.
+        """
+        if self.method == "local":
+            return self._monitoring_data_local()
+
+        elif self.method == "mongo":
+            return self._monitoring_data_mongo()
+
+    def monitoring_pipeline(self) -> list:
+        """
+        list: Aggregation pipeline used by :meth:`.monitoring_data`.
+        Assumes that the main and misc collection live in the same
+        database, which is the default in alfred3.
+        """
+        return self._monitoring_member_stages() + self._monitoring_join_stages()
+
+    def _monitoring_member_stages(self) -> list:
+        return [
+            {"$match": self.query_mm},
+            {"$project": {"_id": False, "member": {"$objectToArray": "$members"}}},
+            {"$unwind": "$member"},
+            {"$replaceRoot": {"newRoot": "$member.v"}},
+        ]
+
+    def _monitoring_join_stages(self) -> list:
+        # The sub-pipeline keeps only the experiment data document of each
+        # session and the fields shown in monitoring, so that complete
+        # session documents are never pulled into the join.
+        exp_fields = {f: True for f in self._MONITORING_EXP_FIELDS}
+        exp_fields["_id"] = False
+        exp_fields["last_move"] = {"$arrayElemAt": ["$exp_move_history", -1]}
+
+        return [
+            {
+                "$lookup": {
+                    "from": self.exp.db_main.name,
+                    "let": {"sid": "$session_id"},
+                    "pipeline": [
+                        {"$match": {"type": dm.EXP_DATA}},
+                        {"$match": {"$expr": {"$eq": ["$exp_session_id", "$$sid"]}}},
+                        {"$project": exp_fields},
+                    ],
+                    "as": "exp",
+                }
+            },
+            {"$unwind": {"path": "$exp", "preserveNullAndEmptyArrays": True}},
+            {
+                "$project": {
+                    "_id": False,
+                    "session_id": True,
+                    "group_id": True,
+                    "role": True,
+                    "ping": True,
+                    "created": True,
+                    "match_time": True,
+                    **{f: f"$exp.{f}" for f in self._MONITORING_EXP_FIELDS},
+                    "last_move": "$exp.last_move",
+                }
+            },
+        ]
+
+    def _monitoring_data_mongo(self) -> Iterator[dict]:
+        return self.db.aggregate(self.monitoring_pipeline())
+
+    def monitoring_page(
+        self,
+        skip: int = 0,
+        limit: int = None,
+        sort: List[tuple] = None,
+        search: str = None,
+    ) -> dict:
+        """
+        Returns one page of :meth:`.monitoring_data`.
+
+        Sorting, filtering and pagination are pushed down into the
+        database. If neither sorting nor searching refers to experiment
+        data, the page is cut before experiment data is joined, so that
+        only the members on the page are joined.
+
+        Args:
+            skip (int): Number of members to skip.
+            limit (int): Maximum number of members on the page. If *None*,
+                all members after *skip* are returned.
+            sort (list): List of (field, direction) tuples, where *field*
+                is a key of the dictionaries yielded by
+                :meth:`.monitoring_data` (dot notation for nested keys)
+                and *direction* is 1 or -1.
+            search (str): If given, only members for which one of
+                :attr:`.MONITORING_SEARCH_FIELDS` contains this string
+                (case-insensitive) are included.
+
+        Returns:
+            dict: A dictionary with the keys "total" (number of members),
+            "filtered" (number of members matching *search*) and "data"
+            (list of dictionaries for the members on the page).
+        """
+        sort = list(sort) if sort else []
+        if "session_id" not in (field for field, _ in sort):
+            sort.append(("session_id", 1))  # stable order for pagination
+
+        if self.method == "local":
+            return self._monitoring_page_local(skip, limit, sort, search)
+
+        elif self.method == "mongo":
+            return self._monitoring_page_mongo(skip, limit, sort, search)
+
+    def _monitoring_page_mongo(self, skip, limit, sort, search) -> dict:
+        join = self._monitoring_join_stages()
+
+        sort_stage = {"$sort": dict(sort)}
+        page = [{"$skip": int(skip)}]
+        if limit is not None:
+            page.append({"$limit": int(limit)})
+
+        if search:
+            pattern = {"$regex": re.escape(search), "$options": "i"}
+            fields = self.MONITORING_SEARCH_FIELDS
+            match = [{"$match": {"$or": [{f: pattern} for f in fields]}}]
+        else:
+            match = []
+
+        member_fields = self._MONITORING_MEMBER_FIELDS
+        join_first = search or any(f not in member_fields for f, _ in sort)
+
+        if join_first:
+            filtered = join + match
+            rows = join + match + [sort_stage] + page
+        else:
+            filtered = []
+            rows = [sort_stage] + page + join
+
+        pipeline = self._monitoring_member_stages()
+        pipeline.append(
+            {
+                "$facet": {
+                    "total": [{"$count": "n"}],
+                    "filtered": filtered + [{"$count": "n"}],
+                    "data": rows,
+                }
+            }
+        )
+
+        result = next(self.db.aggregate(pipeline), None) or {}
+
+        total = result.get("total") or [{"n": 0}]
+        filtered = result.get("filtered") or [{"n": 0}]
+
+        d = {}
+        d["total"] = total[0]["n"]
+        d["filtered"] = filtered[0]["n"]
+        d["data"] = result.get("data", [])
+        return d
+
+    def _monitoring_page_local(self, skip, limit, sort, search) -> dict:
+        data = list(self._monitoring_data_local())
+        total = len(data)
+
+        if search:
+            search = search.lower()
+            fields = self.MONITORING_SEARCH_FIELDS
+            data = [
+                d
+                for d in data
+                if any(search in str(d.get(f) or "").lower() for f in fields)
+            ]
+
+        for col, direction in reversed(sort):
+            data.sort(key=self._sort_key(col), reverse=direction == -1)
+
+        end = None if limit is None else skip + limit
+
+        d = {}
+        d["total"] = total
+        d["filtered"] = len(data)
+        d["data"] = data[skip:end]
+        return d
+
+    @staticmethod
+    def _sort_key(field: str):
+        def key(data: dict):
+            value = data
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            return (value is not None, value if value is not None else 0)
+
+        return key
+
+    def _monitoring_data_local(self) -> Iterator[dict]:
+        members = self.mm.io.load().members
+
+        expdata = {}
+        for data in session_index(self.exp).load_many(list(members)):
+            expdata[data["exp_session_id"]] = data
+
+        for sid, mdata in members.items():
+            data = expdata.get(sid, {})
+            moves = data.get("exp_move_history") or [None]
+
+            d = {}
+            d["session_id"] = sid
+            d["group_id"] = mdata.get("group_id")
+            d["role"] = mdata.get("role")
+            d["ping"] = mdata.get("ping")
+            d["created"] = mdata.get("created")
+            d["match_time"] = mdata.get("match_time")
+            d["exp_condition"] = data.get("exp_condition")
+            d["exp_start_time"] = data.get("exp_start_time")
+            d["exp_save_time"] = data.get("exp_save_time")
+            d["exp_finished"] = data.get("exp_finished")
+            d["exp_aborted"] = data.get("exp_aborted")
+            if "exp_session_timeout" in data:
+                d["exp_session_timeout"] = data["exp_session_timeout"]
+            d["last_move"] = moves[-1]
+            yield d
+
+    def session_flags(self, data: dict) -> dict:
+        """
+        Returns whether a session is finished, aborted or expired,
+        computed from a dictionary of experiment data without further
+        queries.
+
+        The flags are determined by :class:`alfred3.quota.SessionGroup`,
+        i.e. a session expires after its own ``exp_session_timeout``,
+        counted from ``exp_save_time`` if it has not started yet. Data
+        without a session timeout falls back to the timeout of the
+        current session.
+
+        Returns:
+            dict: A dictionary with the keys "finished", "aborted" and
+            "expired".
+        """
+        sid = data.get("exp_session_id", data.get("session_id"))
+        session = {"exp_session_timeout": self.exp.session_timeout, **data}
+        session["exp_session_id"] = sid
+
+        status = SessionGroup(sessions=[sid])
+        timeout = session["exp_session_timeout"]
+
+        d = {}
+        d["finished"] = status.finished(self.exp, [session])
+        d["aborted"] = status.aborted(self.exp, [session])
+        d["expired"] = bool(timeout) and status.expired(self.exp, [session])
+        return d
+
+    def session_status(self, data: dict) -> str:
+        """
+        Returns the status of a session as printed by
+        :meth:`.GroupMemberStatus.print_status`, computed from a
+        dictionary yielded by :meth:`.monitoring_data` or
+        :meth:`.load_statuses` without further queries. See
+        :meth:`.session_flags` for the underlying logic.
+        """
+        if "exp_finished" not in data or data["exp_finished"] is None:
+            return None
+
+        flags = self.session_flags(data)
+
+        if not any(flags.values()):
+            return "active"
+        elif flags["finished"]:
+            return "finished"
+        elif flags["aborted"]:
+            return "aborted"
+        elif flags["expired"]:
+            return "expired"
+
+    def load_statuses(self, sessions: List[str]) -> List[dict]:
+        """
+        Loads the status of several sessions with a single query.
+
+        Args:
+            sessions (list): Session ids.
+
+        Returns:
+            list: One dictionary per session with experiment data. The
+            dictionaries contain the session id, the fields in
+            :attr:`._STATUS_FIELDS` and the key "status", holding the
+            status as returned by :meth:`.session_status`.
+        """
+        if not sessions:
+            return []
+
+        if self.method == "local":
+            data = list(session_index(self.exp).statuses(list(sessions)))
+        elif self.method == "mongo":
+            data = self.load_expdata(sessions, list(self._STATUS_FIELDS))
+
+        for d in data:
+            d["status"] = self.session_status(d)
+        return data
+
+    def session_statuses(self, sessions: List[str]) -> dict:
+        """
+        Returns the status of several sessions with a single query.
+
+        Args:
+            sessions (list): Session ids.
+
+        Returns:
+            dict: Session ids and their status, as returned by
+            :meth:`.session_status`. Sessions without experiment data
+            are missing.
+        """
+        return {d["exp_session_id"]: d["status"] for d in self.load_statuses(sessions)}
+
+    def load_expdata(self, sessions: List[str], fields: List[str] = None) -> list:
+        """
+        Loads the experiment data of several sessions at once.
+
+        Args:
+            sessions (list): Session ids.
+            fields (list): Top-level fields to load. Defaults to *None*,
+                in which case the full data is loaded. The session id is
+                always included.
+
+        Returns:
+            list: Experiment data documents.
+        """
+        if not sessions:
+            return []
+
+        if self.method == "mongo":
+            return self._load_expdata_mongo(sessions, fields)
+        elif self.method == "local":
+            return self._load_expdata_local(sessions, fields)
+
+    def _load_expdata_mongo(self, sessions: List[str], fields: List[str]) -> list:
+        q = {}
+        q["exp_id"] = self.exp.exp_id
+        q["type"] = dm.EXP_DATA
+        q["exp_session_id"] = {"$in": list(sessions)}
+
+        if fields is None:
+            p = {"_id": False}
+        else:
+            p = {field: True for field in fields}
+            p.update({"_id": False, "exp_session_id": True})
+
+        return list(db_main(self.exp).find(q, projection=p))
+
+    def _load_expdata_local(self, sessions: List[str], fields: List[str]) -> list:
+        data = []
+        for doc in session_index(self.exp).load_many(sessions):
+            if fields is not None:
+                doc = _project(doc, list(fields) + ["exp_session_id"])
+            data.append(doc)
+        return data
+
     def find(self, sessions: List[str]) -> Iterator[GroupMember]:
+        """
+        Yields the members with the given session ids. Members that are
+        registered in the matchmaker's :class:`.IdentityMap` are returned
+        without a query, i.e. their data is as current as the last load
+        or save in this session. Use :meth:`.GroupMember.refresh` to
+        reload it.
+        """
+        missing = []
+        for sid in sessions:
+            member = self.mm.identity_map.member(sid)
+            if member is not None:
+                yield member
+            else:
+                missing.append(sid)
+
+        if not missing:
+            return
+
         if self.method == "local":
-            return self._find_local(sessions)
+            yield from self._find_local(missing)
 
         elif self.method == "mongo":
-            return self._find_mongo(sessions)
+            yield from self._find_mongo(missing)
 
     def _find_local(self, sessions: List[str]) -> Iterator[GroupMember]:
         data = self.mm.io.load().members.values()
         for mdata in data:
             if mdata["session_id"] in sessions:
-                yield GroupMember(matchmaker=self.mm, **mdata)
+                yield self._member(mdata)
 
     def _find_mongo(self, sessions: List[str]) -> Iterator[GroupMember]:
         q = self.query_mm
@@ -591,4 +1282,4 @@ class MemberManager:
         data = data["members"].values()
 
         for mdata in data:
-            yield GroupMember(matchmaker=self.mm, **mdata)
+            yield self._member(mdata)
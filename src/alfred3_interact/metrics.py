@@ -0,0 +1,290 @@
+"""
+Metrics recorded by the MatchMaker.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from . import instrument
+from ._util import file_lock, saving_method
+
+#: Upper bounds (in seconds) of the histogram buckets. The last bucket
+#: catches everything above the last finite bound.
+BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+    600,
+    1200,
+    math.inf,
+)
+
+
+@dataclass
+class Histogram:
+    """
+    A histogram with fixed buckets, see :data:`.BUCKETS`.
+
+    The counts are not cumulative. Bucket *i* counts observations *x*
+    with ``BUCKETS[i-1] < x <= BUCKETS[i]``.
+    """
+
+    buckets: List[int] = field(default_factory=lambda: [0] * len(BUCKETS))
+    sum: float = 0.0
+    count: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        """
+        Creates a histogram from its persisted form, in which the
+        buckets are stored as a dictionary of index strings to counts.
+        """
+        hist = cls(sum=data.get("sum", 0.0), count=data.get("count", 0))
+        for i, n in data.get("buckets", {}).items():
+            hist.buckets[int(i)] = n
+        return hist
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the *q*-quantile by linear interpolation within the
+        bucket that contains it.
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if seen + n >= rank and n > 0:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i]
+                if math.isinf(upper):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+
+        return BUCKETS[-2]
+
+    def increments(self, prefix: str) -> Dict[str, float]:
+        """
+        Returns the histogram as a flat dictionary of dot-notation paths
+        to increments, suitable for a MongoDB ``$inc`` update.
+        """
+        inc = {f"{prefix}.buckets.{i}": n for i, n in enumerate(self.buckets) if n}
+        inc[f"{prefix}.sum"] = self.sum
+        inc[f"{prefix}.count"] = self.count
+        return inc
+
+
+class MatchMakerMetrics:
+    """
+    Records match latency, lock contention and matching failures of a
+    matchmaker.
+
+    Metrics are buffered per process and shared by all sessions that
+    use the same matchmaker. Every :attr:`.flush_interval` seconds, the
+    buffer is added to the matchmaker's metrics document (type
+    ``matchmaker_metrics``), so that metrics from multiple processes
+    add up.
+
+    Recorded metrics:
+
+    - Histogram ``time_to_match.<spec>``: Seconds between registration
+      of a member and its assignment to a role.
+    - Histogram ``lock_wait``: Seconds a session waited to acquire the
+      matchmaker lock, counted from its first failed attempt.
+    - Histogram ``lock_hold``: Seconds the matchmaker lock was held.
+    - Counter ``no_match.<spec>``: Unsuccessful matching efforts. Efforts
+      that did not reach a spec (e.g. during the waiting time of
+      :meth:`.MatchMaker.match_random`) are counted as ``no_match.-``.
+    - Counter ``matchmaker_busy``: Raised :class:`.MatchMakerBusy`.
+    - Counter ``busy_group``: Raised :class:`.BusyGroup`.
+
+    Args:
+        matchmaker (MatchMaker): The matchmaker.
+    """
+
+    _DATA_TYPE = "matchmaker_metrics"
+
+    #: Seconds in between two writes of buffered metrics
+    flush_interval: float = 30
+
+    _buffers = {}
+    _last_flush = {}
+    _lock = threading.Lock()
+
+    def __init__(self, matchmaker):
+        self.mm = matchmaker
+        self.exp = self.mm.exp
+
+    @property
+    def key(self) -> tuple:
+        return (self.exp.exp_id, self.mm.exp_version, self.mm.matchmaker_id)
+
+    @property
+    def query(self) -> dict:
+        q = {}
+        q["type"] = self._DATA_TYPE
+        q["exp_id"] = self.exp.exp_id
+        q["exp_version"] = self.mm.exp_version
+        q["matchmaker_id"] = self.mm.matchmaker_id
+        return q
+
+    @property
+    def path(self):
+        return self.mm.io.path.with_name(f"{self.mm.io.path.stem}_metrics.json")
+
+    @staticmethod
+    def _name(name: str, label: str = None) -> str:
+        if label is None:
+            return name
+        return f"{name}.{str(label).replace('.', '_')}"
+
+    def _buffer(self) -> dict:
+        return self._buffers.setdefault(self.key, {"histograms": {}, "counters": {}})
+
+    def observe(self, name: str, value: float, label: str = None):
+        """
+        Adds an observation to the histogram *name*.
+        """
+        name = self._name(name, label)
+        with self._lock:
+            histograms = self._buffer()["histograms"]
+            histograms.setdefault(name, Histogram()).observe(value)
+        self.flush()
+
+    def count(self, name: str, label: str = None, n: int = 1):
+        """
+        Increases the counter *name* by *n*.
+        """
+        name = self._name(name, label)
+        with self._lock:
+            counters = self._buffer()["counters"]
+            counters[name] = counters.get(name, 0) + n
+        self.flush()
+
+    def flush(self, force: bool = False):
+        """
+        Adds buffered metrics to the metrics document, if the last flush
+        is at least :attr:`.flush_interval` seconds ago or *force* is
+        *True*.
+        """
+        now = time.time()
+        with self._lock:
+            last = self._last_flush.setdefault(self.key, now)
+            if not force and now - last < self.flush_interval:
+                return
+
+            buffer = self._buffers.pop(self.key, None)
+            self._last_flush[self.key] = now
+
+        if not buffer:
+            return
+
+        inc = {}
+        for name, hist in buffer["histograms"].items():
+            inc.update(hist.increments(f"histograms.{name}"))
+        for name, n in buffer["counters"].items():
+            inc[f"counters.{name}"] = n
+
+        if not inc:
+            return
+
+        if saving_method(self.exp) == "mongo":
+            self._flush_mongo(inc)
+        elif saving_method(self.exp) == "local":
+            self._flush_local(inc)
+
+    def _flush_mongo(self, inc: dict):
+        instrument.db_misc(self.exp).update_one(self.query, {"$inc": inc}, upsert=True)
+
+    def _flush_local(self, inc: dict):
+        # Processes that share the data directory flush to the same file.
+        # The update takes the matchmaker's file lock, and the file is
+        # replaced atomically, so that readers never see a partial write.
+        with file_lock(self.mm.io.path):
+            data = self._load_local()
+            for path, n in inc.items():
+                *parents, last = path.split(".")
+                d = data
+                for key in parents:
+                    d = d.setdefault(key, {})
+                d[last] = d.get(last, 0) + n
+
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with instrument.open_file(self.exp, tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, sort_keys=True, indent=4)
+            os.replace(tmp, self.path)
+
+    def _load_local(self) -> dict:
+        if self.path.is_file():
+            with instrument.open_file(self.exp, self.path, encoding="utf-8") as f:
+                return json.load(f)
+        return dict(self.query)
+
+    def load(self) -> dict:
+        """
+        Flushes the buffer and returns the persisted metrics.
+
+        Returns:
+            dict: A dictionary with the keys "histograms", mapping names
+            to :class:`.Histogram` objects, and "counters", mapping
+            names to counts.
+        """
+        self.flush(force=True)
+
+        if saving_method(self.exp) == "mongo":
+            db = instrument.db_misc(self.exp)
+            data = db.find_one(self.query, {"_id": False}) or {}
+        elif saving_method(self.exp) == "local":
+            data = self._load_local()
+
+        d = {}
+        d["histograms"] = {
+            name: Histogram.from_dict(hist)
+            for name, hist in self._flatten(data.get("histograms", {}))
+        }
+        d["counters"] = dict(self._flatten(data.get("counters", {})))
+        return d
+
+    @staticmethod
+    def _flatten(data: dict, prefix: str = ""):
+        """
+        Yields (name, value) pairs from nested dictionaries. Histograms
+        (dictionaries with a "count" key) and numbers are leaves.
+        """
+        for key, value in data.items():
+            name = f"{prefix}.{key}" if prefix else key
+            if isinstance(value, dict) and "count" not in value:
+                yield from MatchMakerMetrics._flatten(value, name)
+            else:
+                yield name, value
@@ -9,10 +9,15 @@ from abc import abstractmethod
 import alfred3 as al
 from alfred3 import admin
 from alfred3._helper import inherit_kwargs
-from alfred3.element.misc import RepeatedCallback
 
-from ._util import MatchMakerBusy, NoMatch
-from .element import ToggleMatchMakerActivation, ViewMembers
+from ._util import MatchMakerBusy, NoMatch, PollInterval
+from .element import (
+    AdaptiveCallback,
+    ToggleMatchMakerActivation,
+    ViewMembers,
+    ViewMetrics,
+    ViewOperations,
+)
 
 
 @inherit_kwargs
@@ -169,7 +174,19 @@ class MatchMakerMonitoring(admin.SpectatorPage):
             width="full",
         )
 
+        self += al.VerticalSpace("30px")
+        self += al.Text("## MatchMaker Metrics")
+        self += ViewMetrics(match_maker=self.match_maker, name="view_mm_metrics")
+        self += al.Text(
+            "Note: Times are given in seconds. Metrics are written to the"
+            " database in intervals, so the most recent events of other"
+            " processes may be missing.",
+            font_size="small",
+            width="full",
+        )
+
         self += al.Style(code="#view_mm {{font-size: 85%;}}")
+        self += al.Style(code="#view_mm_metrics {{font-size: 85%;}}")
 
         # datatables javascript package
         # self += al.Style(url="//cdn.datatables.net/1.10.24/css/jquery.dataTables.min.css")
@@ -184,6 +201,52 @@ class MatchMakerMonitoring(admin.SpectatorPage):
         )
 
 
+@inherit_kwargs
+class DatabaseMonitoring(admin.SpectatorPage):
+    """
+    Admin page for monitoring the database and file operations of
+    alfred3-interact, see :mod:`.instrument`.
+
+    The page lists the recorded operations and links to their export as
+    Prometheus exposition text and as JSON. Operations are only recorded
+    while instrumentation is enabled.
+
+    .. note:: This page requires spectator access (level 1) to the admin mode.
+
+    Args:
+        {kwargs}
+
+    Examples:
+
+        We enable instrumentation in *config.conf*::
+
+            # config.conf
+            [interact]
+            instrument = true
+
+        and add the monitoring page to the experiment's admin mode::
+
+            import alfred3 as al
+            import alfred3_interact as ali
+
+            exp = al.Experiment()
+            exp.admin += ali.DatabaseMonitoring(name="db_monitor")
+
+    """
+
+    title = "Database Monitoring"
+
+    def on_exp_access(self):
+        self += ViewOperations(name="view_db_operations")
+        self += al.Text(
+            "Note: Operations are recorded per process. Latencies include"
+            " the time needed to iterate over all returned documents.",
+            font_size="small",
+            width="full",
+        )
+        self += al.Style(code="#view_db_operations {{font-size: 85%;}}")
+
+
 class DefaultWaitingTimeoutPage(al.Page):
     """
     Default page to be displayed upon waiting timeouts.
@@ -245,8 +308,16 @@ class WaitingPage(al.NoNavigationPage):
             timeout is ``60 * 20``, i.e. 20 minutes.
             Can be defined as a class attribute.
         wait_sleep_time (int): Number of seconds in between two internal
-            calls to :meth:`.wait_for`. Defaults to None, in which case
-            a call will be made every two seconds.
+            calls to :meth:`.wait_for` while there is activity. Defaults
+            to None, in which case a call will be made every three seconds.
+            Can be defined as a class attribute.
+        wait_max_sleep_time (int): Maximum number of seconds in between
+            two internal calls to :meth:`.wait_for`. While nothing happens,
+            the time between two calls doubles with every call until it
+            reaches this value. Defaults to None, in which case the
+            maximum is 10 seconds. Must be smaller than the MatchMaker's
+            *ping_timeout*, because waiting sessions are only considered
+            for parallel groups if they ping regularly.
             Can be defined as a class attribute.
         wait_timeout_page (alfred3.Page): A custom page to be displayed
             in case of a waiting timeout. Defaults to an instance of
@@ -355,10 +426,14 @@ class WaitingPage(al.NoNavigationPage):
     wait_timeout: int = 60 * 20
 
     #: Number of seconds in between two internal
-    #: calls to :meth:`.wait_for`. Defaults to None, in which case
-    #: a call will be made every two seconds.
+    #: calls to :meth:`.wait_for` while there is activity. Defaults to
+    #: None, in which case a call will be made every three seconds.
     wait_sleep_time: int = 3
 
+    #: Maximum number of seconds in between two internal calls to
+    #: :meth:`.wait_for` while nothing happens.
+    wait_max_sleep_time: int = 10
+
     #: Abort page to be displayed on timeout
     wait_timeout_page = None
 
@@ -371,6 +446,7 @@ class WaitingPage(al.NoNavigationPage):
         wait_msg: str = None,
         wait_timeout: int = None,
         wait_sleep_time: int = None,
+        wait_max_sleep_time: int = None,
         wait_timeout_page: al.Page = None,
         wait_exception_page: al.Page = None,
         **kwargs,
@@ -386,6 +462,9 @@ class WaitingPage(al.NoNavigationPage):
         if wait_sleep_time is not None:
             self.wait_sleep_time = wait_sleep_time
 
+        if wait_max_sleep_time is not None:
+            self.wait_max_sleep_time = wait_max_sleep_time
+
         if wait_timeout_page is not None:
             self.wait_timeout_page = wait_timeout_page
         elif self.wait_timeout_page is None:
@@ -396,11 +475,19 @@ class WaitingPage(al.NoNavigationPage):
         elif self.wait_exception_page is None:
             self.wait_exception_page = DefaultWaitingExceptionPage()
 
-        self += RepeatedCallback(
-            func=self._wait_for,
+        #: Backoff for the time in between two calls to :meth:`.wait_for`.
+        #: Call ``self.poll_interval.activity()`` in :meth:`.wait_for` to
+        #: signal that something happened and the next call should
+        #: follow soon.
+        self.poll_interval = PollInterval(
+            self.wait_sleep_time, self.wait_max_sleep_time
+        )
+        self._nwaiting = None
+
+        self += AdaptiveCallback(
+            func=self._poll,
             interval=self.wait_sleep_time,
-            followup="custom",
-            custom_js="if (data) {move('forward')};",
+            custom_js="move('forward');",
         )
 
         #: Time of waiting start in seconds since epoch
@@ -444,10 +531,22 @@ class WaitingPage(al.NoNavigationPage):
         forwards participants to the next page.
 
         It will be repeatedly called internally with the time between
-        two calls defined by :attr:`.wait_sleep_time`.
+        two calls defined by :attr:`.wait_sleep_time` and
+        :attr:`.wait_max_sleep_time`.
         """
         pass
 
+    def _poll(self) -> dict:
+        """
+        Ajax endpoint for the waiting page. Calls :meth:`._wait_for` and
+        returns its result together with the number of seconds until
+        the client should call again.
+        """
+        d = {}
+        d["done"] = bool(self._wait_for())
+        d["next_poll_in"] = self.poll_interval.current
+        return d
+
     def _wait_for(self) -> bool:
         """
         This method gets called repeatedly via ajax callback from the
@@ -467,16 +566,39 @@ class WaitingPage(al.NoNavigationPage):
         try:
             wait_status = self.wait_for()  # can return None
 
-        except (NoMatch, MatchMakerBusy):
+        except NoMatch as e:
+            self._observe_waiting_pool(e.nwaiting)
             return False  # return False so that the repeated callback will try again
 
+        except MatchMakerBusy:
+            # other sessions are matching right now, so we try again soon
+            self.poll_interval.activity()
+            return False
+
         except Exception:
             self.log.exception("Exception in waiting function. Aborting experiment.")
             self.exp.abort(reason="waiting error", page=self.wait_exception_page)
             return True
 
+        if not wait_status:
+            self.poll_interval.idle()
+
         return wait_status
 
+    def _observe_waiting_pool(self, nwaiting: int):
+        """
+        Shortens the polling interval if the waiting pool has grown since
+        the last call, otherwise lets it back off.
+        """
+        grown = nwaiting is not None and nwaiting > (self._nwaiting or 0)
+        if nwaiting is not None:
+            self._nwaiting = nwaiting
+
+        if grown:
+            self.poll_interval.activity()
+        else:
+            self.poll_interval.idle()
+
     def on_expire(self):
         self.log.exception("Timeout on waiting page. Aborting experiment.")
         self.exp.abort(reason="timeout", page=self.wait_timeout_page)
@@ -491,6 +613,121 @@ class WaitingPage(al.NoNavigationPage):
         self += al.Text(self.wait_msg, align="center")
 
 
+@inherit_kwargs
+class SyncPage(WaitingPage):
+    """
+    A waiting page that synchronizes the members of a group.
+
+    When the page is shown, the session arrives at a barrier of the
+    group (see :meth:`.Group.barrier`). The page proceeds, once all
+    group members have arrived. Members who finished, aborted or
+    expired without arriving are not waited for.
+
+    Each poll costs one projected read of the group document, plus a
+    single status query of the missing members at most every
+    *sync_status_interval* seconds.
+
+    Args:
+        group_location (str): Location of the group object, relative to
+            the experiment session. Defaults to "plugins.group".
+            Can be defined as a class attribute.
+        barrier_name (str): Name of the barrier. Defaults to None, in
+            which case the page name is used. Can be defined as a class
+            attribute.
+        sync_status_interval (float): Minimum time in seconds between
+            two checks of the status of members who have not arrived.
+            Defaults to 10. Can be defined as a class attribute.
+        {kwargs}
+
+    Examples:
+
+        ::
+
+            import alfred3 as al
+            import alfred3_interact as ali
+
+            exp = al.Experiment()
+
+            @exp.setup
+            def setup(exp):
+                spec = ali.ParallelSpec("a", "b", nslots=10, name="spec1")
+                exp.plugins.mm = ali.MatchMaker(spec, exp=exp)
+
+
+            @exp.member
+            class Match(ali.MatchingPage):
+
+                def wait_for(self):
+                    self.exp.plugins.group = self.exp.plugins.mm.match()
+                    return True
+
+
+            @exp.member
+            class Decision(al.Page):
+
+                def on_exp_access(self):
+                    self += al.NumberEntry(leftlab="Contribution", name="c")
+
+
+            exp += ali.SyncPage(name="sync_decision")
+
+    """
+
+    #: Location of the group object, relative to the experiment session
+    group_location: str = "plugins.group"
+
+    #: Name of the barrier. Defaults to the page name.
+    barrier_name: str = None
+
+    #: Minimum time in seconds between two status checks of the members
+    #: who have not arrived
+    sync_status_interval: float = 10
+
+    def __init__(
+        self,
+        *args,
+        group_location: str = None,
+        barrier_name: str = None,
+        sync_status_interval: float = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+
+        if group_location is not None:
+            self.group_location = group_location
+
+        if barrier_name is not None:
+            self.barrier_name = barrier_name
+
+        if sync_status_interval is not None:
+            self.sync_status_interval = sync_status_interval
+
+        self._arrived = False
+
+    @property
+    def group(self):
+        """
+        Group: The group to be synchronized.
+        """
+        return operator.attrgetter(self.group_location)(self.exp)
+
+    @property
+    def barrier(self):
+        """
+        GroupBarrier: The barrier of this page.
+        """
+        name = self.barrier_name or self.name
+        return self.group.barrier(name, status_interval=self.sync_status_interval)
+
+    def wait_for(self) -> bool:
+        barrier = self.barrier
+        if not self._arrived:
+            barrier.arrive()
+            self._arrived = True
+
+        return barrier.passed()
+
+
 @inherit_kwargs
 class MatchingPage(WaitingPage):
     """
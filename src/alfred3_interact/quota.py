@@ -10,6 +10,8 @@ from alfred3.data_manager import saving_method
 from alfred3.quota import QuotaData, SessionQuota, Slot, SlotManager
 
 from .group import GroupType
+from .index import session_index
+from .instrument import db_main, db_misc, open_file
 
 
 @dataclass
@@ -24,7 +26,7 @@ class GroupSlot:
             return self._get_data_mongo(exp)
 
     def _get_data_mongo(self, exp) -> t.Iterator[dict]:
-        return exp.db_misc.find({"group_id": {"$in": self.group_ids}})
+        return db_misc(exp).find({"group_id": {"$in": self.group_ids}})
 
     def _get_data_local(self, exp) -> t.Iterator[dict]:
         path = exp.config.get("interact", "path", fallback="save/interact")
@@ -33,7 +35,7 @@ class GroupSlot:
         for fp in path.iterdir():
             if "group" not in str(fp):
                 continue
-            with open(fp, encoding="utf-8") as f:
+            with open_file(exp, fp, encoding="utf-8") as f:
                 group_data = json.load(f)
             if group_data["group_id"] in self.group_ids:
                 yield group_data
@@ -63,15 +65,13 @@ class GroupSlot:
 
     def _pending_members_local(self, exp, group_data) -> t.Iterator[dict]:
         earliest_start = time.time() - exp.session_timeout
-        path = exp.config.get("local_saving_agent", "path")
-        path = exp.subpath(path)
-        for session_data in dm.iterate_local_data(dm.EXP_DATA, path):
-            in_group = session_data["exp_session_id"] in group_data["members"]
+        statuses = session_index(exp).statuses(group_data["members"])
+        for session_data in statuses:
             aborted = session_data["exp_aborted"]
             finished = session_data["exp_finished"]
             start = session_data["exp_start_time"]
             expired = False if start is None else start < earliest_start
-            if in_group and not aborted and not finished and not expired:
+            if not aborted and not finished and not expired:
                 yield session_data
 
     def _pending_members_mongo(
@@ -90,7 +90,7 @@ class GroupSlot:
             ],
         }
 
-        return exp.db_main.find(q, projection=projection)
+        return db_main(exp).find(q, projection=projection)
 
     def npending(self, exp) -> int:
         counts = self._npending_members(exp)
@@ -132,23 +132,21 @@ class GroupSlot:
         data = self.get_data(exp)
         data = list(data)
 
-        path = exp.config.get("local_saving_agent", "path")
-        path = exp.subpath(path)
-        cursor = dm.iterate_local_data(dm.EXP_DATA, path)
-
         members = {}
         for group_data in data:
             members.update(
                 {sid: group_data["group_id"] for sid in group_data["members"]}
             )
 
+        cursor = session_index(exp).statuses(list(members))
+
         counts = self._count_pending(exp, members, data, cursor)
 
         return counts
 
     def _npending_groups_mongo(self, exp) -> int:
         p = ["group_id", "members", "type"]
-        data = exp.db_misc.find({"group_id": {"$in": self.group_ids}}, projection=p)
+        data = db_misc(exp).find({"group_id": {"$in": self.group_ids}}, projection=p)
         data = list(data)
         members = {}
         for group_data in data:
@@ -158,7 +156,7 @@ class GroupSlot:
 
         q = {"exp_session_id": {"$in": list(members)}, "type": dm.EXP_DATA}
         p = ["exp_finished", "exp_aborted", "exp_start_time", "exp_session_id"]
-        cursor = exp.db_main.find(q, p)
+        cursor = db_main(exp).find(q, p)
         counts = self._count_pending(exp, members, data, cursor)
 
         return counts
@@ -172,12 +170,8 @@ class GroupSlot:
             return self._finished_members_mongo(exp, group_data, projection)
 
     def _finished_members_local(self, exp, group_data: dict) -> t.Iterator[dict]:
-        path = exp.config.get("local_saving_agent", "path")
-        path = exp.subpath(path)
-        for session_data in dm.iterate_local_data(dm.EXP_DATA, path):
-            sid = session_data["exp_session_id"]
-            finished = session_data["exp_finished"]
-            if sid in group_data["members"] and finished:
+        for session_data in session_index(exp).statuses(group_data["members"]):
+            if session_data["exp_finished"]:
                 yield session_data
 
     def _finished_members_mongo(
@@ -189,7 +183,7 @@ class GroupSlot:
             "exp_finished": True,
         }
 
-        return exp.db_main.find(q, projection=projection)
+        return db_main(exp).find(q, projection=projection)
 
     def _nfinished_members(self, exp):
         data = self.get_data(exp)
@@ -6,12 +6,12 @@ import random
 import re
 import typing as t
 from abc import ABC, abstractmethod
-from dataclasses import asdict
 
 from ._util import MatchingError, NoMatch, saving_method
 from .group import BusyGroup, Group, GroupManager, GroupType
 from .member import GroupMember
 from .quota import ParallelGroupQuota, SequentialGroupQuota
+from .unit import UnitOfWork
 
 
 class SequentialMatchMaker:
@@ -56,20 +56,26 @@ class SequentialMatchMaker:
         return group
 
     def start_group(self) -> Group:
-        with Group(self.mm, **self.data) as group:
-            self.log.info(f"Starting new group: {group}.")
+        unit = UnitOfWork(self.mm.exp)
+        group = Group(self.mm, unit=unit, **self.data)
+        self.log.info(f"Starting new group: {group}.")
 
+        try:
+            unit.add_member(self.mm.member)
             group += self.mm.member
 
             role = group.roles.next()
             group.roles.assign(role, self.mm.member)
 
-            self.mm.member.io.save()
-            group.io.save()
-            self.log.info(
-                f"Session matched to role '{self.mm.member.data.role}' in {group}."
-            )
-            return group
+            unit.commit()
+        except Exception:
+            unit.rollback()
+            raise
+
+        self.log.info(
+            f"Session matched to role '{self.mm.member.data.role}' in {group}."
+        )
+        return group
 
     def match_next_group(self) -> Group:
         with self.group_manager.next(self.ongoing_sessions_ok) as group:
@@ -116,6 +122,7 @@ class ParallelMatchMaker:
                 "Cannot match with parallel specs in local experiments."
             )
 
+        nwaiting = None
         with self.mm.io as data:
             if data is None:
                 self.log.debug("No groupwise match conducted. MatchMaker is busy.")
@@ -126,42 +133,46 @@ class ParallelMatchMaker:
                     return existing_group
 
                 waiting_members = self.mm.waiting_members
-                enough_members_waiting = len(waiting_members) >= len(self.roles)
+                nwaiting = len(waiting_members)
+                enough_members_waiting = nwaiting >= len(self.roles)
 
                 if enough_members_waiting:
-                    group = self.start_group(data, waiting_members)
+                    group = self.start_group(waiting_members)
                     return group
 
-        raise NoMatch  # if match is not successful
+        raise NoMatch(nwaiting=nwaiting)  # if match is not successful
 
-    def start_group(self, data, waiting_members: t.List[GroupMember]) -> Group:
-        with Group(self.mm, **self.data) as group:
-            self.log.info(f"Starting new group {group}.")
+    def start_group(self, waiting_members: t.List[GroupMember]) -> Group:
+        unit = UnitOfWork(self.mm.exp)
+        group = Group(self.mm, unit=unit, **self.data)
+        self.log.info(f"Starting new group {group}.")
 
-            if self.shuffle_waiting_members:
-                me = waiting_members[0]
-                others = waiting_members[1:]
-                random.shuffle(others)
-                waiting_members = [me] + others
+        if self.shuffle_waiting_members:
+            me = waiting_members[0]
+            others = waiting_members[1:]
+            random.shuffle(others)
+            waiting_members = [me] + others
 
-            candidates = (m for m in waiting_members)
+        candidates = (m for m in waiting_members)
 
+        try:
             group.roles.shuffle()
 
             while not len(group.data.members) == len(group.data.roles):
                 member = next(candidates)
+                unit.add_member(member)
                 group += member
 
                 role = next(group.roles.open())
                 group.roles.assign(role, member)
 
-                data.members[member.data.session_id] = asdict(member.data)
-
-            group.io.save()
-            self.mm.io.save(data=data)
+            unit.commit()
+        except Exception:
+            unit.rollback()
+            raise
 
-            self.log.info(f"{group} filled. Returning group")
-            return group
+        self.log.info(f"{group} filled. Returning group")
+        return group
 
     def get_group(self) -> Group:
         member = self.mm.member
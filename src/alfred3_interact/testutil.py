@@ -1,4 +1,9 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
 from . import MatchMaker, NoMatch, ParallelSpec, SequentialSpec
+from .instrument import recorder
 
 
 def get_group(
@@ -44,3 +49,129 @@ def get_multiple_groups(*mm, specname: str = "test"):
     groups = [m.match_to(specname) for m in reversed(mm)]
 
     return tuple(reversed(groups))
+
+
+class QueryCount:
+    """
+    Database and file operations counted by :func:`.count_queries`.
+    """
+
+    def __init__(self):
+        #: Recorded :class:`.instrument.Operation` objects in order
+        self.operations = []
+        self._lock = threading.Lock()
+
+    def __call__(self, op):
+        with self._lock:
+            self.operations.append(op)
+
+    def _db(self, kind: str) -> int:
+        return sum(
+            1
+            for op in self.operations
+            if op.kind == kind and not op.collection.startswith("file:")
+        )
+
+    @property
+    def reads(self) -> int:
+        """int: Number of database reads."""
+        return self._db("read")
+
+    @property
+    def writes(self) -> int:
+        """int: Number of database writes."""
+        return self._db("write")
+
+    @property
+    def queries(self) -> int:
+        """int: Number of database reads and writes."""
+        return self.reads + self.writes
+
+    @property
+    def files(self) -> int:
+        """
+        int: Number of opened local files. Iterations over local session
+        data count one file per returned session.
+        """
+        return sum(
+            op.ndocs for op in self.operations if op.collection.startswith("file:")
+        )
+
+    @property
+    def total(self) -> int:
+        """int: Number of database queries and file opens."""
+        return self.queries + self.files
+
+    def summary(self) -> str:
+        """
+        Returns a line per operation with caller, method and collection.
+        """
+        lines = [f"{op.name}: {op.method} {op.collection}" for op in self.operations]
+        return "\n".join(lines)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """
+    Counts the database reads and writes and the local file opens of
+    alfred3-interact in the block.
+
+    Examples:
+
+        ::
+
+            with count_queries() as count:
+                group.takes_members()
+
+            assert count.queries <= 1
+
+    """
+    count = QueryCount()
+    recorder.subscribe(count)
+    try:
+        yield count
+    finally:
+        recorder.unsubscribe(count)
+
+
+@contextmanager
+def query_budget(
+    queries: int = None, reads: int = None, writes: int = None, files: int = None
+) -> Iterator[QueryCount]:
+    """
+    Asserts that the block stays within a budget of database and file
+    operations. Budgets that are *None* are not checked.
+
+    Args:
+        queries (int): Maximum number of database reads and writes.
+        reads (int): Maximum number of database reads.
+        writes (int): Maximum number of database writes.
+        files (int): Maximum number of local file opens.
+
+    Raises:
+        AssertionError: If the block exceeded a budget. The message lists
+            all counted operations.
+
+    Examples:
+
+        ::
+
+            with query_budget(queries=2):
+                mm.match_to("test")
+
+    """
+    budget = {"queries": queries, "reads": reads, "writes": writes, "files": files}
+
+    with count_queries() as count:
+        yield count
+
+    exceeded = [
+        f"{name}: {getattr(count, name)} > {limit}"
+        for name, limit in budget.items()
+        if limit is not None and getattr(count, name) > limit
+    ]
+
+    if exceeded:
+        raise AssertionError(
+            "Query budget exceeded (" + ", ".join(exceeded) + ")\n" + count.summary()
+        )
@@ -0,0 +1,127 @@
+"""
+Unit of work for matchmaking writes.
+"""
+
+import json
+from dataclasses import asdict
+
+from pymongo import InsertOne, UpdateOne
+
+from ._util import saving_method
+from .instrument import db_misc
+
+
+class UnitOfWork:
+    """
+    Collects the writes of a single match and commits them at once.
+
+    A group that is started within a unit of work is not inserted into
+    the database on initialization and does not save its changes. The
+    same applies to members added via :meth:`.add_member`. On
+    :meth:`.commit`, the group is inserted in its final state and the
+    changes of all members are written. Since the group does not exist
+    in the database before the commit, no other session can access it
+    and it does not need to be locked.
+
+    In mongo experiments, all writes are committed with a single
+    ``bulk_write``. In local experiments, each file is written once.
+
+    Args:
+        exp (alfred3.ExperimentSession): Experiment session.
+
+    Examples:
+        ::
+
+            unit = UnitOfWork(exp)
+            group = Group(mm, unit=unit, **data)
+            group += mm.member
+            group.roles.assign("a", mm.member)
+            unit.add_member(mm.member)
+            unit.commit()
+
+    """
+
+    def __init__(self, exp):
+        self.exp = exp
+        self.saving_method = saving_method(exp)
+
+        #: Groups to insert on commit
+        self.groups = []
+
+        #: Members to save on commit
+        self.members = []
+
+    def add_group(self, group):
+        """
+        Adds a group to be inserted on commit. Called by
+        :class:`.Group` on initialization.
+        """
+        if group not in self.groups:
+            self.groups.append(group)
+
+    def add_member(self, member):
+        """
+        Adds a member whose changes are saved on commit.
+        """
+        if member not in self.members:
+            self.members.append(member)
+
+    def commit(self):
+        """
+        Writes all collected changes and detaches the groups from the
+        unit of work.
+        """
+        if self.saving_method == "mongo":
+            self._commit_mongo()
+        elif self.saving_method == "local":
+            self._commit_local()
+
+        for group in self.groups:
+            group.data.mark_clean()
+            group.io.unit = None
+
+        for member in self.members:
+            member.data.mark_clean()
+
+    def rollback(self):
+        """
+        Discards the changes of all members added via :meth:`.add_member`.
+        Call this if the match fails before :meth:`.commit`, so that
+        later saves of the members do not persist a group that was never
+        inserted.
+        """
+        for member in self.members:
+            member.data.revert()
+
+        self.groups = []
+        self.members = []
+
+    def _commit_mongo(self):
+        operations = [InsertOne(asdict(group.data)) for group in self.groups]
+
+        updates = {}
+        for member in self.members:
+            changes = member.data.changes()
+            if not changes:
+                continue
+
+            query = member.mm.io.query
+            key = json.dumps(query, sort_keys=True)
+            update = updates.setdefault(key, (query, {}))[1]
+
+            prefix = f"members.{member.data.session_id}"
+            for path, value in changes.items():
+                update[f"{prefix}.{path}"] = value
+
+        for query, update in updates.values():
+            operations.append(UpdateOne(query, {"$set": update}))
+
+        if operations:
+            db_misc(self.exp).bulk_write(operations, ordered=True)
+
+    def _commit_local(self):
+        for group in self.groups:
+            group.io._save_local(asdict(group.data))
+
+        for member in self.members:
+            member.io.save()
@@ -70,3 +70,23 @@ def test_chat_element(exp):
 
     chat.prepare_web_widget()
     assert chat.template_data
+
+
+def test_poll_messages(chat):
+    chat.post_message("test")
+    data = chat.poll_messages()
+
+    assert len(data["messages"]) == 1
+    assert data["next_poll_in"] == chat.poll_interval.base
+
+
+def test_poll_backoff(chat):
+    chat.poll_messages()
+    first = chat.poll_messages()["next_poll_in"]
+    second = chat.poll_messages()["next_poll_in"]
+
+    assert second > first
+
+    chat.post_message("test")
+    data = chat.poll_messages()
+    assert data["next_poll_in"] == chat.poll_interval.base
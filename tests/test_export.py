@@ -0,0 +1,161 @@
+import csv
+import json
+
+import pytest
+from alfred3.data_manager import DataManager as dm
+from click.testing import CliRunner
+
+from alfred3_interact.chat import ChatManager
+from alfred3_interact.export import (
+    CHAT_COLUMNS,
+    COLUMNS,
+    encryption_key,
+    export_chats,
+    export_groups,
+    main,
+    rows,
+    source_from_exp,
+    transcripts,
+)
+from alfred3_interact.testutil import get_group
+
+
+def read_jsonl(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestExportGroups:
+    def test_jsonl(self, exp, tmp_path):
+        group = get_group(exp)
+        path = tmp_path / "groups.jsonl"
+
+        n = export_groups(exp, path)
+        data = read_jsonl(path)
+
+        assert n == len(data) == 1
+        assert data[0]["group_id"] == group.group_id
+        assert data[0]["session_id"] == exp.session_id
+        assert data[0]["role"] == group.me.role
+
+    def test_csv(self, exp, tmp_path):
+        get_group(exp)
+        path = tmp_path / "groups.csv"
+
+        export_groups(exp, path)
+
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            data = list(reader)
+
+        assert reader.fieldnames[: len(COLUMNS)] == list(COLUMNS)
+        assert data[0]["session_id"] == exp.session_id
+        assert not list(tmp_path.glob("*.jsonl"))
+
+    def test_parallel_chunks(self, exp_factory):
+        for _ in range(3):
+            get_group(exp_factory())
+
+        source = source_from_exp(exp_factory())
+        sequential = list(rows(source, chunk_size=1))
+        parallel = list(rows(source, chunk_size=1, workers=2))
+
+        assert len(sequential) == 3
+        assert parallel == sequential
+
+    def test_malformed_expdata(self, exp, caplog):
+        get_group(exp)
+        exp.db_main.update_one(
+            {"exp_session_id": exp.session_id, "type": dm.EXP_DATA},
+            {"$set": {"exp_data": {"broken": {"novalue": 1}}}},
+        )
+
+        data = list(rows(source_from_exp(exp)))
+
+        assert data[0]["export_error"].startswith("KeyError")
+        assert json.loads(data[0]["exp_data"]) == {"broken": {"novalue": 1}}
+        assert exp.session_id in caplog.text
+
+    def test_local(self, lexp, tmp_path):
+        get_group(lexp)
+        path = tmp_path / "groups.jsonl"
+
+        export_groups(lexp, path)
+
+        assert read_jsonl(path)[0]["session_id"] == lexp.session_id
+
+
+class TestExportChats:
+    def test_jsonl(self, exp, tmp_path):
+        group = get_group(exp)
+        chat = ChatManager(exp, group.group_id, room="a", nickname=group.me.role)
+        chat.post_message("hello")
+        path = tmp_path / "chats.jsonl"
+
+        n = export_chats(exp, path)
+        data = read_jsonl(path)
+
+        assert n == len(data) == 1
+        assert data[0]["chat_id"] == group.group_id
+        assert data[0]["room"] == "a"
+        assert data[0]["chat_group_id"] == group.group_id
+
+        msg = data[0]["messages"][0]
+        assert msg["msg"] == "hello"
+        assert msg["role"] == group.me.role
+        assert msg["group_id"] == group.group_id
+
+    def test_csv(self, exp, tmp_path):
+        group = get_group(exp)
+        ChatManager(exp, group.group_id, encrypt=False).post_message("hello")
+        path = tmp_path / "chats.csv"
+
+        export_chats(exp, path)
+
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            data = list(reader)
+
+        assert reader.fieldnames == list(CHAT_COLUMNS)
+        assert data[0]["msg"] == "hello"
+        assert data[0]["sender_session_id"] == exp.session_id
+
+    def test_parallel_decryption(self, exp_factory):
+        for i in range(3):
+            exp = exp_factory()
+            ChatManager(exp, f"chat-{i}").post_message(f"message {i}")
+
+        source = source_from_exp(exp)
+        key = encryption_key(exp)
+        sequential = list(transcripts(source, key=key, chunk_size=1))
+        parallel = list(transcripts(source, key=key, chunk_size=1, workers=2))
+
+        assert [t["messages"][0]["msg"] for t in sequential] == [
+            "message 0",
+            "message 1",
+            "message 2",
+        ]
+        assert parallel == sequential
+
+    def test_local(self, lexp, tmp_path):
+        with pytest.raises(ValueError):
+            export_chats(lexp, tmp_path / "chats.jsonl")
+
+
+class TestCommandLine:
+    def test_local(self, lexp, tmp_path):
+        get_group(lexp)
+        source = source_from_exp(lexp)
+        path = tmp_path / "groups.csv"
+
+        args = [str(path), "--exp-id", lexp.exp_id]
+        args += ["--data-dir", str(source.data_dir)]
+        args += ["--interact-dir", str(source.interact_dir)]
+        result = CliRunner().invoke(main, args)
+
+        assert result.exit_code == 0, result.output
+        assert path.is_file()
+
+    def test_source_required(self, tmp_path):
+        result = CliRunner().invoke(main, [str(tmp_path / "x.csv"), "--exp-id", "x"])
+        assert result.exit_code != 0
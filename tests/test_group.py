@@ -1,8 +1,14 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+from flask import Flask
 
 import alfred3_interact as ali
+from alfred3_interact._util import SharedDataConflict
+from alfred3_interact.group import GroupManager
 from alfred3_interact.spec import SequentialSpec
-from alfred3_interact.testutil import get_group
+from alfred3_interact.testutil import count_queries, get_group, query_budget
 
 
 @pytest.fixture
@@ -318,3 +324,448 @@ class TestSharedData:
         group3 = get_group(exp3, ["a", "b"], ongoing_sessions_ok=True)
 
         assert group3.shared_data["test"] == "test"
+
+    def test_read_without_write(self, group):
+        group.shared_data["test"] = "test"
+
+        with query_budget(queries=1, writes=0):
+            assert group.shared_data["test"] == "test"
+
+    def test_concurrent_keys(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group1.shared_data["x"] = 1
+
+        with query_budget(queries=1):
+            group2.shared_data["y"] = 2
+
+        assert group1.shared_data["x"] == 1
+        assert group1.shared_data["y"] == 2
+
+    def test_version(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        version = group1.shared_data.version
+
+        group2.shared_data["test"] = "test"
+
+        assert group1.shared_data.changed()
+        assert group2.shared_data.version == version + 1
+        assert not group2.shared_data.changed()
+
+    def test_delete(self, group):
+        group.shared_data["test"] = "test"
+        del group.shared_data["test"]
+
+        assert "test" not in group.shared_data
+        with pytest.raises(KeyError):
+            del group.shared_data["test"]
+
+    def test_local(self, lgroup):
+        lgroup.shared_data["test"] = "test"
+        version = lgroup.shared_data.version
+
+        assert lgroup.io.load().shared_data["test"] == "test"
+        assert lgroup.shared_data["test"] == "test"
+        assert not lgroup.shared_data.changed()
+        assert version == 1
+
+
+class TestSharedDataBatch:
+    def test_single_write(self, group):
+        with query_budget(writes=1):
+            with group.shared_data.batch():
+                group.shared_data["a"] = 1
+                group.shared_data["b"] = 2
+                assert group.shared_data["a"] == 1
+
+        data = group.io.load().shared_data
+        assert (data["a"], data["b"]) == (1, 2)
+
+    def test_delete(self, group):
+        group.shared_data["a"] = 1
+
+        with group.shared_data.batch():
+            del group.shared_data["a"]
+            assert "a" not in group.shared_data
+
+        assert "a" not in group.io.load().shared_data
+
+    def test_exception_discards(self, group):
+        with pytest.raises(RuntimeError):
+            with group.shared_data.batch():
+                group.shared_data["a"] = 1
+                raise RuntimeError
+
+        assert "a" not in group.shared_data
+
+    def test_merge(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        with group1.shared_data.batch():
+            group1.shared_data["a"] = 1
+            group2.shared_data["b"] = 2
+
+        assert group2.shared_data["a"] == 1
+        assert group2.shared_data["b"] == 2
+
+    def test_conflict(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        with pytest.raises(SharedDataConflict):
+            with group1.shared_data.batch(on_conflict="raise"):
+                group1.shared_data["a"] = 1
+                group2.shared_data["b"] = 2
+
+        assert "a" not in group2.shared_data
+
+    def test_nested_stricter_policy(self, group):
+        with pytest.raises(ValueError):
+            with group.shared_data.batch():
+                group.shared_data.transaction(lambda data: data.update(a=1))
+
+        assert "a" not in group.io.load().shared_data
+
+    def test_nested_conflict(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        with pytest.raises(SharedDataConflict):
+            with group1.shared_data.batch(on_conflict="raise"):
+                with group1.shared_data.batch():
+                    group1.shared_data["a"] = 1
+                group2.shared_data["b"] = 2
+
+        assert "a" not in group2.shared_data
+
+    def test_transaction_retry(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group1.shared_data["n"] = 0
+        calls = []
+
+        def add(data):
+            calls.append(data["n"])
+            if len(calls) == 1:
+                group2.shared_data["n"] = 10
+            data["n"] = data["n"] + 1
+
+        group1.shared_data.transaction(add)
+
+        assert calls == [0, 10]
+        assert group2.shared_data["n"] == 11
+
+    def test_local(self, lgroup):
+        with lgroup.shared_data.batch(on_conflict="raise"):
+            lgroup.shared_data["a"] = 1
+            lgroup.shared_data["b"] = 2
+
+        assert lgroup.io.load().shared_data["b"] == 2
+        assert lgroup.shared_data.version == 1
+
+
+class TestSharedDataAtomic:
+    def test_increment(self, group):
+        assert group.shared_data.increment("n") == 1
+        assert group.shared_data.increment("n", 5) == 6
+        assert group.shared_data["n"] == 6
+
+    def test_concurrent_increments(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        groups = [group1, group2] * 3
+
+        with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            list(executor.map(lambda g: g.shared_data.increment("n", 2), groups))
+
+        assert group1.shared_data["n"] == 12
+
+    def test_single_query(self, group):
+        with query_budget(queries=1):
+            group.shared_data.increment("n")
+
+    def test_append(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        group1.shared_data.append("bids", 1)
+        assert group2.shared_data.append("bids", 2) == (1, 2)
+
+    def test_compare_and_set(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        assert group1.shared_data.compare_and_set("turn", None, "a")
+        assert not group2.shared_data.compare_and_set("turn", None, "b")
+        assert group2.shared_data.compare_and_set("turn", "a", "b")
+        assert group1.shared_data["turn"] == "b"
+
+    def test_local(self, lgroup):
+        assert lgroup.shared_data.increment("n", 2) == 2
+        assert lgroup.shared_data.append("items", (1, 2)) == ([1, 2],)
+        assert lgroup.shared_data.compare_and_set("items", [(1, 2)], ())
+        assert not lgroup.shared_data.compare_and_set("n", 1, 3)
+        assert lgroup.io.load().shared_data["n"] == 2
+
+
+class TestBarrier:
+    def test_all_arrived(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        assert group1.barrier("sync").arrive() == 1
+        assert not group1.barrier("sync").passed()
+
+        assert group2.barrier("sync").arrive() == 2
+        assert group1.barrier("sync").passed()
+        assert not group1.barrier("other").passed()
+
+    def test_arrive_twice(self, group):
+        group.barrier("sync").arrive()
+        assert group.barrier("sync").arrive() == 1
+
+    def test_dropped_member(self, exp_factory):
+        exp1 = exp_factory()
+        group1 = get_group(exp1, ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        exp1._start()
+        exp1.abort("test")
+        exp1._save_data(sync=True)
+
+        group2.barrier("sync").arrive()
+        assert group2.barrier("sync").passed()
+        assert group1.barrier("sync").waiting() == []
+
+    def test_cached_status(self, exp_factory):
+        group1 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        barrier = group1.barrier("sync", status_interval=60)
+        barrier.arrive()
+
+        with query_budget(queries=2):
+            assert not barrier.passed()
+
+        with query_budget(queries=1):
+            assert not barrier.passed()
+
+    def test_local(self, lgroup):
+        sid = lgroup.exp.session_id
+        barrier = lgroup.barrier("sync")
+        assert barrier.waiting() == [sid]
+        assert not barrier.passed()
+
+        assert barrier.arrive() == 1
+        assert barrier.arrive() == 1
+        assert barrier.passed()
+        assert lgroup.io.load().barriers["sync"] == [sid]
+        assert lgroup.data.barriers["sync"] == [sid]
+
+    def test_sync_page(self, exp_factory):
+        exp1 = exp_factory()
+        exp2 = exp_factory()
+        exp1.plugins.group = get_group(exp1, ["a", "b"], ongoing_sessions_ok=True)
+        exp2.plugins.group = get_group(exp2, ["a", "b"], ongoing_sessions_ok=True)
+
+        page1 = ali.SyncPage(name="sync")
+        page2 = ali.SyncPage(name="sync")
+        exp1 += page1
+        exp2 += page2
+
+        assert not page1.wait_for()
+        assert page2.wait_for()
+        assert page1.wait_for()
+
+
+class TestGroupStatus:
+    def test_status(self, exp_factory):
+        exp1 = exp_factory()
+        group1 = get_group(exp1, ["a", "b"], ongoing_sessions_ok=True)
+        group2 = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        assert group2.status() == {"a": "active", "b": "active"}
+
+        exp1._start()
+        exp1.abort("test")
+        exp1._save_data(sync=True)
+
+        assert group2.status()[group1.me.role] == "aborted"
+        assert list(group2.roles.open()) == [group1.me.role]
+
+    def test_single_snapshot(self, group):
+        with query_budget(queries=2):
+            assert not group.full
+
+    def test_reused_within_request(self, exp_factory):
+        group = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+
+        with Flask(__name__).test_request_context():
+            with query_budget(queries=2):
+                assert group.full
+                assert not group.finished
+                assert group.nactive == 2
+                assert group.nfinished == 0
+                assert group.oldest_save
+                assert not list(group.roles.open())
+                assert len(list(group.roles.pending())) == 2
+
+    def test_not_reused_outside_request(self, exp_factory):
+        exp1 = exp_factory()
+        group1 = get_group(exp1, ["a", "b"], ongoing_sessions_ok=True)
+        get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        assert group1.nfinished == 0
+
+        exp1.finish()
+
+        assert group1.nfinished == 1
+
+    def test_local(self, lgroup):
+        with query_budget(queries=0):
+            status = lgroup.status()
+
+        assert set(status) == {"a", "b"}
+
+
+class TestChangedFieldSaves:
+    def test_no_changes(self, group):
+        with query_budget(writes=0):
+            group.io.save()
+
+    def test_changed_paths(self, group):
+        group.data.roles["a"] = "other"
+        assert group.io.changes() == {"roles.a": "other"}
+
+    def test_nested_change(self, group):
+        group.data.shared_data["nested"] = {"a": 1}
+        group.data.mark_clean()
+
+        group.data.shared_data["nested"]["a"] = 2
+        assert group.data.changes() == {"shared_data.nested": {"a": 2}}
+
+    def test_coalesced_in_with_block(self, group):
+        with count_queries() as count:
+            with group:
+                group.data.active = False
+                group.io.save()
+                group.io.save()
+
+        assert count.writes == 2  # lock and release
+        assert group.io.load().active is False
+        assert group.io.load().busy == "false"
+
+    def test_coalesced_local(self, lgroup):
+        with lgroup:
+            lgroup.data.active = False
+            lgroup.io.save()
+
+        assert lgroup.io.load().active is False
+
+    def test_member_no_changes(self, exp):
+        group = get_group(exp)
+
+        with query_budget(writes=0):
+            group.mm.member.io.save()
+
+    def test_member_changed_field(self, exp):
+        group = get_group(exp)
+        member = group.mm.member
+        member.data.role = "b"
+        member.io.save()
+
+        assert group.mm.io.load_member(exp.session_id)["role"] == "b"
+
+
+class TestIdentityMap:
+    def test_same_member(self, group):
+        assert group.me is group.mm.member
+        assert group.a is group.me
+
+    def test_role_access_without_queries(self, group):
+        group.a
+
+        with query_budget(queries=0):
+            group.a
+            group.me
+
+    def test_same_group(self, group):
+        manager = GroupManager(group.mm)
+        assert manager.find_one(group.group_id) is group
+
+    def test_refresh(self, group):
+        group.io.db.update_one(group.io.query, {"$set": {"active": False}})
+        assert group.data.active
+
+        group.refresh()
+        assert not group.data.active
+
+    def test_refresh_member(self, group):
+        member = group.mm.member
+        member.io.db.update_one(
+            member.io.query, {"$set": {f"members.{member.data.session_id}.role": "x"}}
+        )
+
+        assert member.refresh().role == "x"
+
+
+class TestPrefetch:
+    def test_without_queries_after_prefetch(self, group):
+        group.prefetch()
+
+        with query_budget(queries=0):
+            group.me.values
+            group.me.session_data
+
+    def test_fields(self, group):
+        group.prefetch(fields=["exp_data"])
+
+        assert group.me.expdata.covers(["exp_data"])
+        assert not group.me.expdata.covers(["additional_data"])
+        with query_budget(queries=0):
+            group.me.values
+
+    def test_refresh_discards(self, group):
+        group.prefetch()
+        group.me.refresh()
+
+        assert group.me.expdata.prefetched is None
+
+    def test_values_by_role(self, group):
+        with query_budget(queries=1):
+            values = group.values_by_role()
+
+        assert isinstance(values["a"], dict)
+        assert values["b"] is None
+
+    def test_values_by_role_after_partner_save(self, exp_factory):
+        exp1 = exp_factory()
+        get_group(exp1, ["a", "b"], ongoing_sessions_ok=True)
+        group = get_group(exp_factory(), ["a", "b"], ongoing_sessions_ok=True)
+        partner = group.you
+        group.values_by_role()
+
+        save_time = time.time() + 1
+        update = {"exp_save_time": save_time, "additional_data.test": 1}
+        partner.expdata.db.update_one(partner.expdata.query, {"$set": update})
+        group.values_by_role()
+
+        data = partner.expdata.load(["exp_save_time", "additional_data"])
+        assert data["exp_save_time"] == save_time
+        assert data["additional_data"]["test"] == 1
+
+    def test_prefetch_per_request(self, group):
+        app = Flask(__name__)
+        with app.test_request_context():
+            group.prefetch()
+            assert group.me.expdata.covers(["exp_data"])
+
+        with app.test_request_context():
+            assert not group.me.expdata.covers(["exp_data"])
+
+    def test_values_by_role_local(self, lgroup):
+        values = lgroup.values_by_role()
+
+        assert values["a"] == lgroup.me.values
+        assert values["b"] is None
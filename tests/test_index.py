@@ -0,0 +1,101 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from alfred3_interact import index
+from alfred3_interact.index import session_index
+from alfred3_interact.testutil import count_queries
+
+
+@pytest.fixture
+def directory(lexp):
+    path = Path(lexp.subpath(lexp.config.get("local_saving_agent", "path")))
+    path.mkdir(parents=True, exist_ok=True)
+    yield path
+
+
+def write_session(directory: Path, sid: str, mtime: float = None, **data):
+    doc = {"type": "exp_data", "exp_session_id": sid, "exp_finished": False}
+    doc["exp_aborted"] = False
+    doc["exp_start_time"] = 1.0
+    doc["exp_save_time"] = 2.0
+    doc.update(data)
+
+    path = directory / f"{sid}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestSessionIndex:
+    def test_lookup(self, lexp, directory):
+        write_session(directory, "s1")
+        idx = session_index(lexp)
+
+        assert idx.path_of("s1") == (directory / "s1.json").resolve()
+        assert idx.load("s1")["exp_session_id"] == "s1"
+        assert idx.entry("unknown") is None
+
+    def test_invalidated_by_mtime(self, lexp, directory):
+        write_session(directory, "s1", mtime=1000)
+        idx = session_index(lexp)
+        assert not idx.entry("s1").finished
+
+        write_session(directory, "s1", mtime=2000, exp_finished=True)
+        assert idx.entry("s1").finished
+
+    def test_unchanged_files_not_parsed(self, lexp, directory):
+        write_session(directory, "s1")
+        write_session(directory, "s2")
+        idx = session_index(lexp)
+        idx.refresh()
+
+        with count_queries() as count:
+            statuses = list(idx.statuses())
+
+        assert count.files == 0
+        assert {s["exp_session_id"] for s in statuses} >= {"s1", "s2"}
+
+    def test_incremental(self, lexp, directory):
+        write_session(directory, "s1")
+        idx = session_index(lexp)
+        idx.refresh()
+        write_session(directory, "s2")
+
+        with count_queries() as count:
+            assert idx.entry("s2") is not None
+
+        assert count.files == 2  # new session file and persisted index
+
+    def test_persisted(self, lexp, directory):
+        write_session(directory, "s1")
+        session_index(lexp).refresh()
+        assert (directory / index.INDEX_FILENAME).is_file()
+
+        index._indexes.clear()
+        with count_queries() as count:
+            assert session_index(lexp).entry("s1") is not None
+
+        assert count.files == 1  # persisted index only
+
+    def test_removed_file(self, lexp, directory):
+        path = write_session(directory, "s1")
+        idx = session_index(lexp)
+        idx.refresh()
+
+        path.unlink()
+        assert idx.entry("s1") is None
+
+    def test_statuses_of_sessions(self, lexp, directory):
+        write_session(directory, "s1", exp_aborted=True)
+        write_session(directory, "s2")
+
+        statuses = list(session_index(lexp).statuses(["s1"]))
+
+        assert len(statuses) == 1
+        assert statuses[0]["exp_aborted"]
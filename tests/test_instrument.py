@@ -0,0 +1,91 @@
+import pytest
+
+from alfred3_interact.group import GroupManager
+from alfred3_interact.instrument import recorder
+from alfred3_interact.testutil import count_queries, get_group
+
+
+@pytest.fixture
+def instrumented():
+    recorder.reset()
+    recorder.enable()
+    yield recorder
+    recorder.disable()
+    recorder.reset()
+
+
+class TestRecorder:
+    def test_disabled(self, exp):
+        recorder.reset()
+        get_group(exp)
+
+        assert not recorder.stats()
+
+    def test_mongo(self, exp, instrumented):
+        get_group(exp)
+        stats = instrumented.stats()
+
+        key = ("MatchMakerIO._load_markbusy_mongo", "find_one_and_update", "misc")
+        assert key in stats
+        assert all(s.latency.count >= 1 for s in stats.values())
+
+    def test_local(self, lexp, instrumented):
+        get_group(lexp)
+        ops = instrumented.dump()
+
+        assert any(op["name"] == "GroupIO._save_local" for op in ops)
+        assert all(op["collection"].startswith("file:") for op in ops)
+
+    def test_documents(self, exp, instrumented):
+        group = get_group(exp)
+        list(group.mm.member_manager.monitoring_data())
+        ops = instrumented.dump()
+
+        name = "MemberManager._monitoring_data_mongo"
+        monitoring = [op for op in ops if op["name"] == name]
+        assert monitoring[0]["method"] == "aggregate"
+        assert monitoring[0]["documents"] >= 1
+
+    def test_enabled_after_construction(self, exp):
+        group = get_group(exp)
+        members = group.mm.member_manager
+        groups = GroupManager(group.mm)
+
+        with count_queries() as count:
+            list(members.monitoring_data())
+            groups.find([group.group_id])
+
+        names = {op.name for op in count.operations}
+        assert "MemberManager._monitoring_data_mongo" in names
+        assert count.reads >= 2
+
+    def test_status_queries(self, exp, instrumented):
+        group = get_group(exp)
+        group.me.status.finished
+        ops = instrumented.dump()
+
+        assert any(op["collection"] == exp.db_main.name for op in ops)
+
+    def test_metrics(self, exp, instrumented):
+        group = get_group(exp)
+        group.mm.metrics.count("test")
+        group.mm.metrics.load()
+        ops = instrumented.dump()
+
+        assert any(op["name"].startswith("MatchMakerMetrics.") for op in ops)
+
+
+class TestExport:
+    def test_prometheus(self, exp, instrumented):
+        get_group(exp)
+        text = instrumented.prometheus()
+
+        assert "# TYPE alfred3_interact_db_operation_seconds histogram" in text
+        assert 'le="+Inf"' in text
+        assert "alfred3_interact_db_documents_total{" in text
+
+    def test_dump_sorted(self, exp, instrumented):
+        get_group(exp)
+        totals = [op["seconds_total"] for op in instrumented.dump()]
+
+        assert totals == sorted(totals, reverse=True)
@@ -4,7 +4,8 @@ import pytest
 from alfred3.quota import SessionGroup
 
 from alfred3_interact import MatchMaker, NoMatch, ParallelSpec, SequentialSpec
-from alfred3_interact.testutil import get_group
+from alfred3_interact._util import MatchingError
+from alfred3_interact.testutil import count_queries, get_group, query_budget
 
 
 def test_clear(exp):
@@ -418,3 +419,85 @@ class TestParallelQuota:
 
         assert mm1.quota.nopen == 1
         assert mm2.quota.nopen == 1
+
+
+class TestMatchedFastPath:
+    def test_repeated_match(self, exp):
+        spec = SequentialSpec("a", "b", nslots=5, name="test")
+        mm = MatchMaker(spec, exp=exp)
+        group = mm.match_to("test")
+
+        with query_budget(queries=1, writes=0):
+            group2 = mm.match_to("test")
+
+        assert group2 is group
+
+    def test_repeated_match_local(self, lexp):
+        spec = SequentialSpec("a", "b", nslots=5, name="test")
+        mm = MatchMaker(spec, exp=lexp)
+        group = mm.match_to("test")
+
+        with query_budget(files=1):
+            group2 = mm.match_to("test")
+
+        assert group2 is group
+
+    def test_repeated_match_random(self, exp):
+        spec1 = SequentialSpec("a", "b", nslots=5, name="test1")
+        spec2 = SequentialSpec("a", "b", nslots=5, name="test2")
+        mm = MatchMaker(spec1, spec2, exp=exp)
+        group = mm.match_random()
+
+        with query_budget(queries=1):
+            assert mm.match_random() is group
+
+    def test_new_matchmaker(self, exp):
+        spec = SequentialSpec("a", "b", nslots=5, name="test")
+        group = MatchMaker(spec, exp=exp).match_to("test")
+
+        mm = MatchMaker(spec, exp=exp)
+        group2 = mm.match_to("test")
+
+        assert group2 == group
+        assert mm._match_cache.role == group.me.role
+
+    def test_wrong_spec(self, exp):
+        spec1 = SequentialSpec("a", "b", nslots=5, name="test1")
+        spec2 = SequentialSpec("a", "b", nslots=5, name="test2")
+        mm = MatchMaker(spec1, spec2, exp=exp)
+        mm.match_to("test1")
+
+        with pytest.raises(MatchingError):
+            mm.match_to("test2")
+
+
+class TestProjectedReads:
+    def test_load_active(self, exp):
+        spec = SequentialSpec("a", "b", nslots=5, name="test")
+        mm = MatchMaker(spec, exp=exp)
+
+        assert mm.io.load_active() == mm.io.load().active
+        assert mm.io.load_busy() == "false"
+
+    def test_load_member(self, exp):
+        group = get_group(exp)
+        data = group.mm.io.load_member(exp.session_id)
+
+        assert data["group_id"] == group.data.group_id
+        assert group.mm.io.load_member("unknown") is None
+
+    def test_load_member_local(self, lexp):
+        group = get_group(lexp)
+        data = group.mm.io.load_member(lexp.session_id)
+
+        assert data["role"] == group.me.role
+
+    def test_active_projection(self, exp):
+        spec = SequentialSpec("a", "b", nslots=5, name="test")
+        mm = MatchMaker(spec, exp=exp)
+
+        with count_queries() as count:
+            mm.active
+
+        assert count.queries == 1
+        assert count.operations[0].ndocs == 1
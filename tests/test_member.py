@@ -1,6 +1,14 @@
+import time
+
+import pytest
+from alfred3 import Page
 from alfred3.data_manager import DataManager as dm
 
-from alfred3_interact.testutil import get_group
+from alfred3_interact import MatchMaker, SequentialSpec
+from alfred3_interact._util import MatchMakerBusy
+from alfred3_interact.element import ViewMembers
+from alfred3_interact.member import GroupMember, expdata_cache
+from alfred3_interact.testutil import count_queries, get_group
 
 
 class TestMember:
@@ -75,3 +83,198 @@ class TestMember:
         group = get_group(exp)
 
         assert group.me == group[group.me.role]
+
+
+class TestRegistration:
+    def test_register_while_busy(self, exp):
+        spec = SequentialSpec("a", "b", nslots=1, name="test")
+        mm = MatchMaker(spec, exp=exp)
+        mm.io.load_markbusy()
+
+        member = mm._init_member()
+
+        assert member.data.session_id == exp.session_id
+        assert mm.io.load_member(exp.session_id) is not None
+
+    def test_register_idempotent(self, exp):
+        spec = SequentialSpec("a", "b", nslots=1, name="test")
+        mm = MatchMaker(spec, exp=exp)
+        created = mm._init_member().data.created
+
+        member = GroupMember(mm)
+        member.io.register()
+
+        assert member.data.created == created
+
+    def test_register_local(self, lexp):
+        spec = SequentialSpec("a", "b", nslots=1, name="test")
+        mm = MatchMaker(spec, exp=lexp)
+        created = mm._init_member().data.created
+
+        member = GroupMember(mm)
+        member.io.register()
+
+        assert member.data.created == created
+        assert mm.io.load_member(lexp.session_id) is not None
+
+    def test_register_local_while_busy(self, lexp):
+        spec = SequentialSpec("a", "b", nslots=1, name="test")
+        mm = MatchMaker(spec, exp=lexp)
+        mm.io.load_markbusy()
+
+        with pytest.raises(MatchMakerBusy):
+            mm._init_member()
+
+        assert mm.metrics.load()["counters"]["matchmaker_busy"] == 1
+
+
+class TestExpDataCache:
+    def test_validation_only(self, exp):
+        group = get_group(exp)
+        group.me.values
+
+        with count_queries() as count:
+            group.me.values
+            group.me.session_data
+            group.me.move_history
+
+        assert count.reads == 3
+        assert all(op.ndocs <= 1 for op in count.operations)
+        assert (exp.exp_id, exp.session_id) in expdata_cache._entries
+
+    def test_invalidated_by_save(self, exp):
+        group = get_group(exp)
+        assert "test" not in group.me.adata
+
+        expdata = group.me.expdata
+        update = {"exp_save_time": time.time() + 1, "additional_data.test": 1}
+        expdata.db.update_one(expdata.query, {"$set": update})
+
+        assert group.me.adata["test"] == 1
+
+    def test_copies(self, exp):
+        group = get_group(exp)
+        group.me.session_data.clear()
+
+        assert group.me.session_data
+
+
+class TestMonitoringData:
+    def test_monitoring_data(self, exp_factory):
+        exp = exp_factory()
+        group = get_group(exp)
+
+        data = list(group.mm.member_manager.monitoring_data())
+
+        assert len(data) == 1
+        assert data[0]["session_id"] == exp.session_id
+        assert data[0]["group_id"] == group.group_id
+        assert "exp_move_history" not in data[0]
+
+    def test_monitoring_data_status_fields(self, exp_factory):
+        exp = exp_factory(timeout=30)
+        group = get_group(exp)
+
+        data = list(group.mm.member_manager.monitoring_data())
+
+        assert data[0]["exp_session_timeout"] == 30
+        assert "last_move" in data[0]
+        assert "exp_plugin_data" not in data[0]
+
+    def test_session_status_uses_session_timeout(self, exp):
+        group = get_group(exp)
+        manager = group.mm.member_manager
+        now = time.time()
+
+        data = {"session_id": "s1", "exp_finished": False, "exp_aborted": False}
+        data["exp_start_time"] = now - 100
+        data["exp_save_time"] = now - 100
+
+        assert manager.session_status({**data, "exp_session_timeout": 50}) == "expired"
+        assert manager.session_status({**data, "exp_session_timeout": 500}) == "active"
+
+    def test_session_status_save_time_fallback(self, exp):
+        group = get_group(exp)
+        manager = group.mm.member_manager
+        now = time.time()
+
+        data = {"session_id": "s1", "exp_finished": False, "exp_aborted": False}
+        data["exp_start_time"] = None
+        data["exp_save_time"] = now - 100
+        data["exp_session_timeout"] = 50
+
+        assert manager.session_status(data) == "expired"
+
+    def test_monitoring_data_local(self, lexp_factory):
+        exp = lexp_factory()
+        group = get_group(exp)
+
+        data = list(group.mm.member_manager.monitoring_data())
+
+        assert len(data) == 1
+        assert data[0]["session_id"] == exp.session_id
+        assert data[0]["role"] == group.me.role
+
+    def test_monitoring_page(self, exp_factory):
+        exp1 = exp_factory()
+        exp2 = exp_factory()
+        exp3 = exp_factory()
+        get_group(exp1)
+        get_group(exp2)
+        group = get_group(exp3)
+        manager = group.mm.member_manager
+
+        page = manager.monitoring_page(skip=1, limit=1, sort=[("created", 1)])
+
+        assert page["total"] == 3
+        assert page["filtered"] == 3
+        assert len(page["data"]) == 1
+        assert page["data"][0]["session_id"] == exp2.session_id
+
+    def test_monitoring_page_search(self, exp_factory):
+        exp1 = exp_factory()
+        exp2 = exp_factory()
+        get_group(exp1)
+        group = get_group(exp2)
+        manager = group.mm.member_manager
+
+        page = manager.monitoring_page(search=exp2.session_id[-6:].upper())
+
+        assert page["total"] == 2
+        assert page["filtered"] == 1
+        assert page["data"][0]["session_id"] == exp2.session_id
+
+    def test_monitoring_page_local(self, lexp_factory):
+        exp1 = lexp_factory()
+        exp2 = lexp_factory()
+        get_group(exp1)
+        group = get_group(exp2)
+        manager = group.mm.member_manager
+
+        page = manager.monitoring_page(limit=1, sort=[("created", -1)])
+
+        assert page["total"] == 2
+        assert page["data"][0]["session_id"] == exp2.session_id
+
+
+class TestViewMembers:
+    def test_changes(self, exp_factory):
+        exp = exp_factory()
+        group = get_group(exp)
+
+        page = Page(name="monitoring")
+        view = ViewMembers(match_maker=group.mm, cache_timeout=0)
+        page += view
+        exp += page
+
+        full = view.render_table_body(draw=1)
+        assert full["draw"] == 1
+        assert len(full["data"]) == 1
+
+        changes = view.render_table_changes(cursor=full["cursor"])
+        assert changes["ids"] == [row["DT_RowId"] for row in full["data"]]
+        assert not changes["data"]
+
+        group.me.io.ping()
+        changes = view.render_table_changes(cursor=full["cursor"])
+        assert len(changes["data"]) == 1
@@ -0,0 +1,63 @@
+import threading
+
+from alfred3_interact.metrics import BUCKETS, Histogram
+from alfred3_interact.testutil import get_group
+
+
+class TestHistogram:
+    def test_observe(self):
+        hist = Histogram()
+        hist.observe(0.3)
+        hist.observe(0.3)
+
+        assert hist.count == 2
+        assert hist.mean == 0.3
+        assert hist.buckets[BUCKETS.index(0.5)] == 2
+
+    def test_quantile(self):
+        hist = Histogram()
+        for _ in range(99):
+            hist.observe(0.001)
+        hist.observe(100)
+
+        assert hist.quantile(0.5) <= BUCKETS[0]
+        assert hist.quantile(1) > 60
+
+    def test_roundtrip(self):
+        hist = Histogram()
+        hist.observe(2)
+        data = {"buckets": {"8": 1}, "sum": 2, "count": 1}
+
+        assert Histogram.from_dict(data) == hist
+
+
+class TestMatchMakerMetrics:
+    def test_time_to_match(self, exp):
+        group = get_group(exp)
+        metrics = group.mm.metrics.load()
+
+        assert metrics["histograms"]["time_to_match.test"].count >= 1
+        assert metrics["histograms"]["lock_wait"].count >= 1
+        assert metrics["histograms"]["lock_hold"].count >= 1
+
+    def test_time_to_match_local(self, lexp):
+        group = get_group(lexp)
+        metrics = group.mm.metrics.load()
+
+        assert metrics["histograms"]["time_to_match.test"].count >= 1
+
+    def test_concurrent_flush_local(self, lexp):
+        group = get_group(lexp)
+        metrics = group.mm.metrics
+
+        def flush():
+            for _ in range(50):
+                metrics._flush_local({"counters.test": 1})
+
+        threads = [threading.Thread(target=flush) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert metrics.load()["counters"]["test"] == 200
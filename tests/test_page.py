@@ -7,6 +7,7 @@ from flask import Blueprint, request
 from selenium import webdriver
 
 import alfred3_interact as ali
+from alfred3_interact.element import AdaptiveCallback
 
 testing = Blueprint("test", __name__)
 
@@ -104,6 +105,46 @@ class TestWaitingPage:
     #     assert "Sorry, waiting took too long" in driver.page_source
 
 
+class TestAdaptiveCallback:
+    def test_waiting_page_js(self, exp):
+        class Wait(ali.WaitingPage):
+            def wait_for(self):
+                return False
+
+        page = Wait(name="waiting_test")
+        exp += page
+
+        callbacks = [
+            el for el in page.all_elements.values() if isinstance(el, AdaptiveCallback)
+        ]
+        callback = callbacks[0]
+        callback.prepare_web_widget()
+        js = [code for _, code in callback.js_code]
+
+        assert callback.js_template.name == "js/adaptive_callback.js.j2"
+        assert len(js) == 1
+        assert "if (data.done)" in js[0]
+        assert "data.next_poll_in*1000" in js[0]
+        assert "move('forward');" in js[0]
+        assert "move(direction=" not in js[0]
+
+    def test_poll_result(self, exp):
+        class Wait(ali.WaitingPage):
+            wait_sleep_time = 1
+
+            def wait_for(self):
+                return False
+
+        page = Wait(name="waiting_test")
+        exp += page
+
+        first = page._poll()
+        second = page._poll()
+
+        assert first["done"] is False
+        assert second["next_poll_in"] > first["next_poll_in"]
+
+
 @pytest.mark.skip("Should be run manually")
 class TestAdminPage:
     def test_monitoring(self, admin_client):
@@ -0,0 +1,56 @@
+import pytest
+
+from alfred3_interact.testutil import count_queries, get_group, query_budget
+
+
+class TestCountQueries:
+    def test_mongo(self, exp):
+        with count_queries() as count:
+            get_group(exp)
+
+        assert count.reads > 0
+        assert count.writes > 0
+        assert count.files == 0
+
+    def test_local(self, lexp):
+        with count_queries() as count:
+            get_group(lexp)
+
+        assert count.queries == 0
+        assert count.files > 0
+
+    def test_outside_block(self, exp):
+        with count_queries() as count:
+            pass
+
+        get_group(exp)
+        assert count.total == 0
+
+
+class TestQueryBudget:
+    def test_within_budget(self, exp):
+        group = get_group(exp)
+
+        with query_budget(writes=0):
+            group.data.group_id
+
+    def test_exceeded(self, exp):
+        with pytest.raises(AssertionError, match="queries"):
+            with query_budget(queries=0):
+                get_group(exp)
+
+    def test_n_plus_one(self, exp_factory):
+        for _ in range(3):
+            group = get_group(exp_factory())
+        members = list(group.mm.member_manager.members())
+
+        # one status query per member
+        with pytest.raises(AssertionError, match="reads: 3 > 1"):
+            with query_budget(reads=1):
+                [m.status.active for m in members]
+
+        # the same statuses with a single query
+        with query_budget(reads=1):
+            group.mm.member_manager.session_statuses(
+                [m.data.session_id for m in members]
+            )
@@ -0,0 +1,85 @@
+import pytest
+
+from alfred3_interact import MatchMaker, NoMatch, ParallelSpec
+from alfred3_interact.spec import ParallelMatchMaker
+from alfred3_interact.testutil import count_queries, get_group, get_group_groupwise
+from alfred3_interact.unit import UnitOfWork
+
+
+def group_writes(count) -> list:
+    return [
+        op
+        for op in count.operations
+        if op.name.startswith("GroupIO") and op.kind == "write"
+    ]
+
+
+class TestUnitOfWork:
+    def test_sequential_single_commit(self, exp):
+        with count_queries() as count:
+            group = get_group(exp)
+
+        bulk = [op for op in count.operations if op.method == "bulk_write"]
+        assert len(bulk) == 1
+        assert not group_writes(count)
+
+        data = group.io.load()
+        assert exp.session_id in data.roles.values()
+        assert data.busy == "false"
+
+        member = group.mm.io.load_member(exp.session_id)
+        assert member["group_id"] == group.group_id
+
+    def test_sequential_local(self, lexp):
+        group = get_group(lexp)
+
+        assert lexp.session_id in group.io.load().roles.values()
+        member = group.mm.io.load_member(lexp.session_id)
+        assert member["group_id"] == group.group_id
+
+    def test_parallel(self, exp_factory):
+        group = get_group_groupwise(exp_factory)
+        data = group.io.load()
+
+        assert None not in data.roles.values()
+        for sid in data.members:
+            member = group.mm.io.load_member(sid)
+            assert member["group_id"] == group.group_id
+            assert member["role"] is not None
+
+    def test_committed_group_saves(self, exp):
+        group = get_group(exp)
+        assert group.io.unit is None
+
+        group.data.active = False
+        group.io.save()
+
+        assert group.io.load().active is False
+
+    def test_parallel_failure_before_commit(self, exp_factory, monkeypatch):
+        exp1 = exp_factory()
+        exp2 = exp_factory()
+        mm1 = MatchMaker(ParallelSpec("a", "b", nslots=5, name="test"), exp=exp1)
+        mm2 = MatchMaker(ParallelSpec("a", "b", nslots=5, name="test"), exp=exp2)
+
+        with pytest.raises(NoMatch):
+            mm1.match_to("test")
+
+        mm2.member = mm2._init_member()
+        pmm = ParallelMatchMaker("a", "b", matchmaker=mm2, spec_name="test")
+        waiting = mm2.waiting_members
+
+        def fail(self):
+            raise RuntimeError("commit failed")
+
+        monkeypatch.setattr(UnitOfWork, "commit", fail)
+        with pytest.raises(RuntimeError):
+            pmm.start_group(waiting)
+
+        assert exp2.db_misc.count_documents({"type": "match_group"}) == 0
+        for member in waiting:
+            assert member.data.group_id is None
+            assert not member.data.changes()
+
+            data = mm2.io.load_member(member.data.session_id)
+            assert data["group_id"] is None
@@ -0,0 +1,35 @@
+from alfred3_interact._util import NoMatch, PollInterval
+
+
+class TestPollInterval:
+    def test_starts_at_base(self):
+        interval = PollInterval(1, 8)
+        assert interval.current == 1
+
+    def test_backoff(self):
+        interval = PollInterval(1, 8)
+        assert interval.idle() == 2
+        assert interval.idle() == 4
+        assert interval.idle() == 8
+        assert interval.idle() == 8
+
+    def test_activity_resets(self):
+        interval = PollInterval(1, 8)
+        interval.idle()
+        interval.idle()
+        assert interval.activity() == 1
+
+    def test_no_cap(self):
+        interval = PollInterval(3)
+        assert interval.idle() == 3
+
+    def test_many_idle_polls(self):
+        interval = PollInterval(1, 10)
+        for _ in range(5000):
+            interval.idle()
+        assert interval.current == 10
+
+
+def test_nomatch_nwaiting():
+    assert NoMatch().nwaiting is None
+    assert NoMatch(nwaiting=3).nwaiting == 3